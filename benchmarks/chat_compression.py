@@ -0,0 +1,196 @@
+"""
+Compares the size on disk and the read time of chat files saved without compression
+and with every available compression. The corpus is synthetic by default: sessions
+of several turns with a shared system prompt, prose answers with lists and code
+blocks and the usage of every assistant message. A directory of chat files, such as
+`data/chats`, can be used instead.
+
+Usage: python -m benchmarks.chat_compression [number_of_conversations | chats_dir]
+"""
+
+import random
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from unittest.mock import Mock
+
+from src.python_modules.FileSystemWrapper.compression import Compression
+from src.python_modules.FileSystemWrapper.file_manager import FileManager
+
+from src.domain import (
+    ChatMessage,
+    CompleteMessage,
+    ConversationId,
+    ConversationText,
+    Model,
+    ModelName,
+    TokenUsage,
+)
+from src.infrastructure.chat_repository.repository import ChatRepository
+from src.infrastructure.now import TimeManager
+from src.serde.deserialize import deserialize_conversation_text_into_messages
+from src.serde.shared import SCHEMA_VERSION
+
+DEFAULT_NUMBER_OF_CONVERSATIONS = 300
+REPETITIONS = 3
+MODELS = [Model(None, ModelName("model_1")), Model(None, ModelName("model_2"))]
+SYSTEM_PROMPT = (
+    "Eres un asistente experto en programación. Responde en español, de forma"
+    " concisa, y usa bloques de código cuando sea útil."
+)
+WORDS = (
+    "el la de que y en un una los las por con para es se no lo como más pero sus"
+    " función valor lista datos archivo clase método variable tipo error código"
+    " ejemplo usar puedes cuando cada resultado caso forma objeto devuelve módulo"
+    " the of and to in is that for it as with this be on are you can use value"
+    " list file class method returns error result example string number dict"
+    " python request response server client cache test timeout thread async"
+).split()
+CODE_SNIPPETS = [
+    "def {name}(items):\n    result = []\n    for item in items:\n"
+    "        if item is not None:\n            result.append(item * 2)\n"
+    "    return result",
+    "with open(path, encoding='utf-8') as file:\n    for line in file:\n"
+    "        {name}(line.strip())",
+    "class {name}:\n    def __init__(self, value):\n        self.value = value\n\n"
+    "    def __repr__(self):\n        return f'{{self.value!r}}'",
+]
+
+
+def create_sentence(rng: random.Random) -> str:
+    # the most common words are much more frequent, as in natural text
+    words = rng.choices(
+        WORDS,
+        weights=[1 / rank for rank in range(1, len(WORDS) + 1)],
+        k=rng.randint(6, 20),
+    )
+    return " ".join(words).capitalize() + rng.choice([".", ".", ".", ":", "?"])
+
+
+def create_answer(rng: random.Random) -> str:
+    parts: list[str] = []
+    for _ in range(rng.randint(1, 6)):
+        kind = rng.random()
+        if kind < 0.6:
+            parts.append(
+                " ".join(create_sentence(rng) for _ in range(rng.randint(2, 6)))
+            )
+        elif kind < 0.8:
+            parts.append("\n".join(f"- {create_sentence(rng)}" for _ in range(3)))
+        else:
+            name = rng.choice(WORDS).replace("á", "a").replace("ó", "o")
+            code = rng.choice(CODE_SNIPPETS).format(name=f"{name}_{rng.randint(1, 99)}")
+            parts.append(f"```python\n{code}\n```")
+    return "\n\n".join(parts)
+
+
+def create_conversation(rng: random.Random) -> list[CompleteMessage]:
+    messages = [CompleteMessage(ChatMessage("system", SYSTEM_PROMPT))]
+    for _ in range(rng.randint(1, 12)):
+        question = " ".join(create_sentence(rng) for _ in range(rng.randint(1, 3)))
+        messages.append(CompleteMessage(ChatMessage("user", question)))
+        answer = create_answer(rng)
+        usage = TokenUsage(rng.randint(50, 4000), len(answer) // 4)
+        messages.append(
+            CompleteMessage(ChatMessage("assistant", answer), rng.choice(MODELS), usage)
+        )
+    return messages
+
+
+def create_corpus(number_of_conversations: int) -> list[list[CompleteMessage]]:
+    rng = random.Random(0)
+    return [create_conversation(rng) for _ in range(number_of_conversations)]
+
+
+def read_corpus(chats_dir: Path) -> list[list[CompleteMessage]]:
+    corpus: list[list[CompleteMessage]] = []
+    for path in sorted(chats_dir.glob("*.chat")):
+        text = ConversationText(path.read_text(encoding="utf-8"), SCHEMA_VERSION)
+        try:
+            corpus.append(
+                deserialize_conversation_text_into_messages(
+                    text, preserve_model=True, check_model_exists=False
+                )
+            )
+        except (AssertionError, ValueError):
+            print(f"Skipped {path.name}")
+    return corpus
+
+
+def measure(function: Callable[[], object]) -> float:
+    """Returns the best time of several repetitions, in seconds"""
+    elapsed: list[float] = []
+    for _ in range(REPETITIONS):
+        start = time.perf_counter()
+        function()
+        elapsed.append(time.perf_counter() - start)
+    return min(elapsed)
+
+
+def run(
+    corpus: Sequence[Sequence[CompleteMessage]], compression: Compression | None
+) -> tuple[int, float, float, float]:
+    """Returns the size in bytes and the times to write, read and read the headers"""
+    time_manager = Mock(spec=TimeManager)
+    time_manager.get_current_time.return_value = "2024-06-02 09:15:40"
+    with tempfile.TemporaryDirectory() as directory:
+        repository = ChatRepository(
+            Path(directory),
+            file_manager=FileManager(),
+            time_manager=time_manager,
+            compression=compression,
+        )
+        start = time.perf_counter()
+        ids: list[ConversationId] = [
+            repository.save_messages(messages) for messages in corpus
+        ]
+        write_time = time.perf_counter() - start
+        size = sum(
+            repository.get_conversation_file_size(conversation_id)
+            for conversation_id in ids
+        )
+
+        def read_all() -> None:
+            for conversation_id in ids:
+                repository.load_conversation_as_conversation_text(conversation_id)
+
+        def read_headers() -> None:
+            for conversation_id in ids:
+                repository.load_conversation_header(conversation_id)
+
+        return size, write_time, measure(read_all), measure(read_headers)
+
+
+def main() -> None:
+    argument = sys.argv[1] if len(sys.argv) > 1 else None
+    if argument and Path(argument).is_dir():
+        corpus = read_corpus(Path(argument))
+    else:
+        corpus = create_corpus(
+            int(argument) if argument else DEFAULT_NUMBER_OF_CONVERSATIONS
+        )
+    number_of_messages = sum(len(messages) for messages in corpus)
+    print(f"{len(corpus)} conversations, {number_of_messages} messages")
+    print(
+        f"{'compression':<12}{'size':>12}{'ratio':>8}"
+        f"{'write':>11}{'read':>11}{'headers':>11}"
+    )
+    plain_size = None
+    for compression in [None, *Compression]:
+        if compression and not compression.is_available:
+            print(f"{compression.name.lower():<12}  not available")
+            continue
+        size, write_time, read_time, headers_time = run(corpus, compression)
+        plain_size = plain_size or size
+        name = compression.name.lower() if compression else "none"
+        print(
+            f"{name:<12}{size / 1024:>9.0f} KB{plain_size / size:>7.1f}x"
+            f"{write_time * 1000:>8.0f} ms{read_time * 1000:>8.0f} ms"
+            f"{headers_time * 1000:>8.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Compares the time to deserialize large chat files with the single-pass parser
+against the former parser, which scanned the text once for the META tags and
+again for the messages, building a ParsedLine (and compiling its patterns) for
+every line. The former parser is reproduced here only for comparison.
+
+Usage: python -m benchmarks.chat_file_parsing [megabytes]
+"""
+
+import re
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from src.domain import (
+    ChatMessage,
+    CompleteMessage,
+    ConversationId,
+    ConversationText,
+    Model,
+    ModelName,
+    SchemaVersionId,
+    TokenUsage,
+)
+from src.serde import serialize_conversation
+from src.serde.deserialize import (
+    RoleInfo,
+    TagType,
+    deserialize_into_conversation_object,
+    determine_model,
+    tag_types,
+)
+from src.serde.shared import SCHEMA_VERSION, Conversation
+
+DEFAULT_MEGABYTES = 4
+REPETITIONS = 5
+MODEL = Model(None, ModelName("model_1"))
+PARAGRAPH = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 6
+
+
+def create_conversation_text(megabytes: float) -> ConversationText:
+    messages: list[CompleteMessage] = []
+    size = 0
+    while size < megabytes * 1024**2:
+        turn = len(messages) // 2
+        content = "\n\n".join(f"{turn}: {PARAGRAPH}" for _ in range(4))
+        messages.append(CompleteMessage(ChatMessage("user", f"Question {turn}?")))
+        messages.append(
+            CompleteMessage(
+                ChatMessage("assistant", content), MODEL, TokenUsage(1200, 350)
+            )
+        )
+        size += len(content)
+    text = serialize_conversation(
+        messages, ConversationId("0001"), "2024-06-02 09:15:40"
+    )
+    return ConversationText(text, SCHEMA_VERSION)
+
+
+@dataclass
+class LegacyParsedLine:
+    line: str
+
+    def __post_init__(self) -> None:
+        pattern = re.compile(r"^\[(META|ROLE) .*\]$")
+        self.match = pattern.match(self.line)
+
+    def get_tag_type(self) -> TagType | None:
+        if not self.match:
+            return None
+        return tag_types[self.match.groups()[0]]
+
+    def get_property(self) -> tuple[str, str]:
+        pattern = re.compile(r"^\[(META|ROLE)( [A-Z]+)? (.*)\]$")
+        match = pattern.match(self.line)
+        if not match:
+            raise ValueError(self)
+        second = match.groups()[2].strip()
+        property_match = re.match(r"([a-z_]+)=([ .\-:_a-z0-9]+)", second)
+        if not property_match:
+            raise ValueError(self)
+        groups = property_match.groups()
+        return (groups[0], groups[1])
+
+    def get_role_info(self) -> RoleInfo | None:
+        if self.get_tag_type() is not TagType.ROLE:
+            return None
+        pattern = re.compile(r"^\[ROLE ([A-Z]+)(.*)\]$")
+        match = pattern.match(self.line)
+        if not match:
+            raise ValueError(pattern)
+        role = match.groups()[0].lower()
+        second = match.groups()[1].strip()
+        if not second:
+            return RoleInfo(role)
+        properties = dict(legacy_parse_role_property(part) for part in second.split())
+        model_name = properties.pop("model", None)
+        usage = None
+        if "prompt_tokens" in properties or "completion_tokens" in properties:
+            usage = TokenUsage(
+                int(properties.pop("prompt_tokens")),
+                int(properties.pop("completion_tokens")),
+            )
+        return RoleInfo(role, ModelName(model_name) if model_name else None, usage)
+
+
+def legacy_parse_role_property(text: str) -> tuple[str, str]:
+    property_match = re.fullmatch(
+        r"(model)=([-._a-z0-9]+)|(prompt_tokens|completion_tokens)=([0-9]+)", text
+    )
+    if not property_match:
+        raise ValueError(text)
+    key, value = (group for group in property_match.groups() if group is not None)
+    return (key, value)
+
+
+def deserialize_in_two_passes(conversation_text: ConversationText) -> Conversation:
+    lines = conversation_text.text.split("\n")
+    properties: dict[str, str] = {}
+    for line in lines:
+        parsed = LegacyParsedLine(line)
+        if parsed.get_tag_type() == TagType.META:
+            key, value = parsed.get_property()
+            properties[key] = value
+
+    role_tags_indexes = [
+        i
+        for i, line in enumerate(lines)
+        if LegacyParsedLine(line).get_tag_type() == TagType.ROLE
+    ]
+    messages: list[CompleteMessage] = []
+    for i, start in enumerate(role_tags_indexes):
+        end = role_tags_indexes[i + 1] if i + 1 < len(role_tags_indexes) else None
+        role_info = LegacyParsedLine(lines[start]).get_role_info()
+        assert role_info
+        model = None
+        if role_info.model_name:
+            model = determine_model(role_info.model_name, check_existence=False)
+        chat_message = ChatMessage(
+            role_info.role, "\n".join(lines[start + 1 : end]).strip()
+        )
+        messages.append(CompleteMessage(chat_message, model, role_info.usage))
+
+    return Conversation(
+        ConversationId(properties["id"]),
+        SchemaVersionId(properties["schema_version"]),
+        int(properties["number_of_messages"]),
+        properties["current_time"],
+        messages,
+    )
+
+
+def measure(
+    deserialize: Callable[[ConversationText], Conversation],
+    conversation_text: ConversationText,
+) -> float:
+    """Returns the best time of several repetitions, in seconds"""
+    elapsed: list[float] = []
+    for _ in range(REPETITIONS):
+        start = time.perf_counter()
+        deserialize(conversation_text)
+        elapsed.append(time.perf_counter() - start)
+    return min(elapsed)
+
+
+def main() -> None:
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MEGABYTES
+    conversation_text = create_conversation_text(megabytes)
+
+    def deserialize_in_one_pass(conversation_text: ConversationText) -> Conversation:
+        return deserialize_into_conversation_object(
+            conversation_text, preserve_model=True, check_model_exists=False
+        )
+
+    assert deserialize_in_two_passes(conversation_text) == deserialize_in_one_pass(
+        conversation_text
+    )
+    size = len(conversation_text.text.encode("utf-8")) / 1024**2
+    two_passes = measure(deserialize_in_two_passes, conversation_text)
+    one_pass = measure(deserialize_in_one_pass, conversation_text)
+    print(f"{size:.1f} MB, {conversation_text.text.count(chr(10))} lines")
+    print(f"two passes {two_passes * 1000:8.1f} ms")
+    print(f"one pass   {one_pass * 1000:8.1f} ms   ({two_passes / one_pass:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Measures the throughput of a `/for` fan-out sent through the whole ClientWrapper
+pipeline (rate limiter, retries) against the local fake backend, with an
+increasing number of queries in flight. No API is called.
+
+Usage: python -m benchmarks.fake_backend [number_of_queries]
+"""
+
+import statistics
+import sys
+import time
+
+from src.concurrency import map_in_order
+from src.domain import ChatMessage, CompleteMessage, Model, ModelName, Platform
+from src.infrastructure.llm_connection import FakeBehavior, FakeClientWrapper
+from src.infrastructure.llm_connection.fake_client_wrapper import (
+    LogNormalLatency,
+)
+from src.infrastructure.llm_connection.rate_limiter import (
+    RateLimiter,
+    RateLimits,
+)
+from src.infrastructure.llm_connection.retry import RetryHandler, RetryPolicy
+
+DEFAULT_NUMBER_OF_QUERIES = 40
+MAX_IN_FLIGHT_VALUES = (1, 4, 8, 16)
+MODEL = Model(Platform.Mistral, ModelName("fake-model"))
+UNLIMITED = RateLimits(10**6, 10**9)
+
+
+def run(number_of_queries: int, max_in_flight: int) -> list[float]:
+    client_wrapper = FakeClientWrapper(
+        FakeBehavior(latency=LogNormalLatency(0.05), rate_limit_error_rate=0.05),
+        rate_limiter=RateLimiter({}, UNLIMITED),
+        retry_handler=RetryHandler(RetryPolicy(base_delay=0.01, max_delay=0.05)),
+    )
+
+    def send_query(number: int) -> float:
+        start = time.perf_counter()
+        client_wrapper.get_simple_response(
+            MODEL, [CompleteMessage(ChatMessage("user", f"Query {number}"))]
+        )
+        return time.perf_counter() - start
+
+    return list(map_in_order(send_query, range(number_of_queries), max_in_flight))
+
+
+def main() -> None:
+    number_of_queries = (
+        int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_NUMBER_OF_QUERIES
+    )
+    for max_in_flight in MAX_IN_FLIGHT_VALUES:
+        start = time.perf_counter()
+        latencies = run(number_of_queries, max_in_flight)
+        elapsed = time.perf_counter() - start
+        median_ms = statistics.median(latencies) * 1000
+        print(
+            f"in flight {max_in_flight:>2}: {number_of_queries / elapsed:7.1f} queries/s"
+            f"   median latency {median_ms:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compares the latency of requests sent with a new HTTP client each time (as when
+every ClientWrapper built its own SDK clients) against requests sent through the
+shared connection pool.
+
+Usage: python -m benchmarks.http_transport [number_of_requests]
+"""
+
+import statistics
+import sys
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from src.infrastructure.llm_connection.transport import create_http_client
+
+DEFAULT_NUMBER_OF_REQUESTS = 200
+RESPONSE_BODY = b'{"object": "chat.completion"}'
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # send headers and body together, avoiding delayed ACK stalls
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPONSE_BODY)))
+        self.end_headers()
+        self.wfile.write(RESPONSE_BODY)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def measure(send_request: Callable[[], None], number_of_requests: int) -> list[float]:
+    latencies: list[float] = []
+    for _ in range(number_of_requests):
+        start = time.perf_counter()
+        send_request()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name: str, latencies: list[float]) -> None:
+    mean_ms = statistics.mean(latencies) * 1000
+    median_ms = statistics.median(latencies) * 1000
+    print(f"{name:<28} mean {mean_ms:7.3f} ms   median {median_ms:7.3f} ms")
+
+
+def main() -> None:
+    number_of_requests = (
+        int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_NUMBER_OF_REQUESTS
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    payload = {"messages": [{"role": "user", "content": "Hello"}]}
+
+    def new_client_per_request() -> None:
+        with httpx.Client() as client:
+            client.post(url, json=payload).raise_for_status()
+
+    shared_client = create_http_client()
+
+    def shared_pool() -> None:
+        shared_client.post(url, json=payload).raise_for_status()
+
+    report(
+        "new client per request", measure(new_client_per_request, number_of_requests)
+    )
+    report("shared connection pool", measure(shared_pool, number_of_requests))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Measures the time spent converting the history into provider messages over a whole
+session, converting every message in every turn against converting only the new
+messages of each turn with ConversionCache. The OpenAI messages are plain dicts,
+cheaper to build than to look up in the cache, so they are only measured for
+comparison and are not cached by the client wrapper.
+
+Usage: python -m benchmarks.message_conversion [number_of_turns]
+"""
+
+import sys
+import time
+from collections.abc import Callable
+from typing import Any
+
+from src.domain import ChatMessage
+from src.infrastructure.llm_connection.message_conversion import ConversionCache
+from src.infrastructure.llm_connection.mistral_client_wrapper import (
+    convert_to_mistral_payload,
+)
+from src.infrastructure.llm_connection.openai_client_wrapper import (
+    convert_to_openai_msg,
+)
+
+DEFAULT_NUMBER_OF_TURNS = 500
+CONTENT = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8
+
+
+def run_session(
+    number_of_turns: int, convert_all: Callable[[list[ChatMessage]], list[Any]]
+) -> float:
+    """Returns the total conversion time of a session with the given number of turns"""
+    history: list[ChatMessage] = []
+    elapsed = 0.0
+    for turn in range(number_of_turns):
+        history.append(ChatMessage("user", f"Question {turn}: {CONTENT}"))
+        start = time.perf_counter()
+        convert_all(history)
+        elapsed += time.perf_counter() - start
+        history.append(ChatMessage("assistant", f"Answer {turn}: {CONTENT}"))
+    return elapsed
+
+
+def main() -> None:
+    number_of_turns = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_NUMBER_OF_TURNS
+    converters: dict[str, Callable[[ChatMessage], Any]] = {
+        "Mistral": convert_to_mistral_payload,
+        "OpenAI": convert_to_openai_msg,
+    }
+    print(f"{number_of_turns} turns")
+    for name, convert in converters.items():
+        uncached = run_session(
+            number_of_turns, lambda history: [convert(msg) for msg in history]
+        )
+        cache = ConversionCache(convert)
+        cached = run_session(number_of_turns, cache.convert_all)
+        print(
+            f"{name:<8} every message {uncached * 1000:8.1f} ms"
+            f"   only new messages {cached * 1000:8.1f} ms"
+            f"   ({uncached / cached:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
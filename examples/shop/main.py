@@ -14,7 +14,7 @@ from src.infrastructure.llm_connection import ClientWrapper
 from src.infrastructure.now import TimeManager
 from src.models.shared import define_system_prompt
 from src.models_data import get_models
-from src.protocols import ChatRepositoryProtocol, ClientWrapperProtocol
+from src.protocols import ChatRepositoryProtocol
 from src.setup_logging import configure_logger, format_var
 from src.view import Raw, SimpleView, display_neutral_msg, escape_for_rich
 
@@ -34,7 +34,7 @@ logger = configure_logger(__name__)
 
 
 class Main:
-    _client: ClientWrapperProtocol
+    _client: ClientWrapper
     _repository: ChatRepositoryProtocol
 
     def __init__(self) -> None:
@@ -53,14 +53,10 @@ class Main:
         self._view = SimpleView()
         self._display_model_name()
         self._prompt_generator = SystemPromptGenerator()
+        # built once, so warm connections are reused across executions
+        self._client = self._create_client()
 
     def execute(self) -> None:
-        load_dotenv()
-        mistral_api_key = os.environ.get("MISTRAL_API_KEY")
-        openai_api_key = os.environ.get("OPENAI_API_KEY")
-        self._client = ClientWrapper(
-            mistral_api_key=mistral_api_key, openai_api_key=openai_api_key
-        )
         self._messages.clear()
         system_prompt = define_system_prompt(
             self._prompt_generator.create_system_prompt(self._shop_repository.products),
@@ -98,6 +94,14 @@ class Main:
 
         logger.info(format_var("self._messages", self._messages))
 
+    def _create_client(self) -> ClientWrapper:
+        load_dotenv()
+        mistral_api_key = os.environ.get("MISTRAL_API_KEY")
+        openai_api_key = os.environ.get("OPENAI_API_KEY")
+        return ClientWrapper(
+            mistral_api_key=mistral_api_key, openai_api_key=openai_api_key
+        )
+
     def _get_model(self) -> Model:
         model_name = self._config_reader.read_model_config()
         models = get_models()
@@ -0,0 +1,23 @@
+"""Non-interactive execution of the prompts of a JSONL file"""
+
+from .checkpoint import CheckpointJournal, compute_query_key
+from .prompts import (
+    BatchInputError,
+    BatchPrompt,
+    BatchQuery,
+    expand_prompts,
+    read_prompts,
+)
+from .runner import BatchRunner, BatchSummary
+
+__all__ = [
+    "BatchInputError",
+    "BatchPrompt",
+    "BatchQuery",
+    "BatchRunner",
+    "BatchSummary",
+    "CheckpointJournal",
+    "compute_query_key",
+    "expand_prompts",
+    "read_prompts",
+]
@@ -0,0 +1,83 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from src.command_handler import get_max_in_flight_queries
+from src.infrastructure.llm_connection import ClientWrapper
+from src.models_data import get_models
+from src.setup_engine import create_chat_repository
+
+from .checkpoint import CheckpointJournal
+from .prompts import BatchInputError, expand_prompts, find_model, read_prompts
+from .runner import BatchRunner
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.batch",
+        description="Runs the prompts of a JSONL file without user interaction",
+    )
+    parser.add_argument("prompts_file", type=Path, help="JSONL file with the prompts")
+    parser.add_argument("output_file", type=Path, help="JSONL file for the results")
+    parser.add_argument("--model", help="model used when a prompt does not set one")
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        help="maximum number of concurrent requests (default: per platform)",
+    )
+    parser.add_argument(
+        "--journal",
+        type=Path,
+        help="checkpoint journal used to resume the run (default: <output>.journal)",
+    )
+    parser.add_argument(
+        "--no-save",
+        action="store_true",
+        help="do not save the conversations in the chat repository",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    load_dotenv()
+    models = get_models()
+    default_model = find_model(args.model, models) if args.model else models[0]
+    # an invalid prompt must be reported before any request is sent
+    with open(args.prompts_file, encoding="utf-8") as prompts_file:
+        try:
+            queries = expand_prompts(read_prompts(prompts_file), models, default_model)
+        except BatchInputError as err:
+            sys.exit(str(err))
+    client_wrapper = ClientWrapper(
+        mistral_api_key=os.environ.get("MISTRAL_API_KEY"),
+        openai_api_key=os.environ.get("OPENAI_API_KEY"),
+    )
+    repository = None
+    if not args.no_save:
+        repository = create_chat_repository()
+    runner = BatchRunner(
+        client_wrapper,
+        repository,
+        max_in_flight=args.max_in_flight
+        or get_max_in_flight_queries(default_model.platform),
+    )
+    journal = CheckpointJournal(
+        args.journal or args.output_file.with_name(args.output_file.name + ".journal")
+    )
+    with open(args.output_file, "w", encoding="utf-8") as output_file:
+        try:
+            summary = runner.run(queries, output_file, journal)
+        finally:
+            journal.close()
+    print(
+        f"Completed: {summary.completed}. Failed: {summary.failed}."
+        f" Skipped (already completed): {summary.skipped}."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+from collections.abc import Iterator
+from pathlib import Path, PurePath
+from typing import Any, Final, TextIO
+
+from src.setup_logging import configure_logger
+
+from .prompts import BatchQuery
+
+logger = configure_logger(__name__)
+
+Record = dict[str, Any]
+
+
+class CheckpointJournal:
+    """
+    Append-only JSONL file with one record per completed query, keyed by the hash
+    of the query. Every record is flushed to disk before the conversation is
+    saved, so a restarted run can skip the queries that were already answered.
+    Only the keys and the last record are kept in memory; the records are read
+    again from the file when they are needed.
+    """
+
+    def __init__(self, path: PurePath):
+        self._path: Final = Path(path)
+        self._completed_keys: Final[set[str]] = set()
+        self._last_record: Record | None = None
+        for key, record in self._iter_entries():
+            self._completed_keys.add(key)
+            self._last_record = record
+        self._file: TextIO | None = None
+
+    @property
+    def number_of_records(self) -> int:
+        return len(self._completed_keys)
+
+    @property
+    def last_record(self) -> Record | None:
+        return self._last_record
+
+    def is_completed(self, key: str) -> bool:
+        return key in self._completed_keys
+
+    def iter_records(self) -> Iterator[Record]:
+        """Reads the completed records, in the order they were written"""
+        seen: set[str] = set()
+        for key, record in self._iter_entries():
+            if key not in seen:
+                seen.add(key)
+                yield record
+
+    def append(self, key: str, record: Record) -> None:
+        if self._file is None:
+            self._file = self._open_for_append()
+        line = json.dumps({"key": key, "record": record}, ensure_ascii=False)
+        self._file.write(line + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._completed_keys.add(key)
+        self._last_record = record
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open_for_append(self) -> TextIO:
+        file = open(self._path, "a", encoding="utf-8")
+        if file.tell() and not self._path.read_bytes().endswith(b"\n"):
+            # ends the truncated line, so the next record starts on its own line
+            file.write("\n")
+        return file
+
+    def _iter_entries(self) -> Iterator[tuple[str, Record]]:
+        if not self._path.exists():
+            return
+        with open(self._path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    # a line can be truncated if the process died while writing it
+                    logger.warning(f"Invalid line skipped in journal {self._path}")
+                    continue
+                yield data["key"], data["record"]
+
+
+def compute_query_key(batch_query: BatchQuery) -> str:
+    """Hash identifying the query, so the same prompts file yields the same keys"""
+    data = [
+        batch_query.request_id,
+        batch_query.index,
+        batch_query.model.model_name,
+        batch_query.query,
+    ]
+    return hashlib.sha256(json.dumps(data).encode("utf-8")).hexdigest()
@@ -0,0 +1,123 @@
+import json
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
+
+from src.domain import Model
+from src.models.placeholders import (
+    Placeholder,
+    QueryBuildException,
+    QueryText,
+    build_queries,
+    find_unique_placeholders,
+)
+
+
+class BatchInputError(Exception):
+    def __init__(self, line_number: int, reason: str):
+        super().__init__(f"Error in line {line_number} of the prompts file: {reason}")
+
+
+@dataclass(frozen=True)
+class BatchPrompt:
+    """A prompt read from a JSONL file, with the same shape as requests.jsonl"""
+
+    request_id: str
+    body: str
+    title: str | None = None
+    substitutions: Mapping[Placeholder, str] = field(default_factory=dict)
+    model_name: str | None = None
+    line_number: int = 0
+
+
+@dataclass(frozen=True)
+class BatchQuery:
+    """One of the final queries generated from a prompt"""
+
+    request_id: str
+    index: int
+    query: QueryText
+    model: Model
+
+
+def read_prompts(lines: Iterable[str]) -> Iterator[BatchPrompt]:
+    """Lazily parses the lines of a JSONL file of prompts (blank lines are ignored)"""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as err:
+            raise BatchInputError(line_number, str(err)) from None
+        yield parse_prompt(line_number, data)
+
+
+def parse_prompt(line_number: int, data: object) -> BatchPrompt:
+    if not isinstance(data, dict):
+        raise BatchInputError(line_number, "a JSON object was expected")
+    request_id = data.get("request_id")
+    body = data.get("body")
+    title = data.get("title")
+    substitutions = data.get("substitutions", {})
+    model_name = data.get("model")
+    if not isinstance(request_id, (str, int)):
+        raise BatchInputError(line_number, "missing request_id")
+    if not isinstance(body, str):
+        raise BatchInputError(line_number, "missing body")
+    if not isinstance(title, (str, type(None))):
+        raise BatchInputError(line_number, "title must be a string")
+    if not isinstance(substitutions, dict) or not all(
+        isinstance(key, str) and isinstance(value, str)
+        for key, value in substitutions.items()
+    ):
+        raise BatchInputError(line_number, "substitutions must map strings to strings")
+    if not isinstance(model_name, (str, type(None))):
+        raise BatchInputError(line_number, "model must be a string")
+    return BatchPrompt(
+        str(request_id),
+        body,
+        title,
+        {Placeholder(key): value for key, value in substitutions.items()},
+        model_name,
+        line_number,
+    )
+
+
+def expand_prompts(
+    prompts: Iterable[BatchPrompt], models: Sequence[Model], default_model: Model
+) -> list[BatchQuery]:
+    """
+    Expands the placeholders of every prompt into its final queries. All the prompts
+    are validated before any query is sent, so an invalid one does not stop a batch
+    halfway.
+    """
+    queries: list[BatchQuery] = []
+    for prompt in prompts:
+        try:
+            model = find_model(prompt.model_name, models) if prompt.model_name else None
+            prompt_queries = expand_placeholders(prompt)
+        except (QueryBuildException, ValueError) as err:
+            reason = str(err) or type(err).__name__
+            raise BatchInputError(prompt.line_number, reason) from None
+        for index, query in enumerate(prompt_queries):
+            queries.append(
+                BatchQuery(prompt.request_id, index, query, model or default_model)
+            )
+    return queries
+
+
+def expand_placeholders(prompt: BatchPrompt) -> list[QueryText]:
+    placeholders = find_unique_placeholders(prompt.body)
+    if not placeholders:
+        return [QueryText(prompt.body)]
+    if missing := [p for p in placeholders if p not in prompt.substitutions]:
+        raise ValueError(
+            f"Missing substitutions in {prompt.request_id}: {', '.join(missing)}"
+        )
+    return build_queries(prompt.body, prompt.substitutions)
+
+
+def find_model(model_name: str, models: Sequence[Model]) -> Model:
+    for model in models:
+        if model.model_name == model_name:
+            return model
+    raise ValueError(f"Model not found: {model_name}")
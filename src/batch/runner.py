@@ -0,0 +1,178 @@
+import json
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Final, TextIO
+
+from src.concurrency import map_as_completed
+from src.domain import (
+    ChatMessage,
+    CompleteMessage,
+    Model,
+    ModelName,
+    QueryResult,
+    TokenUsage,
+)
+from src.infrastructure.exceptions import LLMChatException
+from src.models.messages_ops import add_user_query_in_place
+from src.models.shared import extract_chat_messages
+from src.protocols import ChatRepositoryProtocol, ClientWrapperProtocol
+from src.setup_logging import configure_logger
+
+from .checkpoint import CheckpointJournal, Record, compute_query_key
+from .prompts import BatchQuery
+
+logger = configure_logger(__name__)
+
+
+@dataclass(frozen=True)
+class TimedResult:
+    query_result: QueryResult
+    elapsed: float
+
+
+@dataclass
+class BatchSummary:
+    completed: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+
+class BatchRunner:
+    """
+    Runs the queries of a batch with bounded concurrency, writing every result to
+    the output as soon as it completes.
+    """
+
+    def __init__(
+        self,
+        client_wrapper: ClientWrapperProtocol,
+        repository: ChatRepositoryProtocol | None = None,
+        *,
+        max_in_flight: int,
+    ):
+        self._client_wrapper: Final = client_wrapper
+        self._repository: Final = repository
+        self._max_in_flight: Final = max_in_flight
+
+    def run(
+        self,
+        queries: Iterable[BatchQuery],
+        output: TextIO,
+        journal: CheckpointJournal | None = None,
+    ) -> BatchSummary:
+        """
+        Results are handled from the calling thread, so the output, the journal and
+        the repository are never accessed concurrently.
+        With a journal, the queries completed in a previous run are skipped and
+        their records are written again to the output.
+        """
+        summary = BatchSummary()
+        if journal:
+            queries = self._resume(queries, output, journal, summary)
+        for batch_query, future in map_as_completed(
+            self._answer, queries, self._max_in_flight
+        ):
+            record = self._handle_result(batch_query, future, summary, journal)
+            write_record(output, record)
+        return summary
+
+    def _resume(
+        self,
+        queries: Iterable[BatchQuery],
+        output: TextIO,
+        journal: CheckpointJournal,
+        summary: BatchSummary,
+    ) -> Iterator[BatchQuery]:
+        """Returns the queries still pending"""
+        last_record = journal.last_record
+        if self._repository and last_record and not self._is_saved(last_record):
+            # the previous run stopped between journaling and saving
+            self._repository.save_messages(create_messages_from_record(last_record))
+        for record in journal.iter_records():
+            write_record(output, record)
+        summary.skipped = journal.number_of_records
+        return (
+            query
+            for query in queries
+            if not journal.is_completed(compute_query_key(query))
+        )
+
+    def _is_saved(self, record: Record) -> bool:
+        """
+        Checks if the record is the latest conversation of the repository. Since
+        every conversation is saved just after its record is journaled, only the
+        last record can be missing from the repository.
+        """
+        assert self._repository
+        conversation_ids = self._repository.get_conversation_ids()
+        if not conversation_ids:
+            return False
+        latest = self._repository.load_conversation(max(conversation_ids))
+        expected = create_messages_from_record(record)
+        return extract_chat_messages(latest) == extract_chat_messages(expected)
+
+    def _answer(self, batch_query: BatchQuery) -> TimedResult:
+        complete_messages: list[CompleteMessage] = []
+        add_user_query_in_place(complete_messages, batch_query.query)
+        start = time.perf_counter()
+        query_result = self._client_wrapper.get_simple_response(
+            batch_query.model, complete_messages
+        )
+        return TimedResult(query_result, time.perf_counter() - start)
+
+    def _handle_result(
+        self,
+        batch_query: BatchQuery,
+        future: "Future[TimedResult]",
+        summary: BatchSummary,
+        journal: CheckpointJournal | None,
+    ) -> Record:
+        record = create_base_record(batch_query)
+        try:
+            timed_result = future.result()
+        except LLMChatException as err:
+            logger.warning(f"Query {batch_query.request_id} failed: {err}")
+            summary.failed += 1
+            record["error"] = str(err)
+            return record
+        record["content"] = timed_result.query_result.content
+        record["elapsed"] = round(timed_result.elapsed, 3)
+        if usage := timed_result.query_result.usage:
+            record["prompt_tokens"] = usage.prompt_tokens
+            record["completion_tokens"] = usage.completion_tokens
+        if journal:
+            journal.append(compute_query_key(batch_query), record)
+        if self._repository:
+            self._repository.save_messages(timed_result.query_result.messages)
+        summary.completed += 1
+        return record
+
+
+def write_record(output: TextIO, record: Record) -> None:
+    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+    output.flush()
+
+
+def create_messages_from_record(record: Record) -> list[CompleteMessage]:
+    usage = None
+    if "prompt_tokens" in record:
+        usage = TokenUsage(record["prompt_tokens"], record["completion_tokens"])
+    return [
+        CompleteMessage(ChatMessage("user", record["query"])),
+        CompleteMessage(
+            ChatMessage("assistant", record["content"]),
+            Model(None, ModelName(record["model"])),
+            usage,
+        ),
+    ]
+
+
+def create_base_record(batch_query: BatchQuery) -> Record:
+    return {
+        "request_id": batch_query.request_id,
+        "index": batch_query.index,
+        "model": batch_query.model.model_name,
+        "query": batch_query.query,
+    }
@@ -1,14 +1,25 @@
-from typing import Final, Sequence
+from typing import Final, Iterator, Sequence
 
+from src.concurrency import map_in_order
 from src.controllers.command_interpreter import Action, ActionType
 from src.controllers.select_model import SelectModelController
+from src.conversation_saver import ConversationSaver
 from src.domain import (
+    ChatMessage,
     CompleteMessage,
     ConversationId,
     ConversationText,
+    DeltaCallback,
+    Model,
+    ModelName,
+    Platform,
     QueryResult,
 )
-from src.model_manager import ModelManager
+from src.infrastructure.llm_connection.metrics import MetricsRecorder
+from src.model_manager import ModelCallback, ModelManager
+from src.models.context_window import ContextWindow
+from src.models.messages_ops import add_user_query_in_place
+from src.models.packing import pack_queries, unpack_answers
 from src.models.placeholders import (
     Placeholder,
     QueryBuildException,
@@ -16,6 +27,7 @@ from src.models.placeholders import (
     build_queries,
     find_unique_placeholders,
 )
+from src.models.router import LatencyRouter
 from src.models.shared import extract_chat_messages
 from src.protocols import (
     ChatRepositoryProtocol,
@@ -27,17 +39,28 @@ from src.serde import (
     convert_digits_to_conversation_id,
     deserialize_conversation_text_into_messages,
 )
-from src.settings import QUERY_NUMBER_LIMIT_WARNING
+from src.settings import (
+    DEFAULT_MAX_IN_FLIGHT_QUERIES,
+    MAX_IN_FLIGHT_QUERIES,
+    MAX_SAMPLES_PER_QUERY,
+    QUERY_NUMBER_LIMIT_WARNING,
+)
+from src.setup_logging import configure_logger
 from src.strategies import (
     ActionStrategy,
     EstablishSystemPromptAction,
+    ListConversationsAction,
     ShowModelAction,
+    ShowStatsAction,
+    ShowUsageAction,
 )
 from src.view import Raw, ensure_escaped, show_error_msg
 
 PRESS_ENTER_TO_CONTINUE = Raw("Pulsa Enter para continuar")
 DELIBERATE_INPUT_TIME = 0.02
 
+logger = configure_logger(__name__)
+
 
 class ExitException(Exception): ...
 
@@ -49,14 +72,24 @@ class CommandHandler:
         "_select_model_controler",
         "_model_manager",
         "_repository",
+        "_conversation_saver",
         "_prev_messages",
+        "_concurrent_queries",
+        "_packed_queries_size",
+        "_stream_responses",
+        "_metrics",
     )
     _view: Final[ViewProtocol]
     _time_manager: Final[TimeManagerProtocol]
     _select_model_controler: Final[SelectModelController]
     _model_manager: Final[ModelManager]
     _repository: Final[ChatRepositoryProtocol]
+    _conversation_saver: Final[ConversationSaver]
     _prev_messages: Final[list[CompleteMessage]]
+    _concurrent_queries: Final[bool]
+    _packed_queries_size: Final[int]
+    _stream_responses: Final[bool]
+    _metrics: Final[MetricsRecorder | None]
 
     def __init__(
         self,
@@ -67,13 +100,34 @@ class CommandHandler:
         client_wrapper: ClientWrapperProtocol,
         time_manager: TimeManagerProtocol,
         prev_messages: list[CompleteMessage] | None = None,
+        concurrent_queries: bool = False,
+        packed_queries_size: int = 0,
+        stream_responses: bool = False,
+        metrics: MetricsRecorder | None = None,
+        context_window: ContextWindow | None = None,
+        hedge_models: Sequence[Model] = (),
+        router: LatencyRouter | None = None,
+        latency_budget: float | None = None,
+        fallback_model: Model | None = None,
     ):
         self._view = view
         self._time_manager = time_manager
         self._select_model_controler = select_model_controler
-        self._model_manager = ModelManager(client_wrapper)
+        self._model_manager = ModelManager(
+            client_wrapper,
+            context_window,
+            hedge_models=hedge_models,
+            router=router,
+            latency_budget=latency_budget,
+            fallback_model=fallback_model,
+        )
         self._repository = repository
+        self._conversation_saver = ConversationSaver(repository)
         self._prev_messages = prev_messages if prev_messages is not None else []
+        self._concurrent_queries = concurrent_queries
+        self._packed_queries_size = packed_queries_size
+        self._stream_responses = stream_responses
+        self._metrics = metrics
 
     def prompt_to_select_model(self) -> None:
         self._model_manager.model_wrapper.change(
@@ -84,6 +138,7 @@ class CommandHandler:
         debug = False
         new_conversation = False
         conversation_to_load = None
+        number_of_samples = None
 
         action_strategy: ActionStrategy | None = None
 
@@ -123,6 +178,27 @@ class CommandHandler:
             action_strategy = EstablishSystemPromptAction(
                 self._view, self._prev_messages
             )
+        elif action.type == ActionType.STATS:
+            action_strategy = ShowStatsAction(
+                self._view, self._metrics, self._model_manager.hedge_scoreboard
+            )
+        elif action.type == ActionType.USAGE:
+            action_strategy = ShowUsageAction(self._view, self._repository)
+        elif action.type == ActionType.LIST_CONVERSATIONS:
+            action_strategy = ListConversationsAction(self._view, self._repository)
+        elif action.type == ActionType.SAMPLES:
+            try:
+                number_of_samples, remaining_input = parse_number_of_samples(
+                    remaining_input
+                )
+            except ValueError:
+                self._view.show_error_msg(
+                    Raw(
+                        "Indica un número de respuestas entre 1 y"
+                        f" {MAX_SAMPLES_PER_QUERY}"
+                    )
+                )
+                return
 
         if action_strategy:
             action_strategy.execute(remaining_input)
@@ -149,6 +225,14 @@ class CommandHandler:
 
         if new_conversation:
             self._prev_messages.clear()
+        if number_of_samples:
+            if len(queries) > 1:
+                self._view.show_error_msg(
+                    Raw("No se pueden pedir varias respuestas para varias consultas")
+                )
+                return
+            self._answer_with_samples(queries[0], number_of_samples)
+            return
         self._answer_queries(queries, debug)
 
     def _load_conversation(
@@ -161,6 +245,7 @@ class CommandHandler:
         self._prev_messages[:] = deserialize_conversation_text_into_messages(
             conversation_text
         )
+        self._conversation_saver.resume(conversation_id, self._prev_messages)
         self._display_loaded_conversation(action, conversation_id, conversation_text)
         self._view.display_neutral_msg(Raw("La conversacion ha sido cargada"))
 
@@ -215,35 +300,199 @@ class CommandHandler:
     def _answer_queries(
         self, queries: Sequence[QueryText], debug: bool = False
     ) -> None:
-        """If there are multiple queries, the conversation ends after executing them."""
+        """
+        If there are multiple queries, the conversation ends after executing them.
+        Every query starts from the same previous messages, and the first resulting
+        conversation is kept as the current one (the others are saved as new
+        conversations).
+        """
         assert queries
+        if self._stream_responses and len(queries) == 1:
+            self._answer_streamed_query(queries[0], debug)
+            return
+        base_messages = list(self._prev_messages)
+        if self._packed_queries_size > 1 and len(queries) > 1 and not debug:
+            query_results = self._get_packed_query_results(queries, base_messages)
+        else:
+            query_results = self._get_query_results(queries, base_messages, debug)
         messages = None
-        for i, query in enumerate(queries):
-            messages = self._answer_query(debug, i + 1, len(queries), query)
+        for current, query in enumerate(queries, start=1):
+            self._view.display_processing_query_text(
+                current=current, total=len(queries)
+            )
+            query_result = next(query_results)
+            self._print_interaction(query, query_result)
+            if current == 1:
+                self._conversation_saver.save(query_result.messages)
+                messages = query_result.messages
+            else:
+                self._repository.save_messages(query_result.messages)
         self._prev_messages[:] = messages or []
 
-    def _answer_query(
-        self, debug: bool, current: int, total: int, query: QueryText
-    ) -> list[CompleteMessage] | None:
-        self._view.display_processing_query_text(current=current, total=total)
-        query_result = self._get_simple_response_from_model(query, debug)
-        self._print_interaction(query, query_result)
-        self._repository.save_messages(query_result.messages)
-        return query_result.messages if current == 1 else None
+    def _answer_streamed_query(self, query: QueryText, debug: bool = False) -> None:
+        """
+        Answers a single query, displaying the response as it is streamed. The
+        header is printed once the model that answers is known.
+        """
+        self._view.display_processing_query_text(current=1, total=1)
+        answering_models: list[Model] = []
+
+        def print_header(model: Model) -> None:
+            if answering_models:
+                self._view.finish_streamed_interaction()
+                self._view.display_neutral_msg(
+                    Raw(
+                        f"{answering_models[-1].model_name} ha superado el tiempo"
+                        f" límite, responde {model.model_name}"
+                    )
+                )
+            answering_models.append(model)
+            self._view.print_interaction_header(
+                self._time_manager, model.model_name, Raw(query)
+            )
+
+        query_result = self._get_simple_response_from_model(
+            query,
+            list(self._prev_messages),
+            debug,
+            on_delta=self._print_content_delta,
+            on_model=print_header,
+        )
+        self._view.finish_streamed_interaction()
+        self._conversation_saver.save(query_result.messages)
+        self._prev_messages[:] = query_result.messages
+
+    def _answer_with_samples(self, query: QueryText, number_of_samples: int) -> None:
+        """
+        Displays every candidate response and saves it as its own conversation,
+        branching from the current one. The conversation continues with the first.
+        """
+        self._view.display_processing_query_text(current=1, total=1)
+        multi_query_result = self._model_manager.get_responses(
+            query, list(self._prev_messages), number_of_samples
+        )
+        candidates = multi_query_result.candidates
+        for number, query_result in enumerate(candidates, start=1):
+            self._view.display_neutral_msg(
+                Raw(f"\nRespuesta candidata {number} de {len(candidates)}")
+            )
+            self._print_interaction(query, query_result)
+            if number == 1:
+                self._conversation_saver.save(query_result.messages)
+            else:
+                self._repository.save_messages(query_result.messages)
+        self._prev_messages[:] = candidates[0].messages
+
+    def _print_content_delta(self, delta: str) -> None:
+        self._view.print_content_delta(Raw(delta))
+
+    def _get_query_results(
+        self,
+        queries: Sequence[QueryText],
+        base_messages: Sequence[CompleteMessage],
+        debug: bool = False,
+    ) -> Iterator[QueryResult]:
+        """
+        Yields the results of the queries in their original order. They are sent
+        through a bounded pool of workers when the concurrent mode is active.
+        """
+
+        def get_query_result(query: QueryText) -> QueryResult:
+            return self._get_simple_response_from_model(
+                query, list(base_messages), debug
+            )
+
+        if self._concurrent_queries and len(queries) > 1 and not debug:
+            max_workers = self._get_max_in_flight_queries()
+            return map_in_order(get_query_result, queries, max_workers)
+        return (get_query_result(query) for query in queries)
+
+    def _get_packed_query_results(
+        self, queries: Sequence[QueryText], base_messages: Sequence[CompleteMessage]
+    ) -> Iterator[QueryResult]:
+        """
+        Yields the results of the queries in their original order, sending them in
+        packed queries. Every answer gets its own conversation, as if the query had
+        been sent on its own. The usage of a packed query is kept in the first of
+        them. When the answers of a packed query can not be separated, its queries
+        are sent individually.
+        """
+        packed_queries = pack_queries(queries, self._packed_queries_size)
+        packed_results = self._get_query_results(
+            [packed_query.text for packed_query in packed_queries], base_messages
+        )
+        for packed_query, packed_result in zip(packed_queries, packed_results):
+            answers = unpack_answers(packed_query, packed_result.content)
+            if answers is None:
+                logger.warning(
+                    "The answers of a packed query could not be separated,"
+                    " sending its queries individually"
+                )
+                yield from self._get_query_results(packed_query.queries, base_messages)
+                continue
+            # the previous messages, as trimmed to fit in the context window
+            prev_messages = packed_result.messages[:-2]
+            answering_model = packed_result.messages[-1].model
+            for number, (query, answer) in enumerate(
+                zip(packed_query.queries, answers)
+            ):
+                usage = packed_result.usage if number == 0 else None
+                messages = list(prev_messages)
+                add_user_query_in_place(messages, query)
+                messages.append(
+                    CompleteMessage(
+                        ChatMessage("assistant", answer), answering_model, usage
+                    )
+                )
+                yield QueryResult(answer, messages, usage)
+
+    def _get_max_in_flight_queries(self) -> int:
+        model = self._model_manager.model_wrapper.model
+        assert model
+        return get_max_in_flight_queries(model.platform)
 
     def _get_simple_response_from_model(
-        self, query: QueryText, debug: bool = False
+        self,
+        query: QueryText,
+        complete_messages: list[CompleteMessage],
+        debug: bool = False,
+        on_delta: DeltaCallback | None = None,
+        on_model: ModelCallback | None = None,
     ) -> QueryResult:
         return self._model_manager.get_simple_response(
-            query, self._prev_messages, debug=debug
+            query, complete_messages, debug=debug, on_delta=on_delta, on_model=on_model
         )
 
     def _print_interaction(self, query: QueryText, query_result: QueryResult) -> None:
-        model = self._model_manager.model_wrapper.model
-        assert model
+        """The model shown is the one that answered, which may not be the selected one"""
+        answering_model = (
+            query_result.messages[-1].model if query_result.messages else None
+        )
         self._view.print_interaction(
             self._time_manager,
-            model.model_name,
+            (answering_model.model_name if answering_model else self._get_model_name()),
             Raw(query),
             Raw(query_result.content),
         )
+
+    def _get_model_name(self) -> ModelName:
+        model = self._model_manager.model_wrapper.model
+        assert model
+        return model.model_name
+
+
+def get_max_in_flight_queries(platform: Platform | None) -> int:
+    """Returns the maximum number of concurrent queries allowed for the platform"""
+    if platform is None:
+        return DEFAULT_MAX_IN_FLIGHT_QUERIES
+    return MAX_IN_FLIGHT_QUERIES.get(platform, DEFAULT_MAX_IN_FLIGHT_QUERIES)
+
+
+def parse_number_of_samples(remaining_input: str) -> tuple[int, str]:
+    """Separates the number of candidate responses from the query"""
+    number, _, query = remaining_input.partition(" ")
+    if not number.isdigit() or not 1 <= int(number) <= MAX_SAMPLES_PER_QUERY:
+        raise ValueError(
+            f"The number of samples must be between 1 and {MAX_SAMPLES_PER_QUERY}"
+        )
+    return int(number), query
@@ -0,0 +1,54 @@
+"""
+Converts the chat files of `data/chats` into the content-addressed message store
+of `data/store`, where every message is saved only once, and reports the space
+saved. The chat files are kept; run it before setting USE_MESSAGE_STORE.
+
+Usage: python -m src.compact_chats
+"""
+
+import argparse
+
+from src.python_modules.FileSystemWrapper.file_manager import FileManager
+
+from src.infrastructure.chat_repository.compaction import compact_chat_files
+from src.infrastructure.chat_repository.message_store import (
+    MessageStoreRepository,
+)
+from src.infrastructure.chat_repository.repository import ChatRepository
+from src.infrastructure.main_path_provider import get_main_directory
+from src.infrastructure.now import TimeManager
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.compact_chats",
+        description="Converts the chat files into the content-addressed message store",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    parse_args()
+    file_manager = FileManager()
+    time_manager = TimeManager()
+    chat_repository = ChatRepository(
+        get_main_directory(), file_manager=file_manager, time_manager=time_manager
+    )
+    store = MessageStoreRepository(
+        get_main_directory(), file_manager=file_manager, time_manager=time_manager
+    )
+    report = compact_chat_files(chat_repository, store)
+    print(f"Converted: {report.converted}. Skipped: {len(report.skipped)}.")
+    if report.skipped:
+        print(f"Skipped conversations: {', '.join(report.skipped)}")
+    if report.chat_files_size:
+        print(
+            f"Chat files: {report.chat_files_size} bytes."
+            f" Added to the store: {report.store_size_increase} bytes."
+            f" Saved: {report.saved} bytes"
+            f" ({report.saved / report.chat_files_size:.0%})."
+        )
+
+
+if __name__ == "__main__":
+    main()
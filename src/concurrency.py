@@ -0,0 +1,117 @@
+import threading
+import time
+from collections.abc import Callable, Hashable, Iterable, Iterator, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Final, Generic, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def map_in_order(
+    function: Callable[[T], R], items: Iterable[T], max_workers: int
+) -> Iterator[R]:
+    """
+    Applies the function to every item using a bounded pool of threads.
+    Results are yielded in the original order of the items, as soon as each one is ready.
+    """
+    assert max_workers > 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        yield from executor.map(function, items)
+
+
+def map_as_completed(
+    function: Callable[[T], R], items: Iterable[T], max_in_flight: int
+) -> Iterator[tuple[T, "Future[R]"]]:
+    """
+    Applies the function to every item using a bounded pool of threads, yielding
+    each item with its finished future as soon as it completes. Items are consumed
+    lazily, so no more than max_in_flight of them are pending at any time.
+    """
+    assert max_in_flight > 0
+    iterator = iter(items)
+    pending: dict[Future[R], T] = {}
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        while True:
+            for item in iterator:
+                pending[executor.submit(function, item)] = item
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future
+
+
+def run_first_successful(
+    functions: Sequence[Callable[[threading.Event], R]],
+    timeout: float | None = None,
+) -> tuple[int, R]:
+    """
+    Runs the functions concurrently and returns the index and the result of the
+    first one that succeeds. Then the event received by all of them is set, so the
+    others can stop early, and they are not waited for. If all of them fail, the
+    error of the last one is raised, and TimeoutError if none has succeeded within
+    the timeout (in seconds).
+    """
+    assert functions
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    cancelled = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=len(functions))
+    futures: dict[Future[R], int] = {
+        executor.submit(function, cancelled): index
+        for index, function in enumerate(functions)
+    }
+    try:
+        pending = set(futures)
+        error: BaseException | None = None
+        while pending:
+            remaining = max(0, deadline - time.monotonic()) if deadline else None
+            done, pending = wait(
+                pending, timeout=remaining, return_when=FIRST_COMPLETED
+            )
+            if not done:
+                raise TimeoutError()
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    return futures[future], future.result()
+        assert error
+        raise error
+    finally:
+        cancelled.set()
+        executor.shutdown(wait=False)
+
+
+class SingleFlight(Generic[R]):
+    """
+    Coalesces concurrent calls with the same key: while a call is in flight, the
+    other calls with its key wait for it and get its result (or its error) instead
+    of running their function.
+    """
+
+    def __init__(self) -> None:
+        self._lock: Final = threading.Lock()
+        self._in_flight: dict[Hashable, Future[R]] = {}
+
+    def run(self, key: Hashable, function: Callable[[], R]) -> R:
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                future = self._in_flight[key] = Future()
+                leader = True
+            else:
+                leader = False
+        if not leader:
+            return future.result()
+        try:
+            result = function()
+            future.set_result(result)
+            return result
+        except BaseException as err:
+            future.set_exception(err)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
@@ -16,6 +16,10 @@ class ActionType(Enum):
     LOAD_CONVERSATION = "LOAD_CONVERSATION"
     LOAD_MESSAGES = "LOAD_MESSAGES"
     SYSTEM_PROMPT = "SYSTEM_PROMPT"
+    STATS = "STATS"
+    USAGE = "USAGE"
+    SAMPLES = "SAMPLES"
+    LIST_CONVERSATIONS = "LIST_CONVERSATIONS"
 
 
 @dataclass
@@ -39,6 +43,10 @@ command_map = {
     ActionType.CHANGE_MODEL: ("change",),
     ActionType.SHOW_MODEL: ("show",),
     ActionType.SYSTEM_PROMPT: ("sys", "system"),
+    ActionType.STATS: ("stats",),
+    ActionType.USAGE: ("usage",),
+    ActionType.SAMPLES: ("n", "samples"),
+    ActionType.LIST_CONVERSATIONS: ("list",),
 }
 
 COMMAND_PREFIX = "/"
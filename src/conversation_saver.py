@@ -0,0 +1,46 @@
+from collections.abc import Sequence
+from typing import Final
+
+from src.domain import CompleteMessage, ConversationId
+from src.protocols import ChatRepositoryProtocol
+
+
+class ConversationSaver:
+    """
+    Saves the current conversation of a session. While the conversation continues
+    (its messages start with the ones already saved), only the new messages are
+    appended to it, keeping its id. Otherwise, as after starting a new conversation
+    or trimming the history, the messages are saved as a new conversation.
+    """
+
+    def __init__(self, repository: ChatRepositoryProtocol):
+        self._repository: Final = repository
+        self._conversation_id: ConversationId | None = None
+        self._saved_messages: list[CompleteMessage] = []
+
+    @property
+    def conversation_id(self) -> ConversationId | None:
+        return self._conversation_id
+
+    def save(self, complete_messages: Sequence[CompleteMessage]) -> None:
+        saved_count = len(self._saved_messages)
+        if (
+            self._conversation_id is not None
+            and len(complete_messages) > saved_count
+            and list(complete_messages[:saved_count]) == self._saved_messages
+        ):
+            self._repository.append_messages(
+                self._conversation_id, complete_messages[saved_count:]
+            )
+        else:
+            self._conversation_id = self._repository.save_messages(complete_messages)
+        self._saved_messages = list(complete_messages)
+
+    def resume(
+        self,
+        conversation_id: ConversationId,
+        complete_messages: Sequence[CompleteMessage],
+    ) -> None:
+        """The conversation loaded is continued, so its new messages are appended to it"""
+        self._conversation_id = conversation_id
+        self._saved_messages = list(complete_messages)
@@ -1,11 +1,18 @@
+from collections.abc import Callable, Sequence
 from dataclasses import dataclass, field
 from enum import Enum
+from functools import cached_property
 from typing import NewType
 
+from src.models.tokens import TOKENS_PER_MESSAGE, estimate_tokens
+
 ConversationId = NewType("ConversationId", str)
 ModelName = NewType("ModelName", str)
 SchemaVersionId = NewType("SchemaVersionId", str)
 
+# Receives each fragment of the content of a response as it is streamed
+DeltaCallback = Callable[[str], None]
+
 
 @dataclass(frozen=True)
 class ChatMessage:
@@ -27,10 +34,48 @@ class Model:
     model_name: ModelName
 
 
+@dataclass(frozen=True)
+class TokenUsage:
+    prompt_tokens: int
+    completion_tokens: int
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def __add__(self, other: "TokenUsage") -> "TokenUsage":
+        return TokenUsage(
+            self.prompt_tokens + other.prompt_tokens,
+            self.completion_tokens + other.completion_tokens,
+        )
+
+
+@dataclass(frozen=True)
+class ModelResponse:
+    """Message generated by a model, with the tokens used (when reported by the API)"""
+
+    chat_msg: ChatMessage
+    usage: TokenUsage | None = None
+
+
+@dataclass(frozen=True)
+class MultiModelResponse:
+    """Several messages generated in a single request, with the tokens used by all"""
+
+    chat_msgs: Sequence[ChatMessage]
+    usage: TokenUsage | None = None
+
+
 @dataclass(frozen=True)
 class CompleteMessage:
     chat_msg: ChatMessage
     model: Model | None = None
+    usage: TokenUsage | None = None
+
+    @cached_property
+    def estimated_tokens(self) -> int:
+        """Rough number of tokens needed to send the message, computed only once"""
+        return TOKENS_PER_MESSAGE + estimate_tokens(self.chat_msg.content)
 
 
 @dataclass
@@ -43,3 +88,15 @@ class ConversationText:
 class QueryResult:
     content: str
     messages: list[CompleteMessage]
+    usage: TokenUsage | None = None
+
+
+@dataclass(frozen=True)
+class MultiQueryResult:
+    """
+    Candidate responses to the same messages. Every candidate has its own messages:
+    the common ones followed by its response. usage is the total of all of them.
+    """
+
+    candidates: Sequence[QueryResult]
+    usage: TokenUsage | None = None
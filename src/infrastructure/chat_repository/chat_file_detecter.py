@@ -2,6 +2,7 @@ import re
 from pathlib import PurePath
 from typing import Iterable
 
+from src.python_modules.FileSystemWrapper.compression import Compression
 from src.python_modules.FileSystemWrapper.file_manager_protocol import (
     FileManagerProtocol,
 )
@@ -9,26 +10,49 @@ from src.python_modules.FileSystemWrapper.file_manager_protocol import (
 from src.serde import NUMBER_OF_DIGITS
 
 CHAT_EXT = "chat"
-CHAT_NAME_PATTERN = re.compile(rf"^(\d{{{NUMBER_OF_DIGITS}}})\.{CHAT_EXT}$")
+
+
+def create_name_pattern(extension: str) -> re.Pattern[str]:
+    return re.compile(rf"^(\d{{{NUMBER_OF_DIGITS}}})\.{extension}$")
+
+
+COMPRESSION_EXTS = "|".join(compression.extension for compression in Compression)
+# chat files can be compressed, as 0001.chat.gz
+CHAT_NAME_PATTERN = re.compile(
+    rf"^(\d{{{NUMBER_OF_DIGITS}}})\.{CHAT_EXT}(?:\.(?:{COMPRESSION_EXTS}))?$"
+)
 
 
 class ChatFileDetecter:
     """Clase que identifica y filtra los chat files de un iterable de PathWrappers"""
 
-    def __init__(self, file_manager: FileManagerProtocol):
+    def __init__(self, file_manager: FileManagerProtocol, extension: str | None = None):
+        """Without extension, the chat files are identified"""
         self._file_manager = file_manager
+        self._name_pattern = (
+            create_name_pattern(extension) if extension else CHAT_NAME_PATTERN
+        )
 
     def filter_chat_files(self, paths: Iterable[PurePath]) -> list[PurePath]:
         return [p for p in paths if self._is_chat_file(p)]
 
+    def get_chat_file_names(self, directory: PurePath) -> list[str]:
+        return [
+            name
+            for name in self._file_manager.get_file_names(directory)
+            if match_chat_file_pattern(name, self._name_pattern)
+        ]
+
     def _is_chat_file(self, path: PurePath) -> bool:
         assert self._file_manager.path_exists(path)
         if self._file_manager.path_is_dir(path):
             return False
-        return match_chat_file_pattern(path.name)
+        return match_chat_file_pattern(path.name, self._name_pattern)
 
 
-def match_chat_file_pattern(filename: str) -> bool:
+def match_chat_file_pattern(
+    filename: str, name_pattern: re.Pattern[str] = CHAT_NAME_PATTERN
+) -> bool:
     assert "/" not in filename
     assert "\\" not in filename
-    return bool(CHAT_NAME_PATTERN.match(filename))
+    return bool(name_pattern.match(filename))
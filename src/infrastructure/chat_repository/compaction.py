@@ -0,0 +1,81 @@
+from dataclasses import dataclass, field
+
+from src.domain import ConversationId
+from src.serde import deserialize_header
+from src.serde.deserialize import TagType, get_tag_type
+
+from .message_store import MessageStoreRepository, serialize_stored_header
+from .repository import ChatRepository
+from .snapshots import ROLE_TAG_START
+
+
+@dataclass
+class CompactionReport:
+    """Sizes in bytes of the chat files converted and of what they added to the store"""
+
+    converted: int = 0
+    skipped: list[ConversationId] = field(default_factory=list)
+    chat_files_size: int = 0
+    store_size_increase: int = 0
+
+    @property
+    def saved(self) -> int:
+        return self.chat_files_size - self.store_size_increase
+
+
+def compact_chat_files(
+    chat_repository: ChatRepository, store: MessageStoreRepository
+) -> CompactionReport:
+    """
+    Copies the conversations of the chat files into the message store, keeping their
+    ids. The chat files are not modified. Conversations already in the store, and
+    chat files that would not be restored exactly from the store, are skipped.
+    """
+    report = CompactionReport()
+    stored_ids = set(store.get_conversation_ids())
+    initial_store_size = store.get_size()
+    for conversation_id in sorted(chat_repository.get_conversation_ids()):
+        text = chat_repository.load_conversation_as_conversation_text(
+            conversation_id
+        ).text
+        message_texts = split_message_texts(text)
+        try:
+            header = deserialize_header(text.split("\n"))
+        except (AssertionError, ValueError):  # the header is not valid
+            header = None
+        if (
+            conversation_id in stored_ids
+            or header is None
+            or header.id != conversation_id
+            or header.number_of_messages != len(message_texts)
+            or serialize_stored_header(header)
+            + "".join(f"\n\n{message_text}" for message_text in message_texts)
+            != text
+        ):
+            report.skipped.append(conversation_id)
+            continue
+        store.import_conversation(header, message_texts)
+        report.converted += 1
+        report.chat_files_size += chat_repository.get_conversation_file_size(
+            conversation_id
+        )
+    report.store_size_increase = store.get_size() - initial_store_size
+    return report
+
+
+def split_message_texts(conversation_text: str) -> list[str]:
+    """
+    Splits the messages of a chat file into texts that start with their role tag.
+    Parts that do not start with a valid role tag are left out.
+    """
+    start = conversation_text.find(ROLE_TAG_START)
+    if start == -1:
+        return []
+    role_tag_prefix = ROLE_TAG_START.lstrip("\n")
+    parts = conversation_text[start + len(ROLE_TAG_START) :].split(ROLE_TAG_START)
+    message_texts = [role_tag_prefix + part for part in parts]
+    return [
+        message_text
+        for message_text in message_texts
+        if get_tag_type(message_text.split("\n", 1)[0]) is TagType.ROLE
+    ]
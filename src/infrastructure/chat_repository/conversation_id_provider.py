@@ -51,7 +51,7 @@ class FreeConversationIdProvider:
 
 
 def get_max_stem_value(chat_files: Iterable[PurePath]) -> int | None:
-    values = (int(p.stem) for p in chat_files)
+    values = (int(p.name.split(".")[0]) for p in chat_files)
     return max(values, default=None)
 
 
@@ -1,6 +1,8 @@
+import uuid
 from pathlib import PurePath
 from typing import Final
 
+from src.python_modules.FileSystemWrapper.compression import Compression
 from src.python_modules.FileSystemWrapper.file_manager_protocol import (
     FileManagerProtocol,
 )
@@ -49,17 +51,48 @@ class ChatRepositoryImplementer:
 
     def get_conversation_ids(self) -> list[ConversationId]:
         assert self.is_initialized
-        children = self._file_manager.get_children(self._chats_dir)
-        paths = self._chat_detecter.filter_chat_files(children)
+        names = self._chat_detecter.get_chat_file_names(self._chats_dir)
         ids: list[ConversationId] = []
-        for path in paths:
-            id_as_text = path.name.split(".")[0]
+        for name in names:
+            id_as_text = name.split(".")[0]
             ids.append(ConversationId(id_as_text))
         return ids
 
-    def build_chat_path(self, conversation_id: ConversationId) -> PurePath:
+    def build_chat_path(
+        self, conversation_id: ConversationId, compression: Compression | None = None
+    ) -> PurePath:
         filename = conversation_id + "." + CHAT_EXT
+        if compression:
+            filename += "." + compression.extension
         return self._chats_dir / filename
 
     def get_new_conversation_id(self) -> ConversationId:
         return self._conversation_id_provider.get_next_free_conversation_id()
+
+
+def append_with_new_header(
+    file_manager: FileManagerProtocol,
+    path: PurePath,
+    text: str,
+    *,
+    saved_header: str,
+    new_header: str,
+    compression: Compression | None = None,
+) -> None:
+    """
+    Appends the text to a file that starts with saved_header, replacing it with
+    new_header. The new content is written to a temporary file that then replaces
+    the original one, so an interrupted write leaves the file as it was.
+    """
+    saved_text = file_manager.read_file(path, compression)
+    if not saved_text.startswith(saved_header):
+        raise ValueError(f"Unexpected header in {path.name}")
+    tmp_path = path.parent / f"_write_{uuid.uuid4().hex}.tmp"
+    try:
+        file_manager.write_file(
+            tmp_path, new_header + saved_text[len(saved_header) :] + text, compression
+        )
+        file_manager.replace_path(tmp_path, path)
+    finally:
+        if file_manager.path_exists(tmp_path):
+            file_manager.unlink_path(tmp_path)
@@ -0,0 +1,211 @@
+import hashlib
+import uuid
+from collections.abc import Sequence
+from contextlib import closing
+from pathlib import PurePath
+from typing import TYPE_CHECKING, Final
+
+from src.python_modules.FileSystemWrapper.file_manager_protocol import (
+    FileManagerProtocol,
+)
+
+from src.domain import CompleteMessage, ConversationId, ConversationText
+from src.protocols import TimeManagerProtocol
+from src.serde import ConversationHeader, deserialize_header
+from src.serde.deserialize import deserialize_conversation_text_into_messages
+from src.serde.serialize import serialize_header, serialize_message
+from src.serde.shared import SCHEMA_VERSION
+
+from .chat_file_detecter import ChatFileDetecter
+from .conversation_id_provider import FreeConversationIdProvider
+from .implementer import append_with_new_header
+
+CONVERSATION_EXT = "conv"
+MESSAGE_EXT = "msg"
+
+
+class MessageStoreLocation:
+    def __init__(self, main_directory: PurePath):
+        self._store_dir: Final = main_directory / "data" / "store"
+        self._messages_dir: Final = self._store_dir / "messages"
+        self._conversations_dir: Final = self._store_dir / "conversations"
+
+    @property
+    def store_dir(self) -> PurePath:
+        return self._store_dir
+
+    @property
+    def messages_dir(self) -> PurePath:
+        return self._messages_dir
+
+    @property
+    def conversations_dir(self) -> PurePath:
+        return self._conversations_dir
+
+
+class MessageStoreRepository:
+    """
+    Chat repository where every message is saved only once, in a file named after
+    the SHA-256 of its text, and every conversation is the header of a chat file
+    followed by the hashes of its messages. The messages shared by several
+    conversations, as the history of the queries of a /for, are not written again.
+    """
+
+    def __init__(
+        self,
+        main_directory: PurePath,
+        *,
+        file_manager: FileManagerProtocol,
+        time_manager: TimeManagerProtocol,
+    ) -> None:
+        self._file_manager = file_manager
+        self._time_manager = time_manager
+        self._location = MessageStoreLocation(main_directory)
+        self._detecter = ChatFileDetecter(file_manager, CONVERSATION_EXT)
+        self._conversation_id_provider = FreeConversationIdProvider(
+            file_manager, self._detecter, self._location.conversations_dir
+        )
+        self._setup_file_system()
+
+    def get_conversation_ids(self) -> list[ConversationId]:
+        names = self._detecter.get_chat_file_names(self._location.conversations_dir)
+        return [ConversationId(name.split(".")[0]) for name in names]
+
+    def save_messages(
+        self, complete_messages: Sequence[CompleteMessage]
+    ) -> ConversationId:
+        """Saves the messages as a new conversation and returns its id"""
+        conversation_id = self._conversation_id_provider.get_next_free_conversation_id()
+        header = ConversationHeader(
+            conversation_id,
+            SCHEMA_VERSION,
+            len(complete_messages),
+            self._time_manager.get_current_time(),
+        )
+        self.import_conversation(
+            header, [serialize_message(message) for message in complete_messages]
+        )
+        return conversation_id
+
+    def append_messages(
+        self,
+        conversation_id: ConversationId,
+        complete_messages: Sequence[CompleteMessage],
+    ) -> None:
+        """Adds the hashes of the messages at the end of a saved conversation"""
+        header = self.load_conversation_header(conversation_id)
+        hashes = [
+            self._store_message(serialize_message(message))
+            for message in complete_messages
+        ]
+        append_with_new_header(
+            self._file_manager,
+            self._build_conversation_path(conversation_id),
+            serialize_hashes(hashes),
+            saved_header=serialize_stored_header(header),
+            new_header=serialize_header(
+                conversation_id,
+                header.number_of_messages + len(complete_messages),
+                self._time_manager.get_current_time(),
+            ),
+        )
+
+    def import_conversation(
+        self, header: ConversationHeader, message_texts: Sequence[str]
+    ) -> None:
+        """
+        Saves a conversation with the given header. Every message text is a role
+        tag followed by the content, as in a chat file.
+        """
+        assert header.number_of_messages == len(message_texts)
+        hashes = [self._store_message(text) for text in message_texts]
+        self._file_manager.write_file(
+            self._build_conversation_path(header.id),
+            serialize_stored_header(header) + "\n" + serialize_hashes(hashes),
+        )
+
+    def load_conversation(
+        self, conversation_id: ConversationId
+    ) -> list[CompleteMessage]:
+        conversation = self.load_conversation_as_conversation_text(conversation_id)
+        return deserialize_conversation_text_into_messages(conversation)
+
+    def load_conversation_as_conversation_text(
+        self, conversation_id: ConversationId
+    ) -> ConversationText:
+        """The conversation as it would be saved in a chat file"""
+        lines = self._file_manager.read_file(
+            self._build_conversation_path(conversation_id)
+        ).split("\n")
+        header = deserialize_header(lines)
+        texts = [serialize_stored_header(header)]
+        for message_hash in parse_hashes(lines):
+            texts.append(
+                self._file_manager.read_file(self._build_message_path(message_hash))
+            )
+        return ConversationText("\n\n".join(texts), SCHEMA_VERSION)
+
+    def load_conversation_header(
+        self, conversation_id: ConversationId
+    ) -> ConversationHeader:
+        filepath = self._build_conversation_path(conversation_id)
+        with closing(self._file_manager.iter_lines(filepath)) as lines:
+            return deserialize_header(lines)
+
+    def get_size(self) -> int:
+        """Total size in bytes of the files of the conversations and the messages"""
+        file_manager = self._file_manager
+        paths = file_manager.get_children(self._location.conversations_dir)
+        for directory in file_manager.get_children(self._location.messages_dir):
+            paths.extend(file_manager.get_children(directory))
+        return sum(file_manager.get_file_size(path) for path in paths)
+
+    def _store_message(self, text: str) -> str:
+        """Saves the message text unless it is already saved, and returns its hash"""
+        message_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        filepath = self._build_message_path(message_hash)
+        file_manager = self._file_manager
+        if not file_manager.path_exists(filepath):
+            file_manager.mkdir_if_not_exists(filepath.parent)
+            # a partially written message would be taken as saved forever
+            tmp_path = filepath.parent / f"_write_{uuid.uuid4().hex}.tmp"
+            file_manager.write_file(tmp_path, text)
+            file_manager.rename_path(tmp_path, filepath)
+        return message_hash
+
+    def _build_conversation_path(self, conversation_id: ConversationId) -> PurePath:
+        return (
+            self._location.conversations_dir / f"{conversation_id}.{CONVERSATION_EXT}"
+        )
+
+    def _build_message_path(self, message_hash: str) -> PurePath:
+        filename = f"{message_hash}.{MESSAGE_EXT}"
+        return self._location.messages_dir / message_hash[:2] / filename
+
+    def _setup_file_system(self) -> None:
+        self._file_manager.mkdir_if_not_exists(self._location.store_dir.parent)
+        self._file_manager.mkdir_if_not_exists(self._location.store_dir)
+        self._file_manager.mkdir_if_not_exists(self._location.messages_dir)
+        self._file_manager.mkdir_if_not_exists(self._location.conversations_dir)
+
+
+def serialize_stored_header(header: ConversationHeader) -> str:
+    return serialize_header(
+        header.id, header.number_of_messages, header.current_time, header.schema_version
+    )
+
+
+def serialize_hashes(hashes: Sequence[str]) -> str:
+    return "".join(f"\n{message_hash}" for message_hash in hashes)
+
+
+def parse_hashes(lines: Sequence[str]) -> list[str]:
+    """The lines of a stored conversation that are neither tags nor empty"""
+    return [line for line in lines if line and not line.startswith("[")]
+
+
+if TYPE_CHECKING:
+    from src.protocols import ChatRepositoryProtocol
+
+    repository: MessageStoreRepository
+    protocol: ChatRepositoryProtocol = repository  # pyright: ignore
@@ -1,18 +1,32 @@
 from collections.abc import Sequence
+from contextlib import closing
 from pathlib import PurePath
 from typing import TYPE_CHECKING
 
+from src.python_modules.FileSystemWrapper.compression import Compression
 from src.python_modules.FileSystemWrapper.file_manager_protocol import (
     FileManagerProtocol,
 )
+from src.python_modules.FileSystemWrapper.safe_file_remover import (
+    SafeFileRemover,
+)
 
 from src.domain import CompleteMessage, ConversationId, ConversationText
 from src.protocols import TimeManagerProtocol
-from src.serde import serialize_conversation
+from src.serde import (
+    ConversationHeader,
+    deserialize_header,
+    serialize_conversation,
+)
 from src.serde.deserialize import deserialize_conversation_text_into_messages
+from src.serde.serialize import serialize_header, serialize_messages
 from src.serde.shared import SCHEMA_VERSION
 
-from .implementer import ChatRepositoryImplementer, DataLocation
+from .implementer import (
+    ChatRepositoryImplementer,
+    DataLocation,
+    append_with_new_header,
+)
 
 
 class ChatRepository:
@@ -22,9 +36,17 @@ class ChatRepository:
         *,
         file_manager: FileManagerProtocol,
         time_manager: TimeManagerProtocol,
+        compression: Compression | None = None,
     ) -> None:
+        """
+        With compression, the new chat files are saved compressed. The chat files
+        saved with another compression (or none) are still read and appended to.
+        """
+        if compression and not compression.is_available:
+            raise ValueError(f"Compression {compression.name} is not available")
         self._file_manager = file_manager
         self._time_manager = time_manager
+        self._compression = compression
         self._implementer = ChatRepositoryImplementer()
         self._data_location = DataLocation(main_directory)
         self._implementer.init(
@@ -36,13 +58,50 @@ class ChatRepository:
     def get_conversation_ids(self) -> list[ConversationId]:
         return self._implementer.get_conversation_ids()
 
-    def save_messages(self, complete_messages: Sequence[CompleteMessage]) -> None:
+    def save_messages(
+        self, complete_messages: Sequence[CompleteMessage]
+    ) -> ConversationId:
+        """Saves the messages as a new conversation and returns its id"""
         conversation_id = self._implementer.get_new_conversation_id()
         current_time = self._time_manager.get_current_time()
         conversation = serialize_conversation(
             complete_messages, conversation_id, current_time
         )
         self._save_conversation(conversation_id, conversation)
+        return conversation_id
+
+    def append_messages(
+        self,
+        conversation_id: ConversationId,
+        complete_messages: Sequence[CompleteMessage],
+    ) -> None:
+        """
+        Adds the messages at the end of a saved conversation. Only the messages and
+        the header are written, leaving the file as if the whole conversation had
+        been saved at once. The file is rewritten only when the size of the header
+        changes, as when the number of messages gets one more digit.
+        """
+        filepath, compression = self._find_chat_file(conversation_id)
+        header = self.load_conversation_header(conversation_id)
+        saved_header = serialize_header(
+            header.id,
+            header.number_of_messages,
+            header.current_time,
+            header.schema_version,
+        )
+        new_header = serialize_header(
+            conversation_id,
+            header.number_of_messages + len(complete_messages),
+            self._time_manager.get_current_time(),
+        )
+        append_with_new_header(
+            self._file_manager,
+            filepath,
+            serialize_messages(complete_messages),
+            saved_header=saved_header,
+            new_header=new_header,
+            compression=compression,
+        )
 
     def load_conversation(
         self, conversation_id: ConversationId
@@ -53,8 +112,27 @@ class ChatRepository:
     def load_conversation_as_conversation_text(
         self, conversation_id: ConversationId
     ) -> ConversationText:
-        filepath = self._implementer.build_chat_path(conversation_id)
-        return ConversationText(self._file_manager.read_file(filepath), SCHEMA_VERSION)
+        filepath, compression = self._find_chat_file(conversation_id)
+        return ConversationText(
+            self._file_manager.read_file(filepath, compression), SCHEMA_VERSION
+        )
+
+    def load_conversation_header(
+        self, conversation_id: ConversationId
+    ) -> ConversationHeader:
+        """Reads only the META tags at the start of the file, not the messages"""
+        filepath, compression = self._find_chat_file(conversation_id)
+        with closing(self._file_manager.iter_lines(filepath, compression)) as lines:
+            return deserialize_header(lines)
+
+    def remove_conversation(self, conversation_id: ConversationId) -> None:
+        filepath, _ = self._find_chat_file(conversation_id)
+        SafeFileRemover(self._file_manager).remove_file(filepath)
+
+    def get_conversation_file_size(self, conversation_id: ConversationId) -> int:
+        """Size in bytes of the chat file, compressed if it is"""
+        filepath, _ = self._find_chat_file(conversation_id)
+        return self._file_manager.get_file_size(filepath)
 
     def _setup_file_system(self) -> None:
         self._file_manager.mkdir_if_not_exists(self._data_location.data_dir)
@@ -63,8 +141,25 @@ class ChatRepository:
     def _save_conversation(
         self, conversation_id: ConversationId, conversation_as_text: str
     ) -> None:
-        filepath = self._implementer.build_chat_path(conversation_id)
-        self._file_manager.write_file(filepath, conversation_as_text)
+        filepath = self._implementer.build_chat_path(conversation_id, self._compression)
+        self._file_manager.write_file(filepath, conversation_as_text, self._compression)
+
+    def _find_chat_file(
+        self, conversation_id: ConversationId
+    ) -> tuple[PurePath, Compression | None]:
+        """
+        Returns the path of the chat file of the conversation and its compression,
+        looking first for the one of the repository
+        """
+        compressions = [self._compression, None, *Compression]
+        for compression in dict.fromkeys(compressions):
+            filepath = self._implementer.build_chat_path(conversation_id, compression)
+            if self._file_manager.path_exists(filepath):
+                return filepath, compression
+        return (
+            self._implementer.build_chat_path(conversation_id, self._compression),
+            self._compression,
+        )
 
 
 if TYPE_CHECKING:
@@ -0,0 +1,42 @@
+from collections.abc import Mapping
+
+from src.domain import ConversationId
+
+ROLE_TAG_START = "\n\n[ROLE "
+
+
+def get_messages_text(conversation_text: str) -> str:
+    """Returns the serialized messages of a chat file, without its header"""
+    start = conversation_text.find(ROLE_TAG_START)
+    if start == -1:
+        return ""
+    return conversation_text[start:]
+
+
+def find_superseded_snapshots(
+    conversation_texts: Mapping[ConversationId, str],
+) -> list[ConversationId]:
+    """
+    Before conversations were appended to, every turn was saved as a new snapshot
+    of the whole conversation. A snapshot is superseded when its messages are the
+    first messages of another conversation, or the same messages as a conversation
+    with a higher id. Conversations without messages are never superseded.
+    """
+    entries = sorted(
+        (get_messages_text(text), conversation_id)
+        for conversation_id, text in conversation_texts.items()
+    )
+    superseded: list[ConversationId] = []
+    for index, (messages_text, conversation_id) in enumerate(entries):
+        if not messages_text:
+            continue
+        # every text that starts with this one is sorted right after it
+        for other_text, _ in entries[index + 1 :]:
+            if not other_text.startswith(messages_text):
+                break
+            if len(other_text) == len(messages_text) or other_text.startswith(
+                ROLE_TAG_START, len(messages_text)
+            ):
+                superseded.append(conversation_id)
+                break
+    return sorted(superseded)
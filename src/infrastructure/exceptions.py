@@ -1,3 +1,6 @@
+from collections.abc import Sequence
+
+
 class LLMChatException(Exception):
     def __init__(self, reason: str):
         super().__init__(reason)
@@ -10,13 +13,48 @@ class ClientNotDefined(LLMChatException):
         )
 
 
-class TooManyRequests(LLMChatException):
-    def __init__(self, total: int, seconds: float):
-        super().__init__(f"Too many API requests: {total} in {seconds} seconds")
-
-
 class APIConnectionError(LLMChatException):
     def __init__(self, api_name: str):
         super().__init__(
             f"Connection error with the {api_name} API. Please check your internet connection."
         )
+
+
+class APIRequestError(LLMChatException):
+    """The API could not answer the request (status_code is None when there was no response)"""
+
+    def __init__(
+        self,
+        api_name: str,
+        status_code: int | None,
+        detail: str,
+        *,
+        retry_after: float | None = None,
+    ):
+        super().__init__(
+            f"Request to the {api_name} API failed (status {status_code}): {detail}"
+        )
+        self.api_name = api_name
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitOpen(LLMChatException):
+    def __init__(self, api_name: str, seconds: float):
+        super().__init__(
+            f"The {api_name} API seems to be down. Requests are suspended for {seconds:.0f} more seconds."
+        )
+
+
+class RequestCancelled(LLMChatException):
+    """Raised inside a request that is no longer needed"""
+
+    def __init__(self, model_name: str):
+        super().__init__(f"The request to {model_name} was cancelled")
+
+
+class LatencyBudgetExceeded(LLMChatException):
+    def __init__(self, model_names: Sequence[str], seconds: float):
+        super().__init__(
+            f"No response from {', '.join(model_names)} within the latency budget of {seconds:.1f} seconds."
+        )
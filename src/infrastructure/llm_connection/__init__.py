@@ -1,3 +1,14 @@
+from .async_client_wrapper import AsyncClientWrapper
 from .client_wrapper import ClientWrapper
+from .fake_client_wrapper import FakeBehavior, FakeClientWrapper
+from .metrics import MetricsRecorder
+from .response_cache import ResponseCache
 
-__all__ = ["ClientWrapper"]
+__all__ = [
+    "AsyncClientWrapper",
+    "ClientWrapper",
+    "FakeBehavior",
+    "FakeClientWrapper",
+    "MetricsRecorder",
+    "ResponseCache",
+]
@@ -0,0 +1,172 @@
+from typing import TYPE_CHECKING, Any, Sequence
+
+from src.domain import (
+    ChatMessage,
+    CompleteMessage,
+    Model,
+    ModelResponse,
+    Platform,
+    QueryResult,
+)
+from src.infrastructure.exceptions import ClientNotDefined, LLMChatException
+from src.models.messages_ops import add_user_query_in_place
+from src.models.shared import extract_chat_messages
+from src.models.tokens import estimate_messages_tokens
+from src.setup_logging import configure_logger
+
+from .mistral_client_wrapper import AsyncMistralClientWrapper
+from .openai_client_wrapper import AsyncOpenAIClientWrapper
+from .rate_limiter import RateLimiter
+from .retry import RetryHandler
+from .transport import (
+    TransportSettings,
+    create_async_http_client,
+    create_async_transport,
+    get_platform_transport_settings,
+)
+
+logger = configure_logger(__name__)
+
+
+class AsyncClientWrapper:
+    """
+    Asyncio counterpart of ClientWrapper. Many requests can be kept in flight on
+    a single thread by awaiting them concurrently (e.g. with asyncio.gather).
+    """
+
+    def __init__(
+        self,
+        *,
+        mistral_api_key: str | None = None,
+        openai_api_key: str | None = None,
+        rate_limiter: RateLimiter | None = None,
+        retry_handler: RetryHandler | None = None,
+        transport_settings: TransportSettings | None = None,
+    ):
+        self._rate_limiter = rate_limiter or RateLimiter()
+        self._retry_handler = retry_handler or RetryHandler()
+        # connection pool shared by the clients of both platforms
+        self._transport = create_async_transport(transport_settings)
+        self._mistralai_client_wrapper = None
+        self._openai_client_wrapper = None
+        if mistral_api_key:
+            self._mistralai_client_wrapper = AsyncMistralClientWrapper(
+                mistral_api_key,
+                create_async_http_client(
+                    self._transport,
+                    get_platform_transport_settings(
+                        Platform.Mistral, transport_settings
+                    ),
+                ),
+            )
+        if openai_api_key:
+            self._openai_client_wrapper = AsyncOpenAIClientWrapper(
+                openai_api_key,
+                create_async_http_client(
+                    self._transport,
+                    get_platform_transport_settings(
+                        Platform.OpenAI, transport_settings
+                    ),
+                ),
+            )
+
+    async def get_simple_response_to_query(
+        self,
+        model: Model,
+        query: str,
+        prev_messages: Sequence[CompleteMessage] | None,
+        *,
+        tools: list[dict[str, Any]] | None = None,
+        tool_choice: str = "none",
+        random_seed: int | None = None,
+    ) -> QueryResult:
+        """
+        Retrieves a simple response from the LLM client.
+        """
+
+        complete_messages = list(prev_messages) if prev_messages else []
+        add_user_query_in_place(complete_messages, query)
+        return await self.get_simple_response(
+            model,
+            complete_messages,
+            tools=tools,
+            tool_choice=tool_choice,
+            random_seed=random_seed,
+        )
+
+    async def get_simple_response(
+        self,
+        model: Model,
+        complete_messages: list[CompleteMessage],
+        *,
+        tools: list[dict[str, Any]] | None = None,
+        tool_choice: str = "none",
+        random_seed: int | None = None,
+    ) -> QueryResult:
+        """
+        Retrieves a simple response from the LLM client.
+        """
+        messages: list[ChatMessage] = extract_chat_messages(complete_messages)
+
+        async def answer() -> ModelResponse:
+            await self._rate_limiter.acquire_async(
+                model, estimate_messages_tokens(messages)
+            )
+            return await self._answer(
+                model,
+                messages,
+                tools=tools,
+                tool_choice=tool_choice,
+                random_seed=random_seed,
+            )
+
+        response = await self._retry_handler.call_async(model.platform, answer)
+        complete_messages.append(
+            CompleteMessage(response.chat_msg, model, response.usage)
+        )
+        return QueryResult(response.chat_msg.content, complete_messages, response.usage)
+
+    async def _answer(
+        self,
+        model: Model,
+        messages: list[ChatMessage],
+        *,
+        tools: list[dict[str, Any]] | None,
+        tool_choice: str,
+        random_seed: int | None,
+    ) -> ModelResponse:
+        """Sends the messages to the client of the platform of the model"""
+        if model.platform == Platform.OpenAI:
+            if random_seed is not None:
+                raise LLMChatException(
+                    "Error: random_seed not currently supported with OpenAI API"
+                )
+            if not self._openai_client_wrapper:
+                raise ClientNotDefined("OpenAI", "OpenAI")
+            return await self._openai_client_wrapper.answer(
+                model, messages, tools=tools
+            )
+
+        elif model.platform == Platform.Mistral:
+            if not self._mistralai_client_wrapper:
+                raise ClientNotDefined("Mistral AI", "Mistral")
+            return await self._mistralai_client_wrapper.answer(
+                model,
+                messages,
+                tools=tools,
+                tool_choice=tool_choice,
+                random_seed=random_seed,
+            )
+
+        raise ValueError(f"Missing platform in model: {model}")
+
+    async def close(self) -> None:
+        """Closes the connection pool used by the SDK clients"""
+        await self._transport.aclose()
+
+
+if TYPE_CHECKING:
+    from src.protocols import AsyncClientWrapperProtocol
+
+    async_client_wrapper: AsyncClientWrapper
+    protocol: AsyncClientWrapperProtocol = async_client_wrapper  # pyright: ignore
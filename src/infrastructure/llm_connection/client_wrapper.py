@@ -1,52 +1,79 @@
+import math
 import time
-from typing import TYPE_CHECKING, Any, Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Sequence, TypeVar
 
+from src.concurrency import SingleFlight, map_in_order
 from src.domain import (
     ChatMessage,
     CompleteMessage,
+    DeltaCallback,
     Model,
+    ModelResponse,
+    MultiQueryResult,
     Platform,
     QueryResult,
+    TokenUsage,
 )
 from src.infrastructure.exceptions import (
     ClientNotDefined,
     LLMChatException,
-    TooManyRequests,
+    RequestCancelled,
 )
 from src.models.messages_ops import add_user_query_in_place
+from src.models.metrics import RequestRecord
 from src.models.shared import extract_chat_messages
+from src.models.tokens import estimate_messages_tokens
 from src.setup_logging import configure_logger
 
+from .metrics import MetricsRecorder
 from .mistral_client_wrapper import MistralClientWrapper
 from .openai_client_wrapper import OpenAIClientWrapper
+from .rate_limiter import RateLimiter
+from .response_cache import ResponseCache, compute_cache_key
+from .retry import RetryHandler, is_retryable
+from .transport import (
+    TransportSettings,
+    get_first_byte_time,
+    get_platform_transport_settings,
+    reset_first_byte_time,
+)
 
 logger = configure_logger(__name__)
 
-
-prev_times: list[float] = []
-
-
-def prevent_too_many_queries() -> None:
-    # debe fallar si se han hecho 10 consultas en menos de 20 segundos,
-    # para evitar llamadas a la API sin control debido a algun bug
-    prev_times.append(time.time())
-    if len(prev_times) >= 10:
-        if (seconds := (prev_times[-1] - prev_times[0])) < 20:
-            raise TooManyRequests(10, seconds)
-        prev_times.pop(0)
+T = TypeVar("T")
 
 
 class ClientWrapper:
 
     def __init__(
-        self, *, mistral_api_key: str | None = None, openai_api_key: str | None = None
+        self,
+        *,
+        mistral_api_key: str | None = None,
+        openai_api_key: str | None = None,
+        rate_limiter: RateLimiter | None = None,
+        response_cache: ResponseCache | None = None,
+        retry_handler: RetryHandler | None = None,
+        transport_settings: TransportSettings | None = None,
+        metrics: MetricsRecorder | None = None,
     ):
+        self._rate_limiter = rate_limiter or RateLimiter()
+        self._response_cache = response_cache
+        self._metrics = metrics
+        self._retry_handler = retry_handler or RetryHandler()
+        self._single_flight = SingleFlight[ModelResponse]()
         self._mistralai_client_wrapper = None
         self._openai_client_wrapper = None
         if mistral_api_key:
-            self._mistralai_client_wrapper = MistralClientWrapper(mistral_api_key)
+            self._mistralai_client_wrapper = MistralClientWrapper(
+                mistral_api_key,
+                get_platform_transport_settings(Platform.Mistral, transport_settings),
+            )
         if openai_api_key:
-            self._openai_client_wrapper = OpenAIClientWrapper(openai_api_key)
+            self._openai_client_wrapper = OpenAIClientWrapper(
+                openai_api_key,
+                get_platform_transport_settings(Platform.OpenAI, transport_settings),
+            )
 
     def get_simple_response_to_query(
         self,
@@ -83,14 +110,331 @@ class ClientWrapper:
         tools: list[dict[str, Any]] | None = None,
         tool_choice: str = "none",
         random_seed: int | None = None,
+        on_delta: DeltaCallback | None = None,
+        bypass_cache: bool = False,
     ) -> QueryResult:
         """
         Retrieves a simple response from the LLM client.
+        If on_delta is provided, the response is streamed to it as it arrives.
+        The response cache, when available, is looked up first, and identical requests
+        in flight at the same time share a single call, unless bypass_cache is set.
+        Every call is measured when a MetricsRecorder has been provided.
         """
-        prevent_too_many_queries()
+        if on_delta and tools:
+            raise LLMChatException(
+                "Error: tools not currently supported when streaming the response"
+            )
         # type annotated here for safety because MistralClient define messages type as list[Any]
         messages: list[ChatMessage] = extract_chat_messages(complete_messages)
 
+        trace = CallTrace(start=time.perf_counter())
+        reset_first_byte_time()
+        try:
+            response = self._get_response(
+                model,
+                messages,
+                tools=tools,
+                tool_choice=tool_choice,
+                random_seed=random_seed,
+                on_delta=on_delta,
+                bypass_cache=bypass_cache,
+                trace=trace,
+            )
+        except RequestCancelled:
+            # aborted on purpose, so neither an error nor a valid measurement
+            raise
+        except Exception as err:
+            self._record_metrics(model, messages, [], trace, error=type(err).__name__)
+            raise
+        chat_msg = response.chat_msg
+        self._record_metrics(model, messages, [chat_msg], trace)
+
+        if debug:
+            print(f"{chat_msg=}")
+            breakpoint()
+        complete_messages.append(CompleteMessage(chat_msg, model, response.usage))
+        return QueryResult(chat_msg.content, complete_messages, response.usage)
+
+    def get_responses(
+        self,
+        model: Model,
+        complete_messages: Sequence[CompleteMessage],
+        n: int,
+        *,
+        random_seed: int | None = None,
+    ) -> MultiQueryResult:
+        """
+        Retrieves n candidate responses to the same messages. OpenAI generates all of
+        them in a single request; for the other platforms the requests are sent
+        concurrently (with consecutive seeds, when there is a random_seed). The
+        response cache is not used, since the candidates are expected to differ.
+        """
+        assert n > 0
+        if model.platform == Platform.OpenAI:
+            if random_seed is not None:
+                raise LLMChatException(
+                    "Error: random_seed not currently supported with OpenAI API"
+                )
+            return self._get_responses_in_one_request(model, complete_messages, n)
+
+        def get_candidate(index: int) -> QueryResult:
+            return self.get_simple_response(
+                model,
+                list(complete_messages),
+                random_seed=random_seed + index if random_seed is not None else None,
+                bypass_cache=True,
+            )
+
+        candidates = list(map_in_order(get_candidate, range(n), max_workers=n))
+        return MultiQueryResult(candidates, sum_usages(candidates))
+
+    def _get_responses_in_one_request(
+        self, model: Model, complete_messages: Sequence[CompleteMessage], n: int
+    ) -> MultiQueryResult:
+        """
+        The usage is reported for the whole request, so it is kept in the message of
+        the first candidate
+        """
+        if not self._openai_client_wrapper:
+            raise ClientNotDefined("OpenAI", "OpenAI")
+        openai_client_wrapper = self._openai_client_wrapper
+        messages: list[ChatMessage] = extract_chat_messages(complete_messages)
+        trace = CallTrace(start=time.perf_counter())
+        reset_first_byte_time()
+        try:
+            response = self._call_with_retries(
+                model,
+                messages,
+                lambda: openai_client_wrapper.answer_many(model, messages, n),
+                trace,
+            )
+        except Exception as err:
+            self._record_metrics(model, messages, [], trace, error=type(err).__name__)
+            raise
+        self._record_metrics(model, messages, response.chat_msgs, trace)
+        candidates: list[QueryResult] = []
+        for index, chat_msg in enumerate(response.chat_msgs):
+            usage = response.usage if index == 0 else None
+            candidates.append(
+                QueryResult(
+                    chat_msg.content,
+                    [*complete_messages, CompleteMessage(chat_msg, model, usage)],
+                    usage,
+                )
+            )
+        return MultiQueryResult(candidates, response.usage)
+
+    def get_expected_wait(self, model: Model, tokens: int) -> float:
+        """
+        Seconds that a request to the model would wait now before being sent, for
+        the rate limiter or until its circuit lets requests through again. Infinite
+        when there is no client for the platform.
+        """
+        if not self._has_client(model.platform):
+            return math.inf
+        breaker = self._retry_handler.get_circuit_breaker(model.platform)
+        return max(
+            breaker.get_remaining_open_time(),
+            self._rate_limiter.get_wait(model, tokens),
+        )
+
+    def _has_client(self, platform: Platform | None) -> bool:
+        if platform == Platform.OpenAI:
+            return self._openai_client_wrapper is not None
+        if platform == Platform.Mistral:
+            return self._mistralai_client_wrapper is not None
+        return False
+
+    def _get_response(
+        self,
+        model: Model,
+        messages: list[ChatMessage],
+        *,
+        tools: list[dict[str, Any]] | None,
+        tool_choice: str,
+        random_seed: int | None,
+        on_delta: DeltaCallback | None,
+        bypass_cache: bool,
+        trace: "CallTrace",
+    ) -> ModelResponse:
+        """
+        Returns the cached response if available, the response of an identical
+        request already in flight, or the response of the API. Only the latter
+        includes the usage, since no tokens were consumed for the others.
+        """
+        request_key = compute_cache_key(
+            model,
+            messages,
+            tools=tools,
+            tool_choice=tool_choice,
+            random_seed=random_seed,
+        )
+        if self._response_cache and not bypass_cache:
+            chat_msg = self._response_cache.get(request_key)
+            if chat_msg:
+                trace.cache_hit = True
+                if on_delta:
+                    on_delta(chat_msg.content)
+                return ModelResponse(chat_msg)
+
+        def answer() -> ModelResponse:
+            response = self._answer_with_retries(
+                model,
+                messages,
+                tools=tools,
+                tool_choice=tool_choice,
+                random_seed=random_seed,
+                on_delta=on_delta,
+                trace=trace,
+            )
+            if self._response_cache:
+                self._response_cache.put(request_key, response.chat_msg)
+            return response
+
+        if bypass_cache:
+            return answer()
+        return self._answer_coalesced(request_key, answer, on_delta, trace)
+
+    def _answer_coalesced(
+        self,
+        request_key: str,
+        answer: Callable[[], ModelResponse],
+        on_delta: DeltaCallback | None,
+        trace: "CallTrace",
+    ) -> ModelResponse:
+        """
+        Waits for the identical request in flight, if any, instead of answering.
+        Its response is passed at once to on_delta. When that request is cancelled
+        by its caller, the request is sent again.
+        """
+        while True:
+            answered = False
+
+            def answer_tracked() -> ModelResponse:
+                nonlocal answered
+                answered = True
+                return answer()
+
+            try:
+                response = self._single_flight.run(request_key, answer_tracked)
+            except RequestCancelled:
+                if answered:
+                    raise
+                continue
+            if answered:
+                return response
+            trace.coalesced = True
+            if on_delta:
+                on_delta(response.chat_msg.content)
+            return ModelResponse(response.chat_msg)
+
+    def _record_metrics(
+        self,
+        model: Model,
+        messages: Sequence[ChatMessage],
+        received: Sequence[ChatMessage],
+        trace: "CallTrace",
+        *,
+        error: str | None = None,
+    ) -> None:
+        if not self._metrics:
+            return
+        end = time.perf_counter()
+        if trace.cache_hit or trace.coalesced:
+            first_byte_at: float | None = end
+        else:
+            first_byte_at = trace.first_delta_at or get_first_byte_time()
+        self._metrics.record(
+            RequestRecord(
+                timestamp=time.time(),
+                model_name=model.model_name,
+                wall_time=end - trace.start,
+                time_to_first_byte=(
+                    first_byte_at - trace.start if first_byte_at else None
+                ),
+                bytes_sent=measure_payload_size(messages),
+                bytes_received=measure_payload_size(received),
+                retries=trace.retries,
+                cache_hit=trace.cache_hit,
+                coalesced=trace.coalesced,
+                error=error,
+            )
+        )
+
+    def _answer_with_retries(
+        self,
+        model: Model,
+        messages: list[ChatMessage],
+        *,
+        tools: list[dict[str, Any]] | None,
+        tool_choice: str,
+        random_seed: int | None,
+        on_delta: DeltaCallback | None,
+        trace: "CallTrace",
+    ) -> ModelResponse:
+        """
+        Sends the request, retrying it after transient errors unless part of the
+        response has already been streamed.
+        """
+        streamed = False
+
+        def on_delta_tracked(delta: str) -> None:
+            nonlocal streamed
+            if not streamed:
+                trace.first_delta_at = time.perf_counter()
+            streamed = True
+            assert on_delta
+            on_delta(delta)
+
+        return self._call_with_retries(
+            model,
+            messages,
+            lambda: self._answer(
+                model,
+                messages,
+                tools=tools,
+                tool_choice=tool_choice,
+                random_seed=random_seed,
+                on_delta=on_delta_tracked if on_delta else None,
+            ),
+            trace,
+            retryable=lambda err: not streamed and is_retryable(err),
+        )
+
+    def _call_with_retries(
+        self,
+        model: Model,
+        messages: Sequence[ChatMessage],
+        send: Callable[[], T],
+        trace: "CallTrace",
+        *,
+        retryable: Callable[[Exception], bool] = is_retryable,
+    ) -> T:
+        """Sends the request when the rate limiter allows it, retrying it after transient errors"""
+
+        def on_retry(retry_number: int, err: Exception) -> None:
+            trace.retries = retry_number
+
+        def attempt() -> T:
+            self._rate_limiter.acquire(model, estimate_messages_tokens(messages))
+            reset_first_byte_time()
+            return send()
+
+        return self._retry_handler.call(
+            model.platform, attempt, on_retry=on_retry, retryable=retryable
+        )
+
+    def _answer(
+        self,
+        model: Model,
+        messages: list[ChatMessage],
+        *,
+        tools: list[dict[str, Any]] | None,
+        tool_choice: str,
+        random_seed: int | None,
+        on_delta: DeltaCallback | None,
+    ) -> ModelResponse:
+        """Sends the messages to the client of the platform of the model"""
         if model.platform == Platform.OpenAI:
             if random_seed is not None:
                 raise LLMChatException(
@@ -98,12 +442,20 @@ class ClientWrapper:
                 )
             if not self._openai_client_wrapper:
                 raise ClientNotDefined("OpenAI", "OpenAI")
-            chat_msg = self._openai_client_wrapper.answer(model, messages, tools=tools)
+            if on_delta:
+                return self._openai_client_wrapper.stream_answer(
+                    model, messages, on_delta
+                )
+            return self._openai_client_wrapper.answer(model, messages, tools=tools)
 
         elif model.platform == Platform.Mistral:
             if not self._mistralai_client_wrapper:
                 raise ClientNotDefined("Mistral AI", "Mistral")
-            chat_msg = self._mistralai_client_wrapper.answer(
+            if on_delta:
+                return self._mistralai_client_wrapper.stream_answer(
+                    model, messages, on_delta, random_seed=random_seed
+                )
+            return self._mistralai_client_wrapper.answer(
                 model,
                 messages,
                 tools=tools,
@@ -111,14 +463,32 @@ class ClientWrapper:
                 random_seed=random_seed,
             )
 
-        else:
-            raise ValueError(f"Missing platform in model: {model}")
+        raise ValueError(f"Missing platform in model: {model}")
 
-        if debug:
-            print(f"{chat_msg=}")
-            breakpoint()
-        complete_messages.append(CompleteMessage(chat_msg, model))
-        return QueryResult(chat_msg.content, complete_messages)
+
+@dataclass
+class CallTrace:
+    """Measurements collected while a call is in progress"""
+
+    start: float
+    retries: int = 0
+    cache_hit: bool = False
+    coalesced: bool = False
+    first_delta_at: float | None = None
+
+
+def sum_usages(query_results: Sequence[QueryResult]) -> TokenUsage | None:
+    """Returns the total usage, or None if it is unknown for any of the results"""
+    total: TokenUsage | None = None
+    for query_result in query_results:
+        if query_result.usage is None:
+            return None
+        total = query_result.usage if total is None else total + query_result.usage
+    return total
+
+
+def measure_payload_size(messages: Sequence[ChatMessage]) -> int:
+    return sum(len(msg.content.encode("utf-8")) for msg in messages)
 
 
 if TYPE_CHECKING:
@@ -0,0 +1,171 @@
+import random
+import threading
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Final, Protocol
+
+from src.domain import (
+    ChatMessage,
+    DeltaCallback,
+    Model,
+    ModelResponse,
+    Platform,
+    TokenUsage,
+)
+from src.infrastructure.exceptions import APIConnectionError, APIRequestError
+from src.models.tokens import estimate_messages_tokens, estimate_tokens
+
+from .client_wrapper import ClientWrapper
+from .metrics import MetricsRecorder
+from .rate_limiter import RateLimiter
+from .response_cache import ResponseCache
+from .retry import RetryHandler
+from .transport import mark_first_byte
+
+FAKE_API_NAME = "Fake"
+ECHO_PREFIX = "Echo: "
+
+
+class LatencyDistribution(Protocol):
+    def sample(self, rng: random.Random) -> float:
+        """Returns a latency in seconds"""
+        ...
+
+
+@dataclass(frozen=True)
+class FixedLatency:
+    seconds: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        return self.seconds
+
+
+@dataclass(frozen=True)
+class UniformLatency:
+    low: float
+    high: float
+
+    def sample(self, rng: random.Random) -> float:
+        return rng.uniform(self.low, self.high)
+
+
+@dataclass(frozen=True)
+class LogNormalLatency:
+    """Long-tailed latency, as usually observed in the real APIs"""
+
+    median: float
+    sigma: float = 0.5
+
+    def sample(self, rng: random.Random) -> float:
+        return self.median * rng.lognormvariate(0, self.sigma)
+
+
+@dataclass(frozen=True)
+class FakeBehavior:
+    """
+    Behavior of the fake backend. The scripted responses are returned in a cycle;
+    without them, the last message of the request is echoed.
+    latency is the time to the first token. Error rates are probabilities per request.
+    """
+
+    responses: Sequence[str] = ()
+    latency: LatencyDistribution = field(default_factory=FixedLatency)
+    rate_limit_error_rate: float = 0.0
+    retry_after: float | None = None
+    timeout_rate: float = 0.0
+    timeout_seconds: float = 0.0
+    stream_chunk_size: int = 4
+    stream_chunk_delay: float = 0.0
+
+
+class FakeClientWrapper(ClientWrapper):
+    """
+    ClientWrapper answered by a local fake backend instead of the APIs of the
+    platforms, so the whole request pipeline (rate limiter, retries, cache) can be
+    exercised and benchmarked offline.
+    """
+
+    def __init__(
+        self,
+        behavior: FakeBehavior | None = None,
+        *,
+        rate_limiter: RateLimiter | None = None,
+        response_cache: ResponseCache | None = None,
+        retry_handler: RetryHandler | None = None,
+        metrics: MetricsRecorder | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: random.Random | None = None,
+    ):
+        super().__init__(
+            rate_limiter=rate_limiter,
+            response_cache=response_cache,
+            retry_handler=retry_handler,
+            metrics=metrics,
+        )
+        self._behavior: Final = behavior or FakeBehavior()
+        self._sleep: Final = sleep
+        self._rng: Final = rng or random.Random()
+        self._lock: Final = threading.Lock()
+        self._call_count = 0
+
+    @property
+    def call_count(self) -> int:
+        """Number of requests received by the fake backend, including the failed ones"""
+        return self._call_count
+
+    def _has_client(self, platform: Platform | None) -> bool:
+        return True
+
+    def _answer(
+        self,
+        model: Model,
+        messages: list[ChatMessage],
+        *,
+        tools: list[dict[str, Any]] | None,
+        tool_choice: str,
+        random_seed: int | None,
+        on_delta: DeltaCallback | None,
+    ) -> ModelResponse:
+        behavior = self._behavior
+        with self._lock:
+            call_number = self._call_count
+            self._call_count += 1
+            latency = behavior.latency.sample(self._rng)
+            failure = self._rng.random()
+        if failure < behavior.rate_limit_error_rate:
+            raise APIRequestError(
+                FAKE_API_NAME,
+                429,
+                "Rate limit exceeded",
+                retry_after=behavior.retry_after,
+            )
+        if failure < behavior.rate_limit_error_rate + behavior.timeout_rate:
+            self._sleep(behavior.timeout_seconds)
+            raise APIConnectionError(FAKE_API_NAME)
+        self._sleep(latency)
+        mark_first_byte()
+        content = self._get_content(call_number, messages)
+        if on_delta:
+            self._stream(content, on_delta)
+        usage = TokenUsage(estimate_messages_tokens(messages), estimate_tokens(content))
+        return ModelResponse(ChatMessage("assistant", content), usage)
+
+    def _get_content(self, call_number: int, messages: Sequence[ChatMessage]) -> str:
+        if responses := self._behavior.responses:
+            return responses[call_number % len(responses)]
+        return ECHO_PREFIX + (messages[-1].content if messages else "")
+
+    def _stream(self, content: str, on_delta: DeltaCallback) -> None:
+        chunk_size = self._behavior.stream_chunk_size
+        for start in range(0, len(content), chunk_size):
+            if start:
+                self._sleep(self._behavior.stream_chunk_delay)
+            on_delta(content[start : start + chunk_size])
+
+
+if TYPE_CHECKING:
+    from src.protocols import ClientWrapperProtocol
+
+    fake_client_wrapper: FakeClientWrapper
+    protocol: ClientWrapperProtocol = fake_client_wrapper  # pyright: ignore
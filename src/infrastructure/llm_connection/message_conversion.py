@@ -0,0 +1,46 @@
+import threading
+import weakref
+from collections.abc import Callable, Sequence
+from typing import Final, Generic, TypeVar
+
+from src.domain import ChatMessage
+
+T = TypeVar("T")
+
+
+class ConversionCache(Generic[T]):
+    """
+    Keeps the conversion of every ChatMessage into the message type of a provider,
+    so each turn only converts the new messages of the history. Messages are
+    immutable but not always hashable (tool calls can be lists), so entries are
+    addressed by identity and dropped when the message is garbage collected.
+    """
+
+    def __init__(self, convert: Callable[[ChatMessage], T]):
+        self._convert: Final = convert
+        self._lock: Final = threading.Lock()
+        self._entries: dict[int, tuple[weakref.ref[ChatMessage], T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def convert_all(self, messages: Sequence[ChatMessage]) -> list[T]:
+        return [self.convert(msg) for msg in messages]
+
+    def convert(self, msg: ChatMessage) -> T:
+        key = id(msg)
+        # reading a dict is atomic, so only the writes take the lock
+        entry = self._entries.get(key)
+        if entry and entry[0]() is msg:
+            return entry[1]
+        converted = self._convert(msg)
+        ref = weakref.ref(msg, lambda ref: self._forget(key, ref))
+        with self._lock:
+            self._entries[key] = (ref, converted)
+        return converted
+
+    def _forget(self, key: int, ref: "weakref.ref[ChatMessage]") -> None:
+        with self._lock:
+            # the id may have been reused by a newer message
+            if (entry := self._entries.get(key)) and entry[0] is ref:
+                del self._entries[key]
@@ -0,0 +1,68 @@
+import json
+import threading
+from collections import deque
+from dataclasses import asdict
+from pathlib import Path, PurePath
+from typing import Final, TextIO
+
+from src.domain import ModelName
+from src.models.metrics import ModelStats, RequestRecord, aggregate_records
+
+DEFAULT_MAX_RECORDS_PER_MODEL = 10_000
+
+
+class MetricsRecorder:
+    """
+    Keeps the latest request records of every model in memory, to aggregate them on
+    demand, and optionally appends every record to a JSONL file.
+    """
+
+    def __init__(
+        self,
+        dump_path: PurePath | None = None,
+        *,
+        max_records_per_model: int = DEFAULT_MAX_RECORDS_PER_MODEL,
+    ):
+        self._dump_path: Final = Path(dump_path) if dump_path else None
+        self._max_records_per_model: Final = max_records_per_model
+        self._lock: Final = threading.Lock()
+        self._records: dict[ModelName, deque[RequestRecord]] = {}
+        self._dump_file: TextIO | None = None
+
+    def record(self, record: RequestRecord) -> None:
+        with self._lock:
+            records = self._records.setdefault(
+                record.model_name, deque(maxlen=self._max_records_per_model)
+            )
+            records.append(record)
+            if self._dump_path:
+                self._dump(record)
+
+    def get_stats(self, last: int | None = None) -> list[ModelStats]:
+        """
+        Returns the aggregates of every model, sorted by model name. With last, only
+        the latest records of every model are aggregated.
+        """
+        start = -last if last else 0
+        with self._lock:
+            records = {
+                name: list(items)[start:] for name, items in self._records.items()
+            }
+        return [
+            aggregate_records(model_name, records[model_name])
+            for model_name in sorted(records)
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._dump_file:
+                self._dump_file.close()
+                self._dump_file = None
+
+    def _dump(self, record: RequestRecord) -> None:
+        assert self._dump_path
+        if self._dump_file is None:
+            self._dump_path.parent.mkdir(parents=True, exist_ok=True)
+            self._dump_file = open(self._dump_path, "a", encoding="utf-8")
+        self._dump_file.write(json.dumps(asdict(record)) + "\n")
+        self._dump_file.flush()
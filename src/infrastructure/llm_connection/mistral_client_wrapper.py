@@ -1,19 +1,73 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
 from typing import Any, Sequence, cast
 
+import httpx
+from mistralai.async_client import MistralAsyncClient
 from mistralai.client import MistralClient
-from mistralai.exceptions import MistralConnectionException
+from mistralai.client_base import ClientBase
+from mistralai.constants import ENDPOINT
+from mistralai.exceptions import (
+    MistralAPIException,
+    MistralConnectionException,
+    MistralException,
+)
+from mistralai.models.chat_completion import ChatCompletionResponse
 from mistralai.models.chat_completion import ChatMessage as MistralChatMessage
+from mistralai.models.common import UsageInfo
 
-from src.domain import ChatMessage, Model, Platform
-from src.infrastructure.exceptions import APIConnectionError
+from src.domain import (
+    ChatMessage,
+    DeltaCallback,
+    Model,
+    ModelResponse,
+    Platform,
+    TokenUsage,
+)
+from src.infrastructure.exceptions import APIConnectionError, APIRequestError
 from src.setup_logging import configure_logger, format_var
 
+from .message_conversion import ConversionCache
+from .retry import parse_retry_after
+from .transport import TransportSettings, create_http_client
+
+# retries are managed by RetryHandler
+SDK_MAX_RETRIES = 1
+
+
+class PooledMistralClient(MistralClient):
+    """MistralClient that sends its requests through an externally managed httpx client"""
+
+    def __init__(self, api_key: str | None, http_client: httpx.Client):
+        ClientBase.__init__(self, ENDPOINT, api_key, SDK_MAX_RETRIES)
+        self._client = http_client
+
+    def __del__(self) -> None:
+        # the http client is shared, so it must not be closed here
+        pass
+
+
+class PooledMistralAsyncClient(MistralAsyncClient):
+    """MistralAsyncClient that sends its requests through an externally managed httpx client"""
+
+    def __init__(self, api_key: str | None, http_client: httpx.AsyncClient):
+        ClientBase.__init__(self, ENDPOINT, api_key, SDK_MAX_RETRIES)
+        self._client = http_client
+
+
 logger = configure_logger(__name__)
 
 
 class MistralClientWrapper:
-    def __init__(self, api_key: str | None = None):
-        self._mistralai_client = MistralClient(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str | None = None,
+        transport_settings: TransportSettings | None = None,
+    ):
+        self._mistralai_client = PooledMistralClient(
+            api_key, create_http_client(transport_settings)
+        )
+        self._message_converter = ConversionCache(convert_to_mistral_payload)
 
     def answer(
         self,
@@ -23,20 +77,12 @@ class MistralClientWrapper:
         tools: list[dict[str, Any]] | None = None,
         tool_choice: str = "none",
         random_seed: int | None = None,
-    ) -> ChatMessage:
+    ) -> ModelResponse:
         assert model.platform == Platform.Mistral
 
-        mistral_messages = [
-            MistralChatMessage(
-                role=msg.role,
-                content=msg.content,
-                name=msg.name,
-                tool_calls=cast(Any, msg.tool_calls),
-            )
-            for msg in messages
-        ]
+        mistral_messages = self._message_converter.convert_all(messages)
         logger.info(f"{tool_choice=}")
-        try:
+        with translate_mistral_errors():
             chat_response = self._mistralai_client.chat(
                 model=model.model_name,
                 messages=mistral_messages,
@@ -44,17 +90,136 @@ class MistralClientWrapper:
                 tool_choice=tool_choice,
                 random_seed=random_seed,
             )
-        except MistralConnectionException:
-            raise APIConnectionError("Mistral") from None
-        choices = chat_response.choices
-        assert len(choices) == 1
-        mistral_chat_msg = choices[0].message
-        assert isinstance(mistral_chat_msg.content, str)
-
-        logger.info(format_var("mistral_chat_msg", mistral_chat_msg))
-
-        return ChatMessage(
-            mistral_chat_msg.role,
-            mistral_chat_msg.content,
-            tool_calls=mistral_chat_msg.tool_calls,
+        return ModelResponse(
+            convert_from_mistral_response(chat_response),
+            convert_from_mistral_usage(chat_response.usage),
         )
+
+    def stream_answer(
+        self,
+        model: Model,
+        messages: Sequence[ChatMessage],
+        on_delta: DeltaCallback,
+        *,
+        random_seed: int | None = None,
+    ) -> ModelResponse:
+        """Streams the content of the response to on_delta and returns the whole message"""
+        assert model.platform == Platform.Mistral
+
+        mistral_messages = self._message_converter.convert_all(messages)
+        role = "assistant"
+        parts: list[str] = []
+        usage = None
+        with translate_mistral_errors():
+            for chunk in self._mistralai_client.chat_stream(
+                model=model.model_name,
+                messages=mistral_messages,
+                random_seed=random_seed,
+            ):
+                # the usage is reported in the last chunk
+                if chunk.usage:
+                    usage = convert_from_mistral_usage(chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.role:
+                    role = delta.role
+                if delta.content:
+                    parts.append(delta.content)
+                    on_delta(delta.content)
+        chat_msg = ChatMessage(role, "".join(parts))
+        logger.info(format_var("streamed_chat_msg", chat_msg))
+        return ModelResponse(chat_msg, usage)
+
+
+class AsyncMistralClientWrapper:
+    """Asyncio counterpart of MistralClientWrapper"""
+
+    def __init__(self, api_key: str | None, http_client: httpx.AsyncClient):
+        self._mistralai_client = PooledMistralAsyncClient(api_key, http_client)
+        self._message_converter = ConversionCache(convert_to_mistral_payload)
+
+    async def answer(
+        self,
+        model: Model,
+        messages: Sequence[ChatMessage],
+        *,
+        tools: list[dict[str, Any]] | None = None,
+        tool_choice: str = "none",
+        random_seed: int | None = None,
+    ) -> ModelResponse:
+        assert model.platform == Platform.Mistral
+
+        mistral_messages = self._message_converter.convert_all(messages)
+        logger.info(f"{tool_choice=}")
+        with translate_mistral_errors():
+            chat_response = await self._mistralai_client.chat(
+                model=model.model_name,
+                messages=mistral_messages,
+                tools=tools,
+                tool_choice=tool_choice,
+                random_seed=random_seed,
+            )
+        return ModelResponse(
+            convert_from_mistral_response(chat_response),
+            convert_from_mistral_usage(chat_response.usage),
+        )
+
+
+@contextmanager
+def translate_mistral_errors() -> Iterator[None]:
+    """Converts the exceptions of the Mistral AI SDK into exceptions of this package"""
+    try:
+        yield
+    except MistralConnectionException:
+        raise APIConnectionError("Mistral") from None
+    except MistralAPIException as err:
+        raise APIRequestError(
+            "Mistral",
+            err.http_status,
+            str(err),
+            retry_after=parse_retry_after(err.headers),
+        ) from None
+    except MistralException as err:
+        raise APIRequestError("Mistral", None, str(err)) from None
+
+
+def convert_to_mistral_msg(msg: ChatMessage) -> MistralChatMessage:
+    return MistralChatMessage(
+        role=msg.role,
+        content=msg.content,
+        name=msg.name,
+        tool_calls=cast(Any, msg.tool_calls),
+    )
+
+
+def convert_to_mistral_payload(msg: ChatMessage) -> dict[str, Any]:
+    """
+    Converts the message into the dict sent by the SDK, which accepts it as is
+    instead of dumping a MistralChatMessage again in every request
+    """
+    return convert_to_mistral_msg(msg).model_dump(exclude_none=True)
+
+
+def convert_from_mistral_response(chat_response: ChatCompletionResponse) -> ChatMessage:
+    choices = chat_response.choices
+    assert len(choices) == 1
+    mistral_chat_msg = choices[0].message
+    assert isinstance(mistral_chat_msg.content, str)
+
+    logger.info(format_var("mistral_chat_msg", mistral_chat_msg))
+
+    return ChatMessage(
+        mistral_chat_msg.role,
+        mistral_chat_msg.content,
+        tool_calls=mistral_chat_msg.tool_calls,
+    )
+
+
+def convert_from_mistral_usage(usage: UsageInfo | None) -> TokenUsage | None:
+    if usage is None:
+        return None
+    completion_tokens = usage.completion_tokens
+    if completion_tokens is None:
+        completion_tokens = usage.total_tokens - usage.prompt_tokens
+    return TokenUsage(usage.prompt_tokens, completion_tokens)
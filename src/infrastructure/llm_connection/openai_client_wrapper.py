@@ -1,18 +1,42 @@
-from collections.abc import Mapping
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
 from types import NoneType
 from typing import Any, Iterable, Sequence, cast
 
-from openai import OpenAI
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
+from openai.types import CompletionUsage
+from openai.types.chat import ChatCompletion
+from openai.types.chat.chat_completion import Choice
 
-from src.domain import ChatMessage, Model
+from src.domain import (
+    ChatMessage,
+    DeltaCallback,
+    Model,
+    ModelResponse,
+    MultiModelResponse,
+    TokenUsage,
+)
+from src.infrastructure.exceptions import APIConnectionError, APIRequestError
 from src.setup_logging import configure_logger, format_var
 
+from .retry import parse_retry_after
+from .transport import TransportSettings, create_http_client
+
 logger = configure_logger(__name__)
 
 
 class OpenAIClientWrapper:
-    def __init__(self, api_key: str):
-        self._openai_client = OpenAI(api_key=api_key)
+    def __init__(
+        self, api_key: str, transport_settings: TransportSettings | None = None
+    ):
+        # retries are managed by RetryHandler
+        self._openai_client = OpenAI(
+            api_key=api_key,
+            max_retries=0,
+            http_client=create_http_client(transport_settings),
+        )
 
     def answer(
         self,
@@ -20,7 +44,105 @@ class OpenAIClientWrapper:
         messages: Sequence[ChatMessage],
         *,
         tools: list[dict[str, Any]] | None = None,
-    ) -> ChatMessage:
+    ) -> ModelResponse:
+        logger.info(f"{model=}")
+        logger.info(f"{tools=}")
+
+        openai_messages = [convert_to_openai_msg(msg) for msg in messages]
+
+        logger.info(format_var("openai_messages", openai_messages))
+
+        with translate_openai_errors():
+            openai_chat_completion = self._openai_client.chat.completions.create(
+                messages=cast_openai_messages(openai_messages),
+                model=model.model_name,
+                tools=cast(Any, tools),
+            )
+        return ModelResponse(
+            convert_from_openai_completion(openai_chat_completion),
+            convert_from_openai_usage(openai_chat_completion.usage),
+        )
+
+    def answer_many(
+        self, model: Model, messages: Sequence[ChatMessage], n: int
+    ) -> MultiModelResponse:
+        """Returns n choices generated in a single request"""
+        logger.info(f"{model=}")
+
+        openai_messages = [convert_to_openai_msg(msg) for msg in messages]
+
+        logger.info(format_var("openai_messages", openai_messages))
+
+        with translate_openai_errors():
+            openai_chat_completion = self._openai_client.chat.completions.create(
+                messages=cast_openai_messages(openai_messages),
+                model=model.model_name,
+                n=n,
+            )
+        return MultiModelResponse(
+            [
+                convert_from_openai_choice(choice)
+                for choice in openai_chat_completion.choices
+            ],
+            convert_from_openai_usage(openai_chat_completion.usage),
+        )
+
+    def stream_answer(
+        self,
+        model: Model,
+        messages: Sequence[ChatMessage],
+        on_delta: DeltaCallback,
+    ) -> ModelResponse:
+        """Streams the content of the response to on_delta and returns the whole message"""
+        logger.info(f"{model=}")
+
+        openai_messages = [convert_to_openai_msg(msg) for msg in messages]
+
+        logger.info(format_var("openai_messages", openai_messages))
+
+        role = "assistant"
+        parts: list[str] = []
+        usage = None
+        with translate_openai_errors():
+            stream = self._openai_client.chat.completions.create(
+                messages=cast_openai_messages(openai_messages),
+                model=model.model_name,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                # the usage is reported in an extra chunk without choices
+                if chunk.usage:
+                    usage = convert_from_openai_usage(chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.role:
+                    role = delta.role
+                if delta.content:
+                    parts.append(delta.content)
+                    on_delta(delta.content)
+        chat_msg = ChatMessage(role, "".join(parts))
+        logger.info(format_var("streamed_chat_msg", chat_msg))
+        return ModelResponse(chat_msg, usage)
+
+
+class AsyncOpenAIClientWrapper:
+    """Asyncio counterpart of OpenAIClientWrapper"""
+
+    def __init__(self, api_key: str, http_client: httpx.AsyncClient):
+        # retries are managed by RetryHandler
+        self._openai_client = AsyncOpenAI(
+            api_key=api_key, max_retries=0, http_client=http_client
+        )
+
+    async def answer(
+        self,
+        model: Model,
+        messages: Sequence[ChatMessage],
+        *,
+        tools: list[dict[str, Any]] | None = None,
+    ) -> ModelResponse:
         logger.info(f"{model=}")
         logger.info(f"{tools=}")
 
@@ -28,19 +150,32 @@ class OpenAIClientWrapper:
 
         logger.info(format_var("openai_messages", openai_messages))
 
-        openai_chat_completion = self._openai_client.chat.completions.create(
-            messages=cast_openai_messages(openai_messages),
-            model=model.model_name,
-            tools=cast(Any, tools),
+        with translate_openai_errors():
+            openai_chat_completion = await self._openai_client.chat.completions.create(
+                messages=cast_openai_messages(openai_messages),
+                model=model.model_name,
+                tools=cast(Any, tools),
+            )
+        return ModelResponse(
+            convert_from_openai_completion(openai_chat_completion),
+            convert_from_openai_usage(openai_chat_completion.usage),
         )
-        openai_chat_msg = openai_chat_completion.choices[0].message
 
-        logger.info(format_var("openai_chat_msg", openai_chat_msg))
 
-        assert isinstance(openai_chat_msg.content, (str, NoneType))
-        content = openai_chat_msg.content
-        role = openai_chat_msg.role
-        return ChatMessage(role, content or "", tool_calls=openai_chat_msg.tool_calls)
+@contextmanager
+def translate_openai_errors() -> Iterator[None]:
+    """Converts the exceptions of the OpenAI SDK into exceptions of this package"""
+    try:
+        yield
+    except openai.APIConnectionError:
+        raise APIConnectionError("OpenAI") from None
+    except openai.APIStatusError as err:
+        raise APIRequestError(
+            "OpenAI",
+            err.status_code,
+            err.message,
+            retry_after=parse_retry_after(err.response.headers),
+        ) from None
 
 
 def convert_to_openai_msg(msg: ChatMessage) -> Mapping[str, object]:
@@ -57,5 +192,28 @@ def convert_to_openai_msg(msg: ChatMessage) -> Mapping[str, object]:
     return openai_msg
 
 
+def convert_from_openai_completion(
+    openai_chat_completion: ChatCompletion,
+) -> ChatMessage:
+    return convert_from_openai_choice(openai_chat_completion.choices[0])
+
+
+def convert_from_openai_choice(choice: Choice) -> ChatMessage:
+    openai_chat_msg = choice.message
+
+    logger.info(format_var("openai_chat_msg", openai_chat_msg))
+
+    assert isinstance(openai_chat_msg.content, (str, NoneType))
+    content = openai_chat_msg.content
+    role = openai_chat_msg.role
+    return ChatMessage(role, content or "", tool_calls=openai_chat_msg.tool_calls)
+
+
+def convert_from_openai_usage(usage: CompletionUsage | None) -> TokenUsage | None:
+    if usage is None:
+        return None
+    return TokenUsage(usage.prompt_tokens, usage.completion_tokens)
+
+
 def cast_openai_messages(openai_messages: list[Mapping[str, object]]) -> Iterable[Any]:
     return cast(Iterable[Any], openai_messages)
@@ -0,0 +1,182 @@
+import asyncio
+import threading
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from typing import Final
+
+from src.domain import Model, ModelName, Platform
+from src.settings import (
+    DEFAULT_REQUESTS_PER_MINUTE,
+    DEFAULT_TOKENS_PER_MINUTE,
+    REQUESTS_PER_MINUTE,
+    TOKENS_PER_MINUTE,
+)
+from src.setup_logging import configure_logger
+
+logger = configure_logger(__name__)
+
+SECONDS_PER_MINUTE: Final = 60
+
+RateLimitKey = tuple[Platform | None, ModelName]
+
+
+@dataclass(frozen=True)
+class RateLimits:
+    requests_per_minute: int
+    tokens_per_minute: int
+
+
+class TokenBucket:
+    """
+    Bucket that refills continuously up to its capacity. Capacity is reserved in
+    advance, so the level becomes negative when there are callers waiting for it.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float, now: float):
+        assert capacity > 0
+        assert refill_per_second > 0
+        self._capacity: Final = capacity
+        self._refill_per_second: Final = refill_per_second
+        self._level = capacity
+        self._last_update = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Reserves the amount and returns the seconds to wait before using it"""
+        self._refill(now)
+        self._level -= min(amount, self._capacity)
+        if self._level >= 0:
+            return 0
+        return -self._level / self._refill_per_second
+
+    def get_wait(self, amount: float, now: float) -> float:
+        """Seconds that a reservation of the amount would wait, without reserving it"""
+        self._refill(now)
+        missing = min(amount, self._capacity) - self._level
+        return max(0, missing / self._refill_per_second)
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0, now - self._last_update)
+        self._level = min(
+            self._capacity, self._level + elapsed * self._refill_per_second
+        )
+        self._last_update = now
+
+
+class RateLimiter:
+    """
+    Paces the requests to the APIs with a requests-per-minute and a
+    tokens-per-minute budget for every platform and model. Callers wait until
+    there is capacity available instead of failing.
+    """
+
+    def __init__(
+        self,
+        limits: Mapping[Platform, RateLimits] | None = None,
+        default_limits: RateLimits | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self._limits: Final = (
+            limits if limits is not None else get_rate_limits_from_settings()
+        )
+        self._default_limits: Final = default_limits or RateLimits(
+            DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE
+        )
+        self._clock: Final = clock
+        self._sleep: Final = sleep
+        self._lock: Final = threading.Lock()
+        self._buckets: dict[RateLimitKey, tuple[TokenBucket, TokenBucket]] = {}
+        self._waiting: dict[RateLimitKey, int] = {}
+
+    def acquire(self, model: Model, tokens: int) -> None:
+        """Blocks until the request can be sent without exceeding the budgets"""
+        key = get_rate_limit_key(model)
+        wait = self.reserve(model, tokens)
+        if wait <= 0:
+            return
+        self._change_waiting(key, 1)
+        try:
+            logger.info(f"Waiting {wait:.2f}s for rate limit of {key}")
+            self._sleep(wait)
+        finally:
+            self._change_waiting(key, -1)
+
+    async def acquire_async(self, model: Model, tokens: int) -> None:
+        """Same as acquire, but waiting without blocking the event loop"""
+        key = get_rate_limit_key(model)
+        wait = self.reserve(model, tokens)
+        if wait <= 0:
+            return
+        self._change_waiting(key, 1)
+        try:
+            logger.info(f"Waiting {wait:.2f}s for rate limit of {key}")
+            await asyncio.sleep(wait)
+        finally:
+            self._change_waiting(key, -1)
+
+    def reserve(self, model: Model, tokens: int) -> float:
+        """Reserves capacity for a request and returns the seconds to wait before sending it"""
+        key = get_rate_limit_key(model)
+        with self._lock:
+            now = self._clock()
+            requests_bucket, tokens_bucket = self._get_buckets(key, model, now)
+            return max(
+                requests_bucket.reserve(1, now), tokens_bucket.reserve(tokens, now)
+            )
+
+    def get_wait(self, model: Model, tokens: int) -> float:
+        """Seconds that a request would wait now, without reserving any capacity"""
+        key = get_rate_limit_key(model)
+        with self._lock:
+            now = self._clock()
+            requests_bucket, tokens_bucket = self._get_buckets(key, model, now)
+            return max(
+                requests_bucket.get_wait(1, now), tokens_bucket.get_wait(tokens, now)
+            )
+
+    def get_queue_depth(self, model: Model | None = None) -> int:
+        """Number of requests waiting for capacity (for the model, or in total)"""
+        with self._lock:
+            if model is None:
+                return sum(self._waiting.values())
+            return self._waiting.get(get_rate_limit_key(model), 0)
+
+    def _get_buckets(
+        self, key: RateLimitKey, model: Model, now: float
+    ) -> tuple[TokenBucket, TokenBucket]:
+        if key not in self._buckets:
+            limits = self._get_limits(model.platform)
+            self._buckets[key] = (
+                create_per_minute_bucket(limits.requests_per_minute, now),
+                create_per_minute_bucket(limits.tokens_per_minute, now),
+            )
+        return self._buckets[key]
+
+    def _get_limits(self, platform: Platform | None) -> RateLimits:
+        if platform is None:
+            return self._default_limits
+        return self._limits.get(platform, self._default_limits)
+
+    def _change_waiting(self, key: RateLimitKey, delta: int) -> None:
+        with self._lock:
+            self._waiting[key] = self._waiting.get(key, 0) + delta
+
+
+def create_per_minute_bucket(budget_per_minute: int, now: float) -> TokenBucket:
+    return TokenBucket(budget_per_minute, budget_per_minute / SECONDS_PER_MINUTE, now)
+
+
+def get_rate_limit_key(model: Model) -> RateLimitKey:
+    return (model.platform, model.model_name)
+
+
+def get_rate_limits_from_settings() -> dict[Platform, RateLimits]:
+    return {
+        platform: RateLimits(
+            REQUESTS_PER_MINUTE.get(platform, DEFAULT_REQUESTS_PER_MINUTE),
+            TOKENS_PER_MINUTE.get(platform, DEFAULT_TOKENS_PER_MINUTE),
+        )
+        for platform in Platform
+    }
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from pathlib import Path, PurePath
+from typing import Any, Final
+
+from src.domain import ChatMessage, Model
+from src.setup_logging import configure_logger
+
+logger = configure_logger(__name__)
+
+CACHE_FILE_EXT = "json"
+DEFAULT_MAX_BYTES = 50 * 1024**2
+
+
+class ResponseCache:
+    """
+    On-disk cache of the responses of the models, addressed by the content of the
+    request. The least recently used entries are evicted when the size cap is
+    exceeded.
+    """
+
+    def __init__(self, directory: PurePath, max_bytes: int = DEFAULT_MAX_BYTES):
+        assert max_bytes > 0
+        self._directory: Final = Path(directory)
+        self._max_bytes: Final = max_bytes
+        self._lock: Final = threading.Lock()
+        self._directory.mkdir(parents=True, exist_ok=True)
+        # key -> size in bytes, ordered from least to most recently used
+        self._entries: OrderedDict[str, int] = self._load_entries()
+        self._total_bytes = sum(self._entries.values())
+
+    def get(self, key: str) -> ChatMessage | None:
+        """Returns the cached response, if any, and marks it as recently used"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            path = self._build_path(key)
+            try:
+                text = path.read_text(encoding="utf-8")
+                os.utime(path)
+            except FileNotFoundError:
+                self._forget(key)
+                return None
+            self._entries.move_to_end(key)
+        return deserialize_chat_message(text)
+
+    def put(self, key: str, chat_msg: ChatMessage) -> None:
+        """Stores the response. Responses with tool calls are not cached."""
+        if chat_msg.tool_calls:
+            logger.info("Response with tool calls not cached")
+            return
+        data = serialize_chat_message(chat_msg).encode("utf-8")
+        path = self._build_path(key)
+        tmp_path = path.with_suffix(".tmp")
+        with self._lock:
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+            self._forget(key)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._total_bytes > self._max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._build_path(key).unlink(missing_ok=True)
+            self._forget(key)
+            logger.info(f"Evicted cache entry {key}")
+
+    def _forget(self, key: str) -> None:
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _load_entries(self) -> OrderedDict[str, int]:
+        stats = [
+            (path.stem, path.stat())
+            for path in self._directory.glob(f"*.{CACHE_FILE_EXT}")
+        ]
+        stats.sort(key=lambda item: item[1].st_mtime)
+        return OrderedDict((key, stat.st_size) for key, stat in stats)
+
+    def _build_path(self, key: str) -> Path:
+        return self._directory / f"{key}.{CACHE_FILE_EXT}"
+
+
+def compute_cache_key(
+    model: Model,
+    messages: Sequence[ChatMessage],
+    *,
+    tools: list[dict[str, Any]] | None,
+    tool_choice: str,
+    random_seed: int | None,
+) -> str:
+    """Hash of everything that determines the response to a request"""
+    request = {
+        "platform": model.platform.value if model.platform else None,
+        "model": model.model_name,
+        "messages": [
+            [msg.role, msg.content, msg.name, msg.tool_calls, msg.tool_call_id]
+            for msg in messages
+        ],
+        "tools": tools,
+        "tool_choice": tool_choice,
+        "random_seed": random_seed,
+    }
+    serialized = json.dumps(request, sort_keys=True, default=serialize_for_key)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def serialize_for_key(obj: object) -> object:
+    """Converts the objects from the SDKs (like tool calls) into JSON compatible values"""
+    model_dump = getattr(obj, "model_dump", None)
+    if callable(model_dump):
+        return model_dump()
+    return repr(obj)
+
+
+def serialize_chat_message(chat_msg: ChatMessage) -> str:
+    return json.dumps(
+        {
+            "role": chat_msg.role,
+            "content": chat_msg.content,
+            "name": chat_msg.name,
+            "tool_call_id": chat_msg.tool_call_id,
+        }
+    )
+
+
+def deserialize_chat_message(text: str) -> ChatMessage:
+    data = json.loads(text)
+    assert isinstance(data, dict)
+    return ChatMessage(
+        data["role"],
+        data["content"],
+        name=data["name"],
+        tool_call_id=data["tool_call_id"],
+    )
@@ -0,0 +1,257 @@
+import asyncio
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass
+from typing import Final, TypeVar
+
+from src.domain import Platform
+from src.infrastructure.exceptions import (
+    APIConnectionError,
+    APIRequestError,
+    CircuitOpen,
+)
+from src.settings import (
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    CIRCUIT_BREAKER_RESET_SECONDS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_MAX_DELAY,
+)
+from src.setup_logging import configure_logger
+
+logger = configure_logger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES: Final = frozenset((408, 409, 429))
+
+# Receives the number of the retry (starting at 1) and the error that caused it
+RetryCallback = Callable[[int, Exception], None]
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = RETRY_MAX_ATTEMPTS
+    base_delay: float = RETRY_BASE_DELAY
+    max_delay: float = RETRY_MAX_DELAY
+
+    def compute_delay(self, retry_number: int, rng: random.Random) -> float:
+        """Exponential backoff with full jitter"""
+        assert retry_number >= 1
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (retry_number - 1))
+        return rng.uniform(0, ceiling)
+
+
+def is_retryable(err: Exception) -> bool:
+    """Connection problems, timeouts, throttling and server errors are worth retrying"""
+    if isinstance(err, APIConnectionError):
+        return True
+    if isinstance(err, APIRequestError):
+        status = err.status_code
+        return status is None or status in RETRYABLE_STATUS_CODES or status >= 500
+    return False
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a platform seems to be down. After failure_threshold
+    consecutive failures the circuit opens, and once reset_timeout has passed a
+    single trial request is let through to check whether the platform is back.
+    """
+
+    def __init__(
+        self,
+        api_name: str,
+        *,
+        failure_threshold: int = CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_BREAKER_RESET_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        assert failure_threshold > 0
+        self._api_name: Final = api_name
+        self._failure_threshold: Final = failure_threshold
+        self._reset_timeout: Final = reset_timeout
+        self._clock: Final = clock
+        self._lock: Final = threading.Lock()
+        self._consecutive_failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_progress = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def get_remaining_open_time(self) -> float:
+        """Seconds until a request would be let through (0 when it would be now)"""
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            if self._trial_in_progress:
+                return self._reset_timeout
+            return max(0, self._opened_at + self._reset_timeout - self._clock())
+
+    def before_call(self) -> None:
+        """Raises CircuitOpen if the request should not be sent"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self._reset_timeout - self._clock()
+            if remaining > 0 or self._trial_in_progress:
+                raise CircuitOpen(self._api_name, max(remaining, 0))
+            self._trial_in_progress = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+
+    def release_trial(self) -> None:
+        """
+        Ends the trial request, if any, without changing the state of the circuit,
+        when the request failed for a reason that says nothing about the platform
+        """
+        with self._lock:
+            self._trial_in_progress = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            self._trial_in_progress = False
+            if (
+                self._opened_at is not None
+                or self._consecutive_failures >= self._failure_threshold
+            ):
+                if self._opened_at is None:
+                    logger.warning(f"Circuit opened for {self._api_name}")
+                self._opened_at = self._clock()
+
+
+class RetryHandler:
+    """Retries the failed requests with exponential backoff and a circuit breaker per platform"""
+
+    def __init__(
+        self,
+        policy: RetryPolicy | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: random.Random | None = None,
+    ):
+        self._policy: Final = policy or RetryPolicy()
+        self._clock: Final = clock
+        self._sleep: Final = sleep
+        self._rng: Final = rng or random.Random()
+        self._lock: Final = threading.Lock()
+        self._breakers: dict[Platform | None, CircuitBreaker] = {}
+        self._retry_counts: dict[Platform | None, int] = {}
+
+    def call(
+        self,
+        platform: Platform | None,
+        function: Callable[[], T],
+        *,
+        on_retry: RetryCallback | None = None,
+        retryable: Callable[[Exception], bool] = is_retryable,
+    ) -> T:
+        """Calls the function, retrying it while the errors are retryable"""
+        breaker = self.get_circuit_breaker(platform)
+        retry_number = 0
+        while True:
+            breaker.before_call()
+            try:
+                result = function()
+            except Exception as err:
+                retry_number += 1
+                delay = self._handle_failure(
+                    platform, breaker, err, retry_number, retryable
+                )
+                if on_retry:
+                    on_retry(retry_number, err)
+                self._sleep(delay)
+            except BaseException:
+                breaker.release_trial()
+                raise
+            else:
+                breaker.record_success()
+                return result
+
+    async def call_async(
+        self,
+        platform: Platform | None,
+        function: Callable[[], Awaitable[T]],
+        *,
+        on_retry: RetryCallback | None = None,
+        retryable: Callable[[Exception], bool] = is_retryable,
+    ) -> T:
+        """Same as call, but awaiting the function and the delays"""
+        breaker = self.get_circuit_breaker(platform)
+        retry_number = 0
+        while True:
+            breaker.before_call()
+            try:
+                result = await function()
+            except Exception as err:
+                retry_number += 1
+                delay = self._handle_failure(
+                    platform, breaker, err, retry_number, retryable
+                )
+                if on_retry:
+                    on_retry(retry_number, err)
+                await asyncio.sleep(delay)
+            except BaseException:
+                # a cancelled task
+                breaker.release_trial()
+                raise
+            else:
+                breaker.record_success()
+                return result
+
+    def get_circuit_breaker(self, platform: Platform | None) -> CircuitBreaker:
+        with self._lock:
+            if platform not in self._breakers:
+                api_name = platform.value if platform else "unknown"
+                self._breakers[platform] = CircuitBreaker(api_name, clock=self._clock)
+            return self._breakers[platform]
+
+    def get_retry_count(self, platform: Platform | None) -> int:
+        """Total number of retries made for the platform"""
+        with self._lock:
+            return self._retry_counts.get(platform, 0)
+
+    def _handle_failure(
+        self,
+        platform: Platform | None,
+        breaker: CircuitBreaker,
+        err: Exception,
+        retry_number: int,
+        retryable: Callable[[Exception], bool],
+    ) -> float:
+        """Returns the delay before the next attempt, or raises the error if it should not be retried"""
+        if not retryable(err):
+            # client errors and cancellations neither open nor close the circuit
+            breaker.release_trial()
+            raise err
+        breaker.record_failure()
+        if retry_number >= self._policy.max_attempts:
+            raise err
+        with self._lock:
+            self._retry_counts[platform] = self._retry_counts.get(platform, 0) + 1
+        delay = self._policy.compute_delay(retry_number, self._rng)
+        if isinstance(err, APIRequestError) and err.retry_after:
+            delay = max(delay, err.retry_after)
+        logger.info(f"Retry number {retry_number} in {delay:.2f}s after: {err}")
+        return delay
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> float | None:
+    """Seconds to wait according to the Retry-After header of a response, if present"""
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        return None
@@ -0,0 +1,140 @@
+import threading
+import time
+from dataclasses import dataclass, replace
+
+import httpx
+
+from src.domain import Platform
+from src.settings import (
+    CONNECT_TIMEOUTS,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_READ_TIMEOUT,
+    READ_TIMEOUTS,
+)
+
+# Connection retries made by the transport (other retries are managed by RetryHandler)
+CONNECT_RETRIES = 1
+
+
+@dataclass(frozen=True)
+class TransportSettings:
+    max_connections: int = HTTP_MAX_CONNECTIONS
+    max_keepalive_connections: int = HTTP_MAX_KEEPALIVE_CONNECTIONS
+    keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY
+    connect_timeout: float = HTTP_CONNECT_TIMEOUT
+    read_timeout: float = HTTP_READ_TIMEOUT
+
+    def create_limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def create_timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            self.read_timeout, connect=self.connect_timeout, pool=self.read_timeout
+        )
+
+
+def get_platform_transport_settings(
+    platform: Platform, settings: TransportSettings | None = None
+) -> TransportSettings:
+    """
+    Returns the given settings or, if there are none, the default ones with the
+    timeouts of the platform
+    """
+    if settings:
+        return settings
+    settings = TransportSettings()
+    return replace(
+        settings,
+        connect_timeout=CONNECT_TIMEOUTS.get(platform, settings.connect_timeout),
+        read_timeout=READ_TIMEOUTS.get(platform, settings.read_timeout),
+    )
+
+
+# time of the first byte of the current response, per thread
+_first_byte = threading.local()
+
+
+def reset_first_byte_time() -> None:
+    _first_byte.time = None
+
+
+def mark_first_byte() -> None:
+    """Records the current time unless the first byte has already been received"""
+    if getattr(_first_byte, "time", None) is None:
+        _first_byte.time = time.perf_counter()
+
+
+def get_first_byte_time() -> float | None:
+    """Returns the perf_counter time of the first byte received by this thread"""
+    time_: float | None = getattr(_first_byte, "time", None)
+    return time_
+
+
+def _on_response(response: httpx.Response) -> None:
+    # called when the headers have been received, before reading the body
+    mark_first_byte()
+
+
+_shared_transport: httpx.HTTPTransport | None = None
+_shared_transport_lock = threading.Lock()
+
+
+def get_shared_transport(
+    settings: TransportSettings | None = None,
+) -> httpx.HTTPTransport:
+    """
+    Returns the connection pool shared by all the clients of the process, so warm
+    connections are reused across wrappers and requests. The settings are only
+    used the first time.
+    """
+    global _shared_transport
+    with _shared_transport_lock:
+        if _shared_transport is None:
+            settings = settings or TransportSettings()
+            _shared_transport = httpx.HTTPTransport(
+                limits=settings.create_limits(), retries=CONNECT_RETRIES
+            )
+        return _shared_transport
+
+
+def create_http_client(settings: TransportSettings | None = None) -> httpx.Client:
+    """Creates a client that sends its requests through the shared connection pool"""
+    settings = settings or TransportSettings()
+    return httpx.Client(
+        transport=get_shared_transport(settings),
+        timeout=settings.create_timeout(),
+        follow_redirects=True,
+        event_hooks={"response": [_on_response]},
+    )
+
+
+def create_async_transport(
+    settings: TransportSettings | None = None,
+) -> httpx.AsyncHTTPTransport:
+    """
+    Creates a connection pool for async clients. Unlike the sync one, it can only
+    be shared inside the event loop where it is used.
+    """
+    settings = settings or TransportSettings()
+    return httpx.AsyncHTTPTransport(
+        limits=settings.create_limits(), retries=CONNECT_RETRIES
+    )
+
+
+def create_async_http_client(
+    transport: httpx.AsyncHTTPTransport, settings: TransportSettings | None = None
+) -> httpx.AsyncClient:
+    """Creates an async client that sends its requests through the given connection pool"""
+    settings = settings or TransportSettings()
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=settings.create_timeout(),
+        follow_redirects=True,
+    )
@@ -6,8 +6,25 @@ from dotenv import load_dotenv
 from src.command_handler import ExitException
 from src.controllers.select_model import SelectModelController
 from src.domain import Model
-from src.infrastructure.llm_connection import ClientWrapper
+from src.infrastructure.llm_connection import (
+    ClientWrapper,
+    FakeBehavior,
+    FakeClientWrapper,
+    MetricsRecorder,
+    ResponseCache,
+)
+from src.infrastructure.llm_connection.fake_client_wrapper import (
+    LogNormalLatency,
+)
+from src.infrastructure.main_path_provider import get_main_directory
 from src.models_data import get_models
+from src.settings import (
+    FAKE_LLM_MEDIAN_LATENCY,
+    METRICS_DUMP_FILE,
+    RESPONSE_CACHE_MAX_BYTES,
+    USE_FAKE_LLM_BACKEND,
+    USE_RESPONSE_CACHE,
+)
 from src.setup_engine import setup_engine
 from src.view import Raw, SimpleView, display_neutral_msg
 
@@ -22,14 +39,10 @@ class Main:
     def __init__(self, models: Sequence[Model]) -> None:
         self._select_model_controler = SelectModelController(models)
         self._view = SimpleView()
-        load_dotenv()
-        mistral_api_key = os.environ.get("MISTRAL_API_KEY")
-        openai_api_key = os.environ.get("OPENAI_API_KEY")
+        metrics = MetricsRecorder(get_main_directory() / "data" / METRICS_DUMP_FILE)
+        client_wrapper = create_client_wrapper(metrics)
         self._engine = setup_engine(
-            models,
-            ClientWrapper(
-                mistral_api_key=mistral_api_key, openai_api_key=openai_api_key
-            ),
+            models, client_wrapper, metrics, throttle_probe=client_wrapper
         )
 
     def execute(self) -> None:
@@ -46,6 +59,29 @@ class Main:
             self._engine.process_raw_query(raw_query)
 
 
+def create_client_wrapper(metrics: MetricsRecorder) -> ClientWrapper:
+    if USE_FAKE_LLM_BACKEND:
+        behavior = FakeBehavior(latency=LogNormalLatency(FAKE_LLM_MEDIAN_LATENCY))
+        return FakeClientWrapper(
+            behavior, response_cache=create_response_cache(), metrics=metrics
+        )
+    load_dotenv()
+    return ClientWrapper(
+        mistral_api_key=os.environ.get("MISTRAL_API_KEY"),
+        openai_api_key=os.environ.get("OPENAI_API_KEY"),
+        response_cache=create_response_cache(),
+        metrics=metrics,
+    )
+
+
+def create_response_cache() -> ResponseCache | None:
+    if not USE_RESPONSE_CACHE:
+        return None
+    return ResponseCache(
+        get_main_directory() / "data" / "response_cache", RESPONSE_CACHE_MAX_BYTES
+    )
+
+
 def main() -> None:
     main_instance = Main(get_models())
     try:
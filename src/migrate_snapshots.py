@@ -0,0 +1,64 @@
+"""
+Removes the chat files that are only snapshots of earlier turns of another saved
+conversation, as every turn was saved as a new conversation before new messages
+were appended to the current one. Nothing is removed without --apply.
+
+Usage: python -m src.migrate_snapshots [--apply]
+"""
+
+import argparse
+
+from src.python_modules.FileSystemWrapper.file_manager import FileManager
+
+from src.infrastructure.chat_repository.repository import ChatRepository
+from src.infrastructure.chat_repository.snapshots import (
+    find_superseded_snapshots,
+)
+from src.infrastructure.main_path_provider import get_main_directory
+from src.infrastructure.now import TimeManager
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.migrate_snapshots",
+        description="Removes the superseded snapshots of the saved conversations",
+    )
+    parser.add_argument(
+        "--apply",
+        action="store_true",
+        help="remove the snapshots (by default they are only reported)",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    repository = ChatRepository(
+        get_main_directory(), file_manager=FileManager(), time_manager=TimeManager()
+    )
+    conversation_texts = {
+        conversation_id: repository.load_conversation_as_conversation_text(
+            conversation_id
+        ).text
+        for conversation_id in repository.get_conversation_ids()
+    }
+    superseded = find_superseded_snapshots(conversation_texts)
+    size = sum(
+        repository.get_conversation_file_size(conversation_id)
+        for conversation_id in superseded
+    )
+    print(
+        f"Conversations: {len(conversation_texts)}."
+        f" Superseded snapshots: {len(superseded)} ({size} bytes)."
+    )
+    if not args.apply:
+        if superseded:
+            print("Run with --apply to remove them.")
+        return
+    for conversation_id in superseded:
+        repository.remove_conversation(conversation_id)
+    print(f"Removed: {len(superseded)}.")
+
+
+if __name__ == "__main__":
+    main()
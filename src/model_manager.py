@@ -1,16 +1,67 @@
+import threading
+import time
+from collections.abc import Callable, Sequence
+from functools import partial
 from typing import Final
 
-from src.domain import CompleteMessage, QueryResult
+from src.concurrency import run_first_successful
+from src.domain import (
+    CompleteMessage,
+    DeltaCallback,
+    Model,
+    MultiQueryResult,
+    QueryResult,
+)
+from src.infrastructure.exceptions import (
+    LatencyBudgetExceeded,
+    RequestCancelled,
+)
+from src.models.context_window import ContextWindow
+from src.models.hedging import HedgeOutcome, HedgeScoreboard
 from src.models.messages_ops import add_user_query_in_place
 from src.models.model_wrapper import ModelWrapper
 from src.models.placeholders import QueryText
+from src.models.router import LatencyRouter
 from src.protocols import ClientWrapperProtocol
+from src.setup_logging import configure_logger
+
+logger = configure_logger(__name__)
+
+# Receives the model that is going to answer, before its response is streamed
+ModelCallback = Callable[[Model], None]
 
 
 class ModelManager:
-    def __init__(self, client_wrapper: ClientWrapperProtocol):
+    def __init__(
+        self,
+        client_wrapper: ClientWrapperProtocol,
+        context_window: ContextWindow | None = None,
+        *,
+        hedge_models: Sequence[Model] = (),
+        router: LatencyRouter | None = None,
+        latency_budget: float | None = None,
+        fallback_model: Model | None = None,
+    ):
+        """
+        With hedge_models, every query is also sent to them at the same time (the
+        selected model can be included to send it twice) and the first complete
+        response is kept. With a router, the model of every query is chosen by it,
+        preferring the selected one. When there is no response within the
+        latency_budget (in seconds), the requests are cancelled and the query is
+        sent to the fallback_model, if any.
+        """
         self.model_wrapper: Final = ModelWrapper()
         self.client_wrapper: Final = client_wrapper
+        self.context_window: Final = context_window
+        self.hedge_models: Final = tuple(hedge_models)
+        self.hedge_scoreboard: Final = HedgeScoreboard()
+        self.router: Final = router
+        self.latency_budget: Final = latency_budget
+        self.fallback_model: Final = fallback_model
+        # history and messages sent of the last query, reused while the history grows
+        self._last_fit: tuple[list[CompleteMessage], list[CompleteMessage]] | None = (
+            None
+        )
 
     def get_simple_response(
         self,
@@ -18,9 +69,185 @@ class ModelManager:
         complete_messages: list[CompleteMessage],
         *,
         debug: bool = False,
+        on_delta: DeltaCallback | None = None,
+        on_model: ModelCallback | None = None,
     ) -> QueryResult:
-        assert self.model_wrapper.model
+        """
+        The query and the response are added to complete_messages, which keep the
+        whole history. Only the messages sent are fitted in the context window of the
+        model (of the smallest one when hedging or with a fallback model). on_model
+        is called with the model that answers, and again with the fallback model if
+        the latency budget is exceeded.
+        """
+        model = self.model_wrapper.model
+        assert model
         add_user_query_in_place(complete_messages, query)
+        if self.router:
+            model = self.router.choose(model, complete_messages)
+        if debug:
+            models = [model]
+        else:
+            models = [model, *self.hedge_models]
+        messages = self._fit(
+            complete_messages, [*models, *self._get_fallback_models(models)]
+        )
+        if debug or (len(models) == 1 and self.latency_budget is None):
+            if on_model:
+                on_model(model)
+            query_result = self.client_wrapper.get_simple_response(
+                model,
+                messages,
+                debug=debug,
+                on_delta=on_delta,
+            )
+        else:
+            try:
+                query_result = self._race(models, messages, on_delta, on_model)
+            except LatencyBudgetExceeded as err:
+                fallback_models = self._get_fallback_models(models)
+                if not fallback_models:
+                    raise
+                logger.warning(f"{err} Falling back to {fallback_models[0]}")
+                query_result = self._race(fallback_models, messages, on_delta, on_model)
+        if messages is complete_messages:
+            return query_result
+        complete_messages.append(query_result.messages[-1])
+        return QueryResult(query_result.content, complete_messages, query_result.usage)
+
+    def get_responses(
+        self, query: QueryText, complete_messages: list[CompleteMessage], n: int
+    ) -> MultiQueryResult:
+        """
+        Returns n candidate responses to the query. The query is added to
+        complete_messages, and the messages sent are fitted as in
+        get_simple_response; every candidate has its own copy of the whole history
+        followed by its response.
+        """
+        model = self.model_wrapper.model
+        assert model
+        add_user_query_in_place(complete_messages, query)
+        if self.router:
+            model = self.router.choose(model, complete_messages)
+        messages = self._fit(complete_messages, [model])
+        multi_query_result = self.client_wrapper.get_responses(model, messages, n)
+        return MultiQueryResult(
+            [
+                QueryResult(
+                    candidate.content,
+                    [*complete_messages, candidate.messages[-1]],
+                    candidate.usage,
+                )
+                for candidate in multi_query_result.candidates
+            ],
+            multi_query_result.usage,
+        )
+
+    def _get_fallback_models(self, models: Sequence[Model]) -> list[Model]:
+        if self.fallback_model and self.fallback_model not in models:
+            return [self.fallback_model]
+        return []
+
+    def _fit(
+        self, complete_messages: list[CompleteMessage], models: Sequence[Model]
+    ) -> list[CompleteMessage]:
+        """
+        Returns the messages to send, fitted in the context window of the smallest
+        model, without modifying the history (which is sent as it is when there is
+        no context window). While the history continues the one of the last query,
+        its fitted messages are reused, followed by the new ones, so the history is
+        not trimmed (or summarized) again in every turn.
+        """
+        if not self.context_window:
+            return complete_messages
+        history = list(complete_messages)
+        messages = history
+        last_fit = self._last_fit
+        if last_fit:
+            last_history, last_messages = last_fit
+            if history[: len(last_history)] == last_history:
+                messages = [*last_messages, *history[len(last_history) :]]
+        context_window = self.context_window
+        smallest = min(models, key=context_window.get_budget)
+        fitted = context_window.fit(messages, smallest)
+        self._last_fit = (history, fitted)
+        return fitted
+
+    def _race(
+        self,
+        models: Sequence[Model],
+        complete_messages: list[CompleteMessage],
+        on_delta: DeltaCallback | None,
+        on_model: ModelCallback | None,
+    ) -> QueryResult:
+        """
+        Sends the messages to all the models and returns the first complete response
+        within the latency budget, appended to complete_messages. The other requests
+        are cancelled. A single model streams its response to on_delta as usual;
+        otherwise the winning content is passed to on_delta at once.
+        """
+        streamed = len(models) == 1
+        if streamed and on_model:
+            on_model(models[0])
+        start = time.perf_counter()
+        try:
+            index, query_result = run_first_successful(
+                [
+                    partial(
+                        self._answer_cancellable,
+                        model,
+                        complete_messages,
+                        on_delta if streamed else None,
+                        # a model raced twice must not share the call of the first
+                        model in models[:index],
+                    )
+                    for index, model in enumerate(models)
+                ],
+                timeout=self.latency_budget,
+            )
+        except TimeoutError:
+            assert self.latency_budget is not None
+            raise LatencyBudgetExceeded(
+                [model.model_name for model in models], self.latency_budget
+            ) from None
+        if not streamed:
+            winner = models[index]
+            self.hedge_scoreboard.record(
+                HedgeOutcome(
+                    tuple(model.model_name for model in models),
+                    winner.model_name,
+                    time.perf_counter() - start,
+                )
+            )
+            if on_model:
+                on_model(winner)
+            if on_delta:
+                on_delta(query_result.content)
+        complete_messages.append(query_result.messages[-1])
+        return QueryResult(query_result.content, complete_messages, query_result.usage)
+
+    def _answer_cancellable(
+        self,
+        model: Model,
+        complete_messages: Sequence[CompleteMessage],
+        on_delta: DeltaCallback | None,
+        bypass_cache: bool,
+        cancelled: threading.Event,
+    ) -> QueryResult:
+        """
+        The response is always streamed, so the request can be aborted (closing its
+        connection) as soon as it is no longer needed
+        """
+
+        def forward_unless_cancelled(delta: str = "") -> None:
+            if cancelled.is_set():
+                raise RequestCancelled(model.model_name)
+            if on_delta and delta:
+                on_delta(delta)
+
+        forward_unless_cancelled()
         return self.client_wrapper.get_simple_response(
-            self.model_wrapper.model, complete_messages, debug=debug
+            model,
+            list(complete_messages),
+            on_delta=forward_unless_cancelled,
+            bypass_cache=bypass_cache,
         )
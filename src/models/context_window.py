@@ -0,0 +1,147 @@
+from collections.abc import Callable, Mapping, Sequence
+from typing import Final
+
+from src.domain import ChatMessage, CompleteMessage, Model
+from src.protocols import ClientWrapperProtocol
+from src.settings import (
+    CONTEXT_WINDOW_TOKENS,
+    CONTEXT_WINDOW_TRIM_RATIO,
+    DEFAULT_CONTEXT_WINDOW_TOKENS,
+    RESPONSE_TOKENS_RESERVE,
+)
+from src.setup_logging import configure_logger
+
+logger = configure_logger(__name__)
+
+SUMMARY_PREFIX = "Resumen de la parte anterior de la conversación:\n"
+SUMMARY_PROMPT = (
+    "Resume de forma concisa la siguiente conversación, conservando los datos,"
+    " decisiones y preguntas pendientes necesarios para continuarla:\n\n"
+)
+
+# Receives the turns dropped from the conversation and returns a summary of them
+Summarizer = Callable[[Sequence[CompleteMessage], Model], str]
+
+
+class ContextWindow:
+    """
+    Keeps the messages sent to a model inside its token budget. When the budget is
+    exceeded, the oldest turns are dropped (or summarized, if there is a
+    summarizer) until the messages fit in a fraction of the budget, so the history
+    is not trimmed again in every turn. The system prompt and the last turn are
+    always kept.
+    """
+
+    def __init__(
+        self,
+        budgets: Mapping[str, int] | None = None,
+        default_budget: int = DEFAULT_CONTEXT_WINDOW_TOKENS,
+        *,
+        reserved_tokens: int = RESPONSE_TOKENS_RESERVE,
+        trim_ratio: float = CONTEXT_WINDOW_TRIM_RATIO,
+        summarizer: Summarizer | None = None,
+    ):
+        assert 0 < trim_ratio <= 1
+        self._budgets: Final = budgets if budgets is not None else CONTEXT_WINDOW_TOKENS
+        self._default_budget: Final = default_budget
+        self._reserved_tokens: Final = reserved_tokens
+        self._trim_ratio: Final = trim_ratio
+        self._summarizer: Final = summarizer
+
+    def get_budget(self, model: Model) -> int:
+        """Tokens available for the messages, leaving room for the response"""
+        context_window = self._budgets.get(model.model_name, self._default_budget)
+        return context_window - self._reserved_tokens
+
+    def fit(
+        self, messages: Sequence[CompleteMessage], model: Model
+    ) -> list[CompleteMessage]:
+        budget = self.get_budget(model)
+        if count_tokens(messages) <= budget:
+            return list(messages)
+        system_messages, turns, dropped = self._drop_oldest_turns(messages, budget)
+        if dropped and self._summarizer:
+            summary = self._summarizer(dropped, model)
+            system_messages.append(create_summary_message(summary))
+        fitted = [*system_messages, *(msg for turn in turns for msg in turn)]
+        logger.info(f"{len(dropped)} messages dropped from the context of {model}")
+        if count_tokens(fitted) > budget:
+            logger.warning(f"The last turn does not fit in the budget of {model}")
+        return fitted
+
+    def count_fitted_tokens(
+        self, messages: Sequence[CompleteMessage], model: Model
+    ) -> int:
+        """
+        Tokens of the messages that fit would send to the model, without calling
+        the summarizer (the summary of the dropped turns is not counted)
+        """
+        tokens = count_tokens(messages)
+        budget = self.get_budget(model)
+        if tokens <= budget:
+            return tokens
+        system_messages, turns, _ = self._drop_oldest_turns(messages, budget)
+        return count_tokens(system_messages, *turns)
+
+    def _drop_oldest_turns(
+        self, messages: Sequence[CompleteMessage], budget: int
+    ) -> tuple[
+        list[CompleteMessage], list[list[CompleteMessage]], list[CompleteMessage]
+    ]:
+        """Returns the system prompt, the turns kept and the messages dropped"""
+        system_messages, turns = split_turns(messages)
+        target = int(budget * self._trim_ratio)
+        dropped: list[CompleteMessage] = []
+        while len(turns) > 1 and count_tokens(system_messages, *turns) > target:
+            dropped.extend(turns.pop(0))
+        return system_messages, turns, dropped
+
+
+def count_tokens(*message_groups: Sequence[CompleteMessage]) -> int:
+    return sum(msg.estimated_tokens for messages in message_groups for msg in messages)
+
+
+def split_turns(
+    messages: Sequence[CompleteMessage],
+) -> tuple[list[CompleteMessage], list[list[CompleteMessage]]]:
+    """
+    Separates the system prompt from the turns. A turn starts with a user message.
+    A previous summary is not part of the system prompt, so it is summarized again
+    with the next dropped turns.
+    """
+    start = 0
+    while start < len(messages) and is_system_prompt(messages[start]):
+        start += 1
+    turns: list[list[CompleteMessage]] = []
+    for message in messages[start:]:
+        if not turns or message.chat_msg.role == "user":
+            turns.append([])
+        turns[-1].append(message)
+    return list(messages[:start]), turns
+
+
+def is_system_prompt(message: CompleteMessage) -> bool:
+    return message.chat_msg.role == "system" and not is_summary(message)
+
+
+def is_summary(message: CompleteMessage) -> bool:
+    return message.chat_msg.role == "system" and message.chat_msg.content.startswith(
+        SUMMARY_PREFIX
+    )
+
+
+def create_summary_message(summary: str) -> CompleteMessage:
+    return CompleteMessage(ChatMessage("system", SUMMARY_PREFIX + summary))
+
+
+def create_model_summarizer(client_wrapper: ClientWrapperProtocol) -> Summarizer:
+    """Returns a summarizer that asks the model of the conversation for the summary"""
+
+    def summarize(messages: Sequence[CompleteMessage], model: Model) -> str:
+        transcript = "\n\n".join(
+            f"{msg.chat_msg.role.upper()}: {msg.chat_msg.content}" for msg in messages
+        )
+        query = CompleteMessage(ChatMessage("user", SUMMARY_PROMPT + transcript))
+        return client_wrapper.get_simple_response(model, [query]).content
+
+    return summarize
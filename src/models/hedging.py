@@ -0,0 +1,66 @@
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Final
+
+from src.domain import ModelName
+from src.models.metrics import Percentiles, compute_percentiles
+
+
+@dataclass(frozen=True)
+class HedgeOutcome:
+    """
+    Result of a query sent to several models at the same time. latency is the time,
+    in seconds, until the response of the winner was complete.
+    """
+
+    model_names: tuple[ModelName, ...]
+    winner: ModelName
+    latency: float
+
+
+@dataclass(frozen=True)
+class HedgeStats:
+    """
+    Races entered and won by a model (counted per request, so a model sent twice
+    enters the race twice) and the latency of the responses that won
+    """
+
+    model_name: ModelName
+    races: int
+    wins: int
+    latency: Percentiles | None
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.races if self.races else 0.0
+
+
+class HedgeScoreboard:
+    def __init__(self) -> None:
+        self._lock: Final = threading.Lock()
+        self._outcomes: Final[list[HedgeOutcome]] = []
+
+    def record(self, outcome: HedgeOutcome) -> None:
+        with self._lock:
+            self._outcomes.append(outcome)
+
+    def get_stats(self) -> list[HedgeStats]:
+        """Returns the stats of every model that has entered a race, sorted by name"""
+        with self._lock:
+            outcomes = list(self._outcomes)
+        races: defaultdict[ModelName, int] = defaultdict(int)
+        latencies: defaultdict[ModelName, list[float]] = defaultdict(list)
+        for outcome in outcomes:
+            for model_name in outcome.model_names:
+                races[model_name] += 1
+            latencies[outcome.winner].append(outcome.latency)
+        return [
+            HedgeStats(
+                model_name,
+                races[model_name],
+                len(latencies[model_name]),
+                compute_percentiles(latencies[model_name]),
+            )
+            for model_name in sorted(races)
+        ]
@@ -0,0 +1,90 @@
+import math
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+
+from src.domain import ModelName
+
+
+@dataclass(frozen=True)
+class RequestRecord:
+    """
+    Measurements of a single call to the LLM client. Times are in seconds, measured
+    from the start of the call (so they include the waits of the rate limiter and
+    the retries). time_to_first_byte is the time to the first streamed token, or to
+    the headers of the response when not streaming. Sizes are the UTF-8 size of the
+    contents of the messages sent and received. A coalesced call got the response
+    of an identical call in flight, so it sent no request of its own.
+    """
+
+    timestamp: float
+    model_name: ModelName
+    wall_time: float
+    time_to_first_byte: float | None
+    bytes_sent: int
+    bytes_received: int
+    retries: int
+    cache_hit: bool
+    coalesced: bool = False
+    error: str | None = None
+
+
+@dataclass(frozen=True)
+class Percentiles:
+    p50: float
+    p95: float
+    p99: float
+
+
+@dataclass(frozen=True)
+class ModelStats:
+    model_name: ModelName
+    requests: int
+    errors: int
+    cache_hits: int
+    coalesced: int
+    retries: int
+    bytes_sent: int
+    bytes_received: int
+    wall_time: Percentiles | None
+    time_to_first_byte: Percentiles | None
+
+
+def compute_percentile(sorted_values: Sequence[float], percentile: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    assert sorted_values
+    rank = math.ceil(percentile / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def compute_percentiles(values: Iterable[float]) -> Percentiles | None:
+    sorted_values = sorted(values)
+    if not sorted_values:
+        return None
+    return Percentiles(
+        compute_percentile(sorted_values, 50),
+        compute_percentile(sorted_values, 95),
+        compute_percentile(sorted_values, 99),
+    )
+
+
+def aggregate_records(
+    model_name: ModelName, records: Sequence[RequestRecord]
+) -> ModelStats:
+    """Aggregates the records of a model. Failed requests are left out of the times."""
+    successful = [record for record in records if record.error is None]
+    return ModelStats(
+        model_name=model_name,
+        requests=len(records),
+        errors=len(records) - len(successful),
+        cache_hits=sum(record.cache_hit for record in records),
+        coalesced=sum(record.coalesced for record in records),
+        retries=sum(record.retries for record in records),
+        bytes_sent=sum(record.bytes_sent for record in records),
+        bytes_received=sum(record.bytes_received for record in records),
+        wall_time=compute_percentiles(record.wall_time for record in successful),
+        time_to_first_byte=compute_percentiles(
+            record.time_to_first_byte
+            for record in successful
+            if record.time_to_first_byte is not None
+        ),
+    )
@@ -0,0 +1,59 @@
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Final
+
+from src.models.placeholders import QueryText
+
+PACKED_QUERY_INSTRUCTIONS: Final = (
+    "Responde por separado a cada una de las siguientes consultas numeradas."
+    " Antes de cada respuesta escribe una línea que contenga solo su número con el"
+    " formato `### <número>`, en el mismo orden, y no añadas nada más."
+)
+ITEM_HEADER_PATTERN: Final = re.compile(r"^[ \t]*###[ \t]*(\d+)[ \t]*$", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class PackedQuery:
+    """Several queries sent in a single request, whose text asks for numbered answers"""
+
+    queries: tuple[QueryText, ...]
+    text: QueryText
+
+
+def pack_queries(queries: Sequence[QueryText], size: int) -> list[PackedQuery]:
+    """Groups the queries, keeping their order, in packed queries of up to size queries"""
+    assert size > 0
+    return [
+        create_packed_query(queries[start : start + size])
+        for start in range(0, len(queries), size)
+    ]
+
+
+def create_packed_query(queries: Sequence[QueryText]) -> PackedQuery:
+    """A single query is sent as it is"""
+    assert queries
+    if len(queries) == 1:
+        return PackedQuery(tuple(queries), queries[0])
+    items = [f"### {number}\n{query}" for number, query in enumerate(queries, start=1)]
+    return PackedQuery(
+        tuple(queries), QueryText("\n\n".join([PACKED_QUERY_INSTRUCTIONS, *items]))
+    )
+
+
+def unpack_answers(packed_query: PackedQuery, content: str) -> list[str] | None:
+    """
+    Returns the answer to every query of the packed query, or None if the content
+    does not have exactly one non-empty answer per query, numbered in order.
+    """
+    if len(packed_query.queries) == 1:
+        return [content]
+    matches = list(ITEM_HEADER_PATTERN.finditer(content))
+    numbers = [int(match.group(1)) for match in matches]
+    if numbers != list(range(1, len(packed_query.queries) + 1)):
+        return None
+    ends = [match.start() for match in matches[1:]] + [len(content)]
+    answers = [content[match.end() : end].strip() for match, end in zip(matches, ends)]
+    if not all(answers):
+        return None
+    return answers
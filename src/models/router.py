@@ -0,0 +1,151 @@
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Final, Protocol
+
+from src.domain import CompleteMessage, Model
+from src.models.context_window import ContextWindow, count_tokens
+from src.models.metrics import ModelStats
+from src.settings import (
+    LATENCY_SLO_SECONDS,
+    ROUTER_MAX_ERROR_RATE,
+    ROUTER_MIN_REQUESTS,
+    ROUTER_RECENT_REQUESTS,
+)
+from src.setup_logging import configure_logger
+
+logger = configure_logger(__name__)
+
+
+class ThrottleProbe(Protocol):
+    def get_expected_wait(self, model: Model, tokens: int) -> float: ...
+
+
+class StatsSource(Protocol):
+    def get_stats(self, last: int | None = None) -> list[ModelStats]: ...
+
+
+@dataclass(frozen=True)
+class RoutingPolicy:
+    """
+    latency_slo is the maximum expected latency, in seconds, of the model chosen.
+    Models with an error rate above max_error_rate in their recent_requests are
+    avoided (once they have at least min_requests).
+    """
+
+    latency_slo: float = LATENCY_SLO_SECONDS
+    max_error_rate: float = ROUTER_MAX_ERROR_RATE
+    recent_requests: int = ROUTER_RECENT_REQUESTS
+    min_requests: int = ROUTER_MIN_REQUESTS
+
+
+@dataclass(frozen=True)
+class RouteCandidate:
+    """
+    Evaluation of a model for a query. expected_latency is the time the request
+    would wait to be sent plus the recent p95 of the model (just the wait while the
+    model has not been measured yet).
+    """
+
+    model: Model
+    fits: bool
+    wait: float
+    error_rate: float
+    expected_latency: float
+
+    def is_usable(self, policy: RoutingPolicy) -> bool:
+        return (
+            self.fits
+            and math.isfinite(self.wait)
+            and self.error_rate <= policy.max_error_rate
+        )
+
+
+class LatencyRouter:
+    """
+    Chooses the model of every query. The preferred model is kept while it meets
+    the latency SLO; otherwise the next model of the catalog that meets it is used,
+    so throttled, failing or slow models are skipped. Every model is evaluated on
+    the messages that would be sent to it, fitted in its context window: models
+    that can not hold even the last turn are never chosen, and the size of the
+    fitted prompt counts in the wait for the tokens-per-minute budget. If no model meets the SLO, the usable
+    one with the lowest expected latency is chosen.
+    """
+
+    def __init__(
+        self,
+        models: Sequence[Model],
+        throttle_probe: ThrottleProbe,
+        stats_source: StatsSource,
+        *,
+        context_window: ContextWindow | None = None,
+        policy: RoutingPolicy | None = None,
+    ):
+        assert models
+        self._models: Final = tuple(models)
+        self._throttle_probe: Final = throttle_probe
+        self._stats_source: Final = stats_source
+        self._context_window: Final = context_window
+        self._policy: Final = policy or RoutingPolicy()
+
+    def choose(self, preferred: Model, messages: Sequence[CompleteMessage]) -> Model:
+        candidates = self.evaluate(preferred, messages)
+        policy = self._policy
+        usable = [candidate for candidate in candidates if candidate.is_usable(policy)]
+        if not usable:
+            logger.warning(f"No model can be routed, using {preferred}")
+            return preferred
+        for candidate in usable:
+            if candidate.expected_latency <= policy.latency_slo:
+                chosen = candidate
+                break
+        else:
+            chosen = min(usable, key=lambda candidate: candidate.expected_latency)
+        if chosen.model != preferred:
+            logger.info(f"Query routed to {chosen.model} instead of {preferred}")
+        return chosen.model
+
+    def evaluate(
+        self, preferred: Model, messages: Sequence[CompleteMessage]
+    ) -> list[RouteCandidate]:
+        """Returns the evaluation of every model, starting with the preferred one"""
+        stats_by_name = {
+            stats.model_name: stats
+            for stats in self._stats_source.get_stats(self._policy.recent_requests)
+        }
+        models = [preferred, *(model for model in self._models if model != preferred)]
+        return [
+            self._evaluate_model(
+                model,
+                self._count_tokens(messages, model),
+                stats_by_name.get(model.model_name),
+            )
+            for model in models
+        ]
+
+    def _count_tokens(self, messages: Sequence[CompleteMessage], model: Model) -> int:
+        if self._context_window is None:
+            return count_tokens(messages)
+        return self._context_window.count_fitted_tokens(messages, model)
+
+    def _evaluate_model(
+        self, model: Model, tokens: int, stats: ModelStats | None
+    ) -> RouteCandidate:
+        wait = self._throttle_probe.get_expected_wait(model, tokens)
+        error_rate = 0.0
+        expected_latency = wait
+        if stats:
+            if stats.requests >= self._policy.min_requests:
+                error_rate = stats.errors / stats.requests
+            if stats.wall_time:
+                expected_latency += stats.wall_time.p95
+        return RouteCandidate(
+            model,
+            fits=(
+                self._context_window is None
+                or tokens <= self._context_window.get_budget(model)
+            ),
+            wait=wait,
+            error_rate=error_rate,
+            expected_latency=expected_latency,
+        )
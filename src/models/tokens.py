@@ -0,0 +1,20 @@
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # imported only for type checking, since the domain uses this module
+    from src.domain import ChatMessage
+
+CHARS_PER_TOKEN = 4
+# Tokens used by the provider to delimit every message (role, separators...)
+TOKENS_PER_MESSAGE = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough estimation of the number of tokens of a text, without using a tokenizer"""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def estimate_messages_tokens(messages: Sequence["ChatMessage"]) -> int:
+    """Rough estimation of the number of tokens needed to send the messages"""
+    return sum(TOKENS_PER_MESSAGE + estimate_tokens(msg.content) for msg in messages)
@@ -0,0 +1,53 @@
+import hashlib
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+
+from src.domain import CompleteMessage, ModelName, TokenUsage
+
+# current time of a saved conversation and its messages
+DatedConversation = tuple[str, Sequence[CompleteMessage]]
+
+
+@dataclass(frozen=True)
+class UsageRow:
+    day: str
+    model_name: ModelName
+    responses: int
+    usage: TokenUsage
+
+
+def aggregate_usage(conversations: Iterable[DatedConversation]) -> list[UsageRow]:
+    """
+    Adds up the token usage of the responses per day and model. Every saved
+    conversation repeats the messages of the conversation it continues, so each
+    response is only counted the first time it appears.
+    """
+    seen: set[tuple[object, ...]] = set()
+    totals: dict[tuple[str, ModelName], tuple[int, TokenUsage]] = {}
+    for current_time, messages in conversations:
+        day = current_time.split()[0]
+        for message in messages:
+            if not message.usage:
+                continue
+            model_name = message.model.model_name if message.model else ModelName("")
+            key = (model_name, message.usage, hash_content(message.chat_msg.content))
+            if key in seen:
+                continue
+            seen.add(key)
+            responses, usage = totals.get((day, model_name), (0, TokenUsage(0, 0)))
+            totals[(day, model_name)] = (responses + 1, usage + message.usage)
+    return [
+        UsageRow(day, model_name, responses, usage)
+        for (day, model_name), (responses, usage) in sorted(totals.items())
+    ]
+
+
+def compute_conversation_usage(messages: Sequence[CompleteMessage]) -> TokenUsage:
+    """Total usage of the responses of a conversation"""
+    return sum(
+        (message.usage for message in messages if message.usage), TokenUsage(0, 0)
+    )
+
+
+def hash_content(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
@@ -19,3 +19,17 @@ def get_models() -> Sequence[Model]:
         for model_name_str in model_name_strings:
             models.append(Model(platform, ModelName(model_name_str)))
     return models
+
+
+def find_models_by_name(
+    models: Sequence[Model], model_names: Sequence[str]
+) -> list[Model]:
+    """
+    Returns the models with the given names, in the same order and including the
+    repeated ones
+    """
+    models_by_name = {model.model_name: model for model in models}
+    try:
+        return [models_by_name[ModelName(name)] for name in model_names]
+    except KeyError as err:
+        raise ValueError(f"Unknown model: {err.args[0]}") from err
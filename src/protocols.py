@@ -6,11 +6,17 @@ from src.domain import (
     CompleteMessage,
     ConversationId,
     ConversationText,
+    DeltaCallback,
     Model,
     ModelName,
+    MultiQueryResult,
     QueryResult,
 )
+from src.models.hedging import HedgeStats
+from src.models.metrics import ModelStats
 from src.models.placeholders import Placeholder
+from src.models.usage import UsageRow
+from src.serde.shared import ConversationHeader
 from src.view.generic_view import EscapedStr, Raw
 from src.view.io_helpers import SimpleView
 
@@ -25,14 +31,47 @@ class ClientWrapperProtocol(Protocol):
         tools: list[dict[str, Any]] | None = None,
         tool_choice: str = "none",
         random_seed: int | None = None,
+        on_delta: DeltaCallback | None = None,
+        bypass_cache: bool = False,
     ) -> QueryResult: ...
 
+    def get_responses(
+        self,
+        model: Model,
+        complete_messages: Sequence[CompleteMessage],
+        n: int,
+        *,
+        random_seed: int | None = None,
+    ) -> MultiQueryResult: ...
+
+
+class AsyncClientWrapperProtocol(Protocol):
+    async def get_simple_response(
+        self,
+        model: Model,
+        complete_messages: list[CompleteMessage],
+        *,
+        tools: list[dict[str, Any]] | None = None,
+        tool_choice: str = "none",
+        random_seed: int | None = None,
+    ) -> QueryResult: ...
+
+    async def close(self) -> None: ...
+
 
 class ChatRepositoryProtocol(Protocol):
 
     def get_conversation_ids(self) -> list[ConversationId]: ...
 
-    def save_messages(self, complete_messages: Sequence[CompleteMessage]) -> None: ...
+    def save_messages(
+        self, complete_messages: Sequence[CompleteMessage]
+    ) -> ConversationId: ...
+
+    def append_messages(
+        self,
+        conversation_id: ConversationId,
+        complete_messages: Sequence[CompleteMessage],
+    ) -> None: ...
 
     def load_conversation(
         self, conversation_id: ConversationId
@@ -42,6 +81,10 @@ class ChatRepositoryProtocol(Protocol):
         self, conversation_id: ConversationId
     ) -> ConversationText: ...
 
+    def load_conversation_header(
+        self, conversation_id: ConversationId
+    ) -> ConversationHeader: ...
+
 
 class TimeManagerProtocol(Protocol):
     def get_current_time(self) -> str: ...
@@ -57,6 +100,14 @@ class ViewProtocol(Protocol):
         query: Raw,
         content: Raw,
     ) -> None: ...
+    def print_interaction_header(
+        self,
+        time_manager: TimeManagerProtocol,
+        model_name: ModelName,
+        query: Raw,
+    ) -> None: ...
+    def print_content_delta(self, delta: Raw) -> None: ...
+    def finish_streamed_interaction(self) -> None: ...
     def get_raw_substitutions_from_user(
         self,
         unique_placeholders: Sequence[Placeholder],
@@ -76,3 +127,10 @@ class ViewProtocol(Protocol):
     ) -> None: ...
     def display_processing_query_text(self, *, current: int, total: int) -> None: ...
     def show_error_msg(self, text: EscapedStr | Raw) -> None: ...
+    def display_stats(
+        self, stats: Sequence[ModelStats], hedge_stats: Sequence[HedgeStats] = ()
+    ) -> None: ...
+    def display_usage(self, rows: Sequence[UsageRow]) -> None: ...
+    def display_conversation_headers(
+        self, headers: Sequence[ConversationHeader], *, page: int, number_of_pages: int
+    ) -> None: ...
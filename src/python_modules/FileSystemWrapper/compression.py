@@ -0,0 +1,50 @@
+import gzip
+import importlib
+import lzma
+from enum import Enum
+from pathlib import PurePath
+from types import ModuleType
+from typing import IO, Literal, cast
+
+zstandard: ModuleType | None
+try:
+    zstandard = importlib.import_module("zstandard")
+except ImportError:  # optional dependency
+    zstandard = None
+
+TextMode = Literal["r", "w"]
+
+
+class Compression(Enum):
+    """Compressed encodings of text files, named after their file extension"""
+
+    GZIP = "gz"
+    LZMA = "xz"
+    ZSTD = "zst"
+
+    @property
+    def extension(self) -> str:
+        return self.value
+
+    @property
+    def is_available(self) -> bool:
+        """zstd needs the optional zstandard package"""
+        return self is not Compression.ZSTD or zstandard is not None
+
+
+def open_text_file(
+    path: PurePath, mode: TextMode, compression: Compression | None = None
+) -> IO[str]:
+    """Opens a UTF-8 text file, compressing or decompressing it on the fly"""
+    if compression is None:
+        return open(path, mode, encoding="utf-8")
+    text_mode: Literal["rt", "wt"] = "rt" if mode == "r" else "wt"
+    match compression:
+        case Compression.GZIP:
+            return gzip.open(path, text_mode, encoding="utf-8")
+        case Compression.LZMA:
+            return lzma.open(path, text_mode, encoding="utf-8")
+        case Compression.ZSTD:
+            if zstandard is None:
+                raise ValueError("zstd compression requires the zstandard package")
+            return cast(IO[str], zstandard.open(path, text_mode, encoding="utf-8"))
@@ -1,5 +1,9 @@
+import os
+from collections.abc import Generator
 from pathlib import Path, PurePath
 
+from .compression import Compression, open_text_file
+
 
 class FileManager:
     """Manage all the file R/W operations"""
@@ -10,23 +14,49 @@ class FileManager:
     def get_children(self, path: PurePath) -> list[PurePath]:
         return [PurePath(p) for p in Path(path).iterdir()]
 
+    def get_file_names(self, path: PurePath) -> list[str]:
+        """Names of the children that are files, without building a path for each one"""
+        with os.scandir(path) as entries:
+            return [entry.name for entry in entries if entry.is_file()]
+
     def path_exists(self, path: PurePath) -> bool:
         return Path(path).exists()
 
     def path_is_dir(self, path: PurePath) -> bool:
         return Path(path).is_dir()
 
-    def write_file(self, path: PurePath, text: str) -> None:
-        with open(Path(path), "w", encoding="utf-8") as file:
+    def write_file(
+        self, path: PurePath, text: str, compression: Compression | None = None
+    ) -> None:
+        with open_text_file(path, "w", compression) as file:
             file.write(text)
 
-    def read_file(self, path: PurePath) -> str:
-        with open(Path(path), "r", encoding="utf-8") as file:
+    def read_file(self, path: PurePath, compression: Compression | None = None) -> str:
+        with open_text_file(path, "r", compression) as file:
             text = file.read()
         return text
 
+    def iter_lines(
+        self, path: PurePath, compression: Compression | None = None
+    ) -> Generator[str, None, None]:
+        """
+        Yields the lines of the file without line breaks, reading (and decompressing)
+        them lazily
+        """
+        with open_text_file(path, "r", compression) as file:
+            for line in file:
+                yield line.rstrip("\n")
+
+    def get_file_size(self, path: PurePath) -> int:
+        """Size of the file in bytes"""
+        return Path(path).stat().st_size
+
     def rename_path(self, path: PurePath, new_path: PurePath) -> None:
         Path(path).rename(Path(new_path))
 
+    def replace_path(self, path: PurePath, new_path: PurePath) -> None:
+        """Renames the path, atomically replacing new_path if it exists"""
+        Path(path).replace(Path(new_path))
+
     def unlink_path(self, path: PurePath) -> None:
         Path(path).unlink()
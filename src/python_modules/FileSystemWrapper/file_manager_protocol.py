@@ -1,6 +1,9 @@
+from collections.abc import Generator
 from pathlib import PurePath
 from typing import Protocol
 
+from .compression import Compression
+
 
 class FileManagerProtocol(Protocol):
     """Protocol to manage all the file R/W operations"""
@@ -9,14 +12,28 @@ class FileManagerProtocol(Protocol):
 
     def get_children(self, path: PurePath) -> list[PurePath]: ...
 
+    def get_file_names(self, path: PurePath) -> list[str]: ...
+
     def path_exists(self, path: PurePath) -> bool: ...
 
     def path_is_dir(self, path: PurePath) -> bool: ...
 
-    def write_file(self, path: PurePath, text: str) -> None: ...
+    def write_file(
+        self, path: PurePath, text: str, compression: Compression | None = None
+    ) -> None: ...
+
+    def read_file(
+        self, path: PurePath, compression: Compression | None = None
+    ) -> str: ...
 
-    def read_file(self, path: PurePath) -> str: ...
+    def iter_lines(
+        self, path: PurePath, compression: Compression | None = None
+    ) -> Generator[str, None, None]: ...
+
+    def get_file_size(self, path: PurePath) -> int: ...
 
     def rename_path(self, path: PurePath, new_path: PurePath) -> None: ...
 
+    def replace_path(self, path: PurePath, new_path: PurePath) -> None: ...
+
     def unlink_path(self, path: PurePath) -> None: ...
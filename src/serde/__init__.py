@@ -1,15 +1,20 @@
-from .deserialize import deserialize_conversation_text_into_messages
+from .deserialize import (
+    deserialize_conversation_text_into_messages,
+    deserialize_header,
+)
 from .serialize import (
     NUMBER_OF_DIGITS,
     convert_digits_to_conversation_id,
     serialize_conversation,
 )
-from .shared import Conversation
+from .shared import Conversation, ConversationHeader
 
 __all__ = [
     "NUMBER_OF_DIGITS",
     "Conversation",
+    "ConversationHeader",
     "convert_digits_to_conversation_id",
     "deserialize_conversation_text_into_messages",
+    "deserialize_header",
     "serialize_conversation",
 ]
@@ -1,4 +1,5 @@
 import re
+from collections.abc import Iterable
 from dataclasses import dataclass
 from enum import Enum
 from typing import Final, Mapping
@@ -10,10 +11,12 @@ from src.domain import (
     ConversationText,
     Model,
     ModelName,
+    SchemaVersionId,
+    TokenUsage,
 )
 from src.models_data import get_models
 
-from .shared import SCHEMA_VERSION, Conversation
+from .shared import SUPPORTED_SCHEMA_VERSIONS, Conversation, ConversationHeader
 
 
 class TagType(Enum):
@@ -27,11 +30,20 @@ class TagType(Enum):
 class RoleInfo:
     role: str
     model_name: ModelName | None = None
+    usage: TokenUsage | None = None
 
 
 tag_types: Final[Mapping[str, TagType]] = dict(META=TagType.META, ROLE=TagType.ROLE)
 possible_roles: Final = ("system", "user", "assistant", "tool")
 
+TAG_PATTERN: Final = re.compile(r"^\[(META|ROLE) .*\]$")
+PROPERTY_TAG_PATTERN: Final = re.compile(r"^\[(META|ROLE)( [A-Z]+)? (.*)\]$")
+PROPERTY_PATTERN: Final = re.compile(r"([a-z_]+)=([ .\-:_a-z0-9]+)")
+ROLE_TAG_PATTERN: Final = re.compile(r"^\[ROLE ([A-Z]+)(.*)\]$")
+ROLE_PROPERTY_PATTERN: Final = re.compile(
+    r"(model)=([-._a-z0-9]+)|(prompt_tokens|completion_tokens)=([0-9]+)"
+)
+
 
 @dataclass
 class ParsedLine:
@@ -41,8 +53,7 @@ class ParsedLine:
         self,
     ) -> None:
         assert "\n" not in self.line
-        pattern = re.compile(r"^\[(META|ROLE) .*\]$")
-        self.match = pattern.match(self.line)
+        self.match = TAG_PATTERN.match(self.line)
 
     def is_tag(self) -> bool:
         return bool(self.match)
@@ -51,43 +62,106 @@ class ParsedLine:
         if not self.is_tag():
             return None
         assert self.match
-        return tag_types[self.match.groups()[0]]
+        return tag_types[self.match.group(1)]
 
     def get_property(self) -> tuple[str, str]:
         assert self.is_tag()
-        pattern = re.compile(r"^\[(META|ROLE)( [A-Z]+)? (.*)\]$")
-        match = pattern.match(self.line)
-        if not match:
-            raise ValueError(self)
-        second = match.groups()[2]
-        second = second.strip()
-        property_match = re.match(r"([a-z_]+)=([ .\-:_a-z0-9]+)", second)
-        if not property_match:
-            raise ValueError(self)
-        groups = property_match.groups()
-        return (groups[0], groups[1])
+        return parse_property(self.line)
 
     def get_role_info(self) -> RoleInfo | None:
         if self.get_tag_type() is not TagType.ROLE:
             return None
-        assert self.match
-        pattern = re.compile(r"^\[ROLE ([A-Z]+)(.*)\]$")
-        match = pattern.match(self.line)
-        if not match:
-            raise ValueError(pattern)
-        first = match.groups()[0]
-        if not isinstance(first, str) or not first.isupper():
-            raise ValueError(first)
-        if (role := first.lower()) not in possible_roles:
-            raise ValueError("Role unknown: " + first)
-        second = match.groups()[1].strip()
-        if not second:
-            return RoleInfo(role)
-        model_match = re.match(r"model=([.-_a-z0-9]+)", second)
-        if not model_match:
-            raise ValueError(second)
-        model_name = ModelName(model_match.groups()[0])
-        return RoleInfo(role, model_name)
+        return parse_role_info(self.line)
+
+
+def get_tag_type(line: str) -> TagType | None:
+    if not line.startswith("["):
+        return None
+    match = TAG_PATTERN.match(line)
+    return tag_types[match.group(1)] if match else None
+
+
+def parse_property(tag: str) -> tuple[str, str]:
+    match = PROPERTY_TAG_PATTERN.match(tag)
+    if not match:
+        raise ValueError(tag)
+    second = match.group(3).strip()
+    property_match = PROPERTY_PATTERN.match(second)
+    if not property_match:
+        raise ValueError(tag)
+    return (property_match.group(1), property_match.group(2))
+
+
+def parse_role_info(tag: str) -> RoleInfo:
+    match = ROLE_TAG_PATTERN.match(tag)
+    if not match:
+        raise ValueError(ROLE_TAG_PATTERN)
+    first = match.group(1)
+    if not first.isupper():
+        raise ValueError(first)
+    if (role := first.lower()) not in possible_roles:
+        raise ValueError("Role unknown: " + first)
+    second = match.group(2).strip()
+    if not second:
+        return RoleInfo(role)
+    properties = dict(parse_role_property(part) for part in second.split())
+    model_name = properties.pop("model", None)
+    usage = None
+    if "prompt_tokens" in properties or "completion_tokens" in properties:
+        usage = TokenUsage(
+            int(properties.pop("prompt_tokens")),
+            int(properties.pop("completion_tokens")),
+        )
+    if properties:
+        raise ValueError(second)
+    return RoleInfo(role, ModelName(model_name) if model_name else None, usage)
+
+
+def parse_role_property(text: str) -> tuple[str, str]:
+    property_match = ROLE_PROPERTY_PATTERN.fullmatch(text)
+    if not property_match:
+        raise ValueError(text)
+    key, value = (group for group in property_match.groups() if group is not None)
+    return (key, value)
+
+
+@dataclass
+class MetaProperties:
+    """Properties of the META tags of a conversation, collected while parsing it"""
+
+    conversation_id: ConversationId | None = None
+    schema_version: SchemaVersionId | None = None
+    number_of_messages: int | None = None
+    current_time: str | None = None
+
+    def add(self, key: str, value: str) -> None:
+        if key == "id":
+            assert not self.conversation_id
+            self.conversation_id = ConversationId(value)
+        elif key == "schema_version":
+            assert value in SUPPORTED_SCHEMA_VERSIONS
+            self.schema_version = SchemaVersionId(value)
+        elif key == "number_of_messages":
+            assert self.number_of_messages is None
+            assert value.isdigit()
+            self.number_of_messages = int(value)
+        elif key == "current_time":
+            assert self.current_time is None
+            self.current_time = value
+        else:
+            raise ValueError(f"Key {key} not recognized")
+
+    def build_header(self) -> ConversationHeader:
+        assert self.conversation_id
+        assert self.number_of_messages
+        assert self.current_time
+        assert self.schema_version
+        return ConversationHeader(
+            self.conversation_id,
+            self.schema_version,
+            self.number_of_messages,
+            self.current_time,
+        )
 
 
 def deserialize_into_conversation_object(
@@ -96,47 +170,36 @@ def deserialize_into_conversation_object(
     preserve_model: bool = False,
     check_model_exists: bool = True,
 ) -> Conversation:
-    conversation_id = None
-    number_of_messages = None
-    current_time = None
+    meta_properties = MetaProperties()
+    messages = parse_conversation_text(
+        conversation_text,
+        preserve_model=preserve_model,
+        check_model_exists=check_model_exists,
+        meta_properties=meta_properties,
+    )
+    header = meta_properties.build_header()
+    return Conversation(
+        header.id,
+        header.schema_version,
+        header.number_of_messages,
+        header.current_time,
+        messages,
+    )
 
-    assert conversation_text.schema_version == SCHEMA_VERSION
-    text = conversation_text.text
 
-    lines = text.split("\n")
+def deserialize_header(lines: Iterable[str]) -> ConversationHeader:
+    """
+    Parses the META tags of a conversation from the lines of its text, without
+    line breaks. The lines are consumed only until the first ROLE tag.
+    """
+    meta_properties = MetaProperties()
     for line in lines:
-        parsed = ParsedLine(line)
-        if parsed.get_tag_type() == TagType.META:
-            key, value = parsed.get_property()
-            if key == "id":
-                assert not conversation_id
-                conversation_id = ConversationId(value)
-            elif key == "schema_version":
-                assert value == SCHEMA_VERSION
-            elif key == "number_of_messages":
-                assert number_of_messages is None
-                assert value.isdigit()
-                number_of_messages = int(value)
-            elif key == "current_time":
-                assert current_time is None
-                current_time = value
-            else:
-                raise ValueError(f"Key {key} not recognized")
-
-    assert conversation_id
-    assert number_of_messages
-    assert current_time
-    return Conversation(
-        conversation_id,
-        SCHEMA_VERSION,
-        number_of_messages,
-        current_time,
-        deserialize_conversation_text_into_messages(
-            conversation_text,
-            preserve_model=preserve_model,
-            check_model_exists=check_model_exists,
-        ),
-    )
+        tag_type = get_tag_type(line)
+        if tag_type is TagType.ROLE:
+            break
+        if tag_type is TagType.META:
+            meta_properties.add(*parse_property(line))
+    return meta_properties.build_header()
 
 
 def deserialize_conversation_text_into_messages(
@@ -145,40 +208,63 @@ def deserialize_conversation_text_into_messages(
     preserve_model: bool = False,
     check_model_exists: bool = True,
 ) -> list[CompleteMessage]:
-    assert conversation_text.schema_version == SCHEMA_VERSION
-    text = conversation_text.text
+    return parse_conversation_text(
+        conversation_text,
+        preserve_model=preserve_model,
+        check_model_exists=check_model_exists,
+    )
 
-    lines = text.split("\n")
-    role_tags_indexes: list[int] = []
-    for i, line in enumerate(lines):
-        parsed = ParsedLine(line)
-        if parsed.get_tag_type() == TagType.ROLE:
-            role_tags_indexes.append(i)
 
+def parse_conversation_text(
+    conversation_text: ConversationText,
+    *,
+    preserve_model: bool,
+    check_model_exists: bool,
+    meta_properties: MetaProperties | None = None,
+) -> list[CompleteMessage]:
+    """
+    Parses the messages in a single pass over the lines, collecting the properties
+    of the META tags in meta_properties, if provided. The content of a message is
+    made of the lines between its ROLE tag and the next one.
+    """
+    assert conversation_text.schema_version in SUPPORTED_SCHEMA_VERSIONS
     complete_messages: list[CompleteMessage] = []
-    role_tags_count = len(role_tags_indexes)
-    for i in range(role_tags_count):
-        start = role_tags_indexes[i] + 1
-        if i < role_tags_count - 1:
-            end = role_tags_indexes[i + 1]
-            this_role_lines = lines[start:end]
-        else:
-            assert i == role_tags_count - 1
-            this_role_lines = lines[start:]
-        this_role_text = "\n".join(this_role_lines).strip()
-        role_info = ParsedLine(lines[role_tags_indexes[i]]).get_role_info()
+    models_by_name: dict[ModelName, Model | None] = {}
+    role_info: RoleInfo | None = None
+    content_lines: list[str] = []
+
+    def add_message() -> None:
         assert role_info
         chat_message = ChatMessage(
             role=role_info.role,
-            content=this_role_text,
+            content="\n".join(content_lines).strip(),
         )
         model_name = role_info.model_name if preserve_model else None
         model = None
         if model_name:
-            model = determine_model(model_name, check_existence=check_model_exists)
-
-        complete_messages.append(CompleteMessage(chat_msg=chat_message, model=model))
+            if model_name not in models_by_name:
+                models_by_name[model_name] = determine_model(
+                    model_name, check_existence=check_model_exists
+                )
+            model = models_by_name[model_name]
+        complete_messages.append(
+            CompleteMessage(chat_msg=chat_message, model=model, usage=role_info.usage)
+        )
 
+    for line in conversation_text.text.split("\n"):
+        tag_type = get_tag_type(line)
+        if tag_type is TagType.ROLE:
+            if role_info:
+                add_message()
+            role_info = parse_role_info(line)
+            content_lines = []
+            continue
+        if tag_type is TagType.META and meta_properties:
+            meta_properties.add(*parse_property(line))
+        if role_info:
+            content_lines.append(line)
+    if role_info:
+        add_message()
     return complete_messages
 
 
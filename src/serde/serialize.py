@@ -1,6 +1,6 @@
 from typing import Sequence, cast
 
-from src.domain import CompleteMessage, ConversationId
+from src.domain import CompleteMessage, ConversationId, SchemaVersionId
 
 from .deserialize import TagType
 from .shared import SCHEMA_VERSION
@@ -33,22 +33,43 @@ def serialize_conversation(
     conversation_id: ConversationId,
     current_time: str,
 ) -> str:
-    number_of_messages = len(complete_messages)
+    return serialize_header(
+        conversation_id, len(complete_messages), current_time
+    ) + serialize_messages(complete_messages)
+
+
+def serialize_header(
+    conversation_id: ConversationId,
+    number_of_messages: int,
+    current_time: str,
+    schema_version: SchemaVersionId = SCHEMA_VERSION,
+) -> str:
     builder = SerializedConversationBuilder()
     builder.add_meta_tag("id", conversation_id)
     builder.add_line_break()
-    builder.add_meta_tag("schema_version", SCHEMA_VERSION)
+    builder.add_meta_tag("schema_version", schema_version)
     builder.add_meta_tag("number_of_messages", number_of_messages)
     builder.add_meta_tag("current_time", current_time)
-    for complete_message in complete_messages:
-        builder.add_line_break()
-        builder.add_role_tag(complete_message)
-        message = complete_message.chat_msg
-        assert isinstance(message.content, str)
-        builder.add_text(message.content)
     return builder.build()
 
 
+def serialize_messages(complete_messages: Sequence[CompleteMessage]) -> str:
+    """
+    The messages as they follow the header in a conversation, so the messages of a
+    conversation can be appended to its text
+    """
+    return "".join(
+        f"\n\n{serialize_message(complete_message)}"
+        for complete_message in complete_messages
+    )
+
+
+def serialize_message(complete_message: CompleteMessage) -> str:
+    message = complete_message.chat_msg
+    assert isinstance(message.content, str)
+    return f"{create_role_tag(complete_message)}\n{message.content}"
+
+
 def convert_digits_to_conversation_id(string: str) -> ConversationId:
     if not string.isdigit() or len(string) > NUMBER_OF_DIGITS:
         raise ValueError(f'"{string} "no pudo convertirse en un ConversationId')
@@ -58,10 +79,15 @@ def convert_digits_to_conversation_id(string: str) -> ConversationId:
 def create_role_tag(complete_message: CompleteMessage) -> str:
     message = complete_message.chat_msg
     tag_identifier = f"ROLE {message.role.upper()}"
+    properties: list[tuple[str, object]] = []
     if model := complete_message.model:
         assert message.role == "assistant"
-        return create_tag(tag_identifier, ("model", model.model_name))
-    return create_tag(tag_identifier)
+        properties.append(("model", model.model_name))
+    if usage := complete_message.usage:
+        assert message.role == "assistant"
+        properties.append(("prompt_tokens", usage.prompt_tokens))
+        properties.append(("completion_tokens", usage.completion_tokens))
+    return create_tag(tag_identifier, *properties)
 
 
 def create_meta_tag(key: str, value: object) -> str:
@@ -72,11 +98,10 @@ def create_tag_with_property(tag_type: TagType, key: str, value: object) -> str:
     return create_tag(tag_type.value.upper(), (key, value))
 
 
-def create_tag(tag_identifier: str, property: tuple[str, object] | None = None) -> str:
+def create_tag(tag_identifier: str, *properties: tuple[str, object]) -> str:
     assert tag_identifier.isupper()
     parts = [tag_identifier]
-    if property:
-        key, value = property
+    for key, value in properties:
         extra = f"{key}={value}"
         parts.append(extra)
     inner = " ".join(parts)
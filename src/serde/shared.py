@@ -1,9 +1,12 @@
 from collections.abc import Sequence
 from dataclasses import dataclass
+from typing import Final
 
 from src.domain import CompleteMessage, ConversationId, SchemaVersionId
 
-SCHEMA_VERSION = SchemaVersionId("0.2")
+# 0.3 adds the token usage to the role tags of the assistant messages
+SCHEMA_VERSION = SchemaVersionId("0.3")
+SUPPORTED_SCHEMA_VERSIONS: Final = (SchemaVersionId("0.2"), SCHEMA_VERSION)
 
 
 @dataclass(frozen=True)
@@ -13,3 +16,13 @@ class Conversation:
     number_of_messages: int
     current_time: str
     messages: Sequence[CompleteMessage]
+
+
+@dataclass(frozen=True)
+class ConversationHeader:
+    """The properties of the META tags of a conversation, without its messages"""
+
+    id: ConversationId
+    schema_version: SchemaVersionId
+    number_of_messages: int
+    current_time: str
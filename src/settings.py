@@ -1,2 +1,121 @@
+from typing import Final, Mapping, Sequence
+
+from src.python_modules.FileSystemWrapper.compression import Compression
+
+from src.domain import Platform
+
 # settings
 QUERY_NUMBER_LIMIT_WARNING = 5
+
+# Display the responses as they are generated (only for single queries)
+STREAM_RESPONSES = False
+
+# Send every query also to these models at the same time and keep the first complete
+# response (include the selected model to send it twice). Empty to disable it
+HEDGE_MODEL_NAMES: Final[Sequence[str]] = ()
+
+# Choose the model of every query automatically, keeping the selected one while its
+# expected latency (recent p95 plus the wait to be sent) is below the SLO
+AUTOMATIC_ROUTING = False
+LATENCY_SLO_SECONDS = 10.0
+# models that can be chosen (all the models of the catalog when empty)
+ROUTER_MODEL_NAMES: Final[Sequence[str]] = ()
+ROUTER_RECENT_REQUESTS = 20
+ROUTER_MIN_REQUESTS = 3
+ROUTER_MAX_ERROR_RATE = 0.25
+
+# Maximum number of candidate responses requested with `/n`
+MAX_SAMPLES_PER_QUERY = 8
+
+# Number of conversations shown in every page of `/list`
+CONVERSATIONS_PAGE_SIZE = 20
+
+# Save the conversations in the content-addressed message store (`data/store`), where
+# every message is saved only once, instead of a chat file each (`data/chats`). Run
+# `python -m src.compact_chats` first to convert the saved conversations
+USE_MESSAGE_STORE = False
+# Compression of the new chat files (None, or Compression.GZIP, LZMA or ZSTD, which
+# needs the zstandard package). Chat files with any compression are still read
+CHAT_COMPRESSION: Compression | None = None
+
+# Answer with a local fake backend instead of the APIs (for offline load tests)
+USE_FAKE_LLM_BACKEND = False
+FAKE_LLM_MEDIAN_LATENCY = 0.8
+
+# Context window of every model, in tokens. The oldest turns of long conversations
+# are dropped (or summarized) to keep the messages sent inside it
+CONTEXT_WINDOW_TOKENS: Final[Mapping[str, int]] = {
+    "mistral-tiny": 32_000,
+    "mistral-small-latest": 32_000,
+    "mistral-medium": 32_000,
+    "mistral-large-2402": 32_000,
+    "gpt-3.5-turbo": 16_385,
+    "gpt-4-1106-preview": 128_000,
+}
+DEFAULT_CONTEXT_WINDOW_TOKENS = 8_192
+RESPONSE_TOKENS_RESERVE = 1_024
+# fraction of the budget used after trimming, so it is not trimmed in every turn
+CONTEXT_WINDOW_TRIM_RATIO = 0.75
+SUMMARIZE_DROPPED_TURNS = False
+
+# Send the queries generated by a `/for` placeholder concurrently
+CONCURRENT_QUERIES = False
+
+# Send the queries generated by `/for` in groups of this size, each group in a single
+# request whose answer is split into one conversation per query (0 to disable it)
+PACKED_QUERIES_SIZE = 0
+
+# Maximum number of queries in flight at the same time, per platform
+MAX_IN_FLIGHT_QUERIES: Final[Mapping[Platform, int]] = {
+    Platform.Mistral: 4,
+    Platform.OpenAI: 8,
+}
+DEFAULT_MAX_IN_FLIGHT_QUERIES = 4
+
+# Budgets used to pace the requests to the APIs, per platform and model
+REQUESTS_PER_MINUTE: Final[Mapping[Platform, int]] = {
+    Platform.Mistral: 60,
+    Platform.OpenAI: 60,
+}
+TOKENS_PER_MINUTE: Final[Mapping[Platform, int]] = {
+    Platform.Mistral: 500_000,
+    Platform.OpenAI: 60_000,
+}
+DEFAULT_REQUESTS_PER_MINUTE = 30
+DEFAULT_TOKENS_PER_MINUTE = 60_000
+
+# On-disk cache of the responses, addressed by the content of the request
+USE_RESPONSE_CACHE = False
+RESPONSE_CACHE_MAX_BYTES = 50 * 1024**2
+
+# Measurements of every request, appended as JSONL (relative to the data directory)
+METRICS_DUMP_FILE = "metrics/requests.jsonl"
+
+# Retries of the failed requests and circuit breaker per platform
+RETRY_MAX_ATTEMPTS = 4
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+CIRCUIT_BREAKER_RESET_SECONDS = 30.0
+
+# Connection pool shared by all the HTTP clients of the process
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10
+HTTP_KEEPALIVE_EXPIRY = 60.0
+HTTP_CONNECT_TIMEOUT = 10.0
+HTTP_READ_TIMEOUT = 120.0
+# Timeouts of every platform, in seconds (the HTTP_* ones are used for the rest).
+# The read timeout bounds the wait for each chunk of data, not the whole response
+CONNECT_TIMEOUTS: Final[Mapping[Platform, float]] = {
+    Platform.Mistral: 5.0,
+    Platform.OpenAI: 5.0,
+}
+READ_TIMEOUTS: Final[Mapping[Platform, float]] = {
+    Platform.Mistral: 60.0,
+    Platform.OpenAI: 60.0,
+}
+
+# Maximum seconds to wait for the response of a query (None for no limit). When it
+# is exceeded, the request is cancelled and the query sent to the fallback model
+QUERY_LATENCY_BUDGET_SECONDS: float | None = None
+FALLBACK_MODEL_NAME: str | None = None
@@ -7,23 +7,62 @@ from src.controllers.command_interpreter import CommandInterpreter
 from src.controllers.select_model import SelectModelController
 from src.domain import Model
 from src.engine import MainEngine
+from src.infrastructure.chat_repository.message_store import (
+    MessageStoreRepository,
+)
 from src.infrastructure.chat_repository.repository import ChatRepository
+from src.infrastructure.llm_connection.metrics import MetricsRecorder
 from src.infrastructure.main_path_provider import get_main_directory
 from src.infrastructure.now import TimeManager
-from src.protocols import ClientWrapperProtocol
+from src.models.context_window import ContextWindow, create_model_summarizer
+from src.models.router import LatencyRouter, ThrottleProbe
+from src.models_data import find_models_by_name
+from src.protocols import ChatRepositoryProtocol, ClientWrapperProtocol
+from src.settings import (
+    AUTOMATIC_ROUTING,
+    CHAT_COMPRESSION,
+    CONCURRENT_QUERIES,
+    FALLBACK_MODEL_NAME,
+    HEDGE_MODEL_NAMES,
+    PACKED_QUERIES_SIZE,
+    QUERY_LATENCY_BUDGET_SECONDS,
+    ROUTER_MODEL_NAMES,
+    STREAM_RESPONSES,
+    SUMMARIZE_DROPPED_TURNS,
+    USE_MESSAGE_STORE,
+)
 from src.view.view import View
 
 
 def setup_engine(
-    models: Sequence[Model], client_wrapper: ClientWrapperProtocol
+    models: Sequence[Model],
+    client_wrapper: ClientWrapperProtocol,
+    metrics: MetricsRecorder | None = None,
+    throttle_probe: ThrottleProbe | None = None,
 ) -> MainEngine:
-    """Returns a default MainEngine"""
-    select_model_controler = SelectModelController(models)
-    chat_repository = ChatRepository(
-        get_main_directory(),
-        file_manager=FileManager(),
-        time_manager=TimeManager(),
+    """
+    Returns a default MainEngine. The automatic routing needs the metrics and a
+    throttle probe, usually the client wrapper itself.
+    """
+    context_window = ContextWindow(
+        summarizer=(
+            create_model_summarizer(client_wrapper) if SUMMARIZE_DROPPED_TURNS else None
+        )
     )
+    router = None
+    if AUTOMATIC_ROUTING and metrics and throttle_probe:
+        router = LatencyRouter(
+            (
+                find_models_by_name(models, ROUTER_MODEL_NAMES)
+                if ROUTER_MODEL_NAMES
+                else models
+            ),
+            throttle_probe,
+            metrics,
+            context_window=context_window,
+        )
+    select_model_controler = SelectModelController(models)
+    chat_repository = create_chat_repository()
     view = View()
     command_interpreter = CommandInterpreter()
     command_handler = CommandHandler(
@@ -32,7 +71,34 @@ def setup_engine(
         repository=chat_repository,
         client_wrapper=client_wrapper,
         time_manager=TimeManager(),
+        concurrent_queries=CONCURRENT_QUERIES,
+        packed_queries_size=PACKED_QUERIES_SIZE,
+        stream_responses=STREAM_RESPONSES,
+        metrics=metrics,
+        context_window=context_window,
+        hedge_models=find_models_by_name(models, HEDGE_MODEL_NAMES),
+        router=router,
+        latency_budget=QUERY_LATENCY_BUDGET_SECONDS,
+        fallback_model=(
+            find_models_by_name(models, [FALLBACK_MODEL_NAME])[0]
+            if FALLBACK_MODEL_NAME
+            else None
+        ),
     )
     return MainEngine(
         models, command_interpreter, command_handler, select_model_controler, view
     )
+
+
+def create_chat_repository() -> ChatRepositoryProtocol:
+    """Returns the chat repository selected in the settings"""
+    if USE_MESSAGE_STORE:
+        return MessageStoreRepository(
+            get_main_directory(), file_manager=FileManager(), time_manager=TimeManager()
+        )
+    return ChatRepository(
+        get_main_directory(),
+        file_manager=FileManager(),
+        time_manager=TimeManager(),
+        compression=CHAT_COMPRESSION,
+    )
@@ -1,9 +1,16 @@
+import math
 from abc import ABC, abstractmethod
 
-from src.domain import CompleteMessage
+from src.domain import CompleteMessage, ConversationId
+from src.infrastructure.llm_connection.metrics import MetricsRecorder
+from src.models.hedging import HedgeScoreboard
 from src.models.model_wrapper import ModelWrapper
 from src.models.shared import define_system_prompt
-from src.protocols import ViewProtocol
+from src.models.usage import aggregate_usage, compute_conversation_usage
+from src.protocols import ChatRepositoryProtocol, ViewProtocol
+from src.serde import Conversation, convert_digits_to_conversation_id
+from src.serde.deserialize import deserialize_into_conversation_object
+from src.settings import CONVERSATIONS_PAGE_SIZE
 from src.view import Raw
 
 
@@ -39,3 +46,100 @@ class ShowModelAction(ActionStrategy):
         self._view.display_neutral_msg(
             Raw(f"El modelo actual es {self._model_wrapper.model.model_name}")
         )
+
+
+class ShowStatsAction(ActionStrategy):
+    def __init__(
+        self,
+        view: ViewProtocol,
+        metrics: MetricsRecorder | None,
+        hedge_scoreboard: HedgeScoreboard | None = None,
+    ):
+        self._view = view
+        self._metrics = metrics
+        self._hedge_scoreboard = hedge_scoreboard
+
+    def execute(self, remaining_input: str) -> None:
+        if remaining_input.strip():
+            raise ValueError(remaining_input)
+        self._view.display_stats(
+            self._metrics.get_stats() if self._metrics else [],
+            self._hedge_scoreboard.get_stats() if self._hedge_scoreboard else [],
+        )
+
+
+class ShowUsageAction(ActionStrategy):
+    """Shows the token usage per day and model, or the usage of a single conversation"""
+
+    def __init__(self, view: ViewProtocol, repository: ChatRepositoryProtocol):
+        self._view = view
+        self._repository = repository
+
+    def execute(self, remaining_input: str) -> None:
+        if remaining_input.strip():
+            conversation_id = convert_digits_to_conversation_id(remaining_input.strip())
+            usage = compute_conversation_usage(
+                self._load_conversation(conversation_id).messages
+            )
+            self._view.display_neutral_msg(
+                Raw(
+                    f"La conversación {conversation_id} ha usado {usage.total_tokens}"
+                    f" tokens ({usage.prompt_tokens} de entrada y"
+                    f" {usage.completion_tokens} de salida)"
+                )
+            )
+            return
+        conversations = (
+            self._load_conversation(conversation_id)
+            for conversation_id in sorted(self._repository.get_conversation_ids())
+        )
+        self._view.display_usage(
+            aggregate_usage(
+                (conversation.current_time, conversation.messages)
+                for conversation in conversations
+            )
+        )
+
+    def _load_conversation(self, conversation_id: ConversationId) -> Conversation:
+        return deserialize_into_conversation_object(
+            self._repository.load_conversation_as_conversation_text(conversation_id),
+            preserve_model=True,
+            check_model_exists=False,
+        )
+
+
+class ListConversationsAction(ActionStrategy):
+    """
+    Shows a page of the saved conversations, starting with the most recent ones.
+    Only the headers of the conversations in the page are read.
+    """
+
+    def __init__(
+        self,
+        view: ViewProtocol,
+        repository: ChatRepositoryProtocol,
+        page_size: int = CONVERSATIONS_PAGE_SIZE,
+    ):
+        assert page_size > 0
+        self._view = view
+        self._repository = repository
+        self._page_size = page_size
+
+    def execute(self, remaining_input: str) -> None:
+        conversation_ids = sorted(self._repository.get_conversation_ids(), reverse=True)
+        number_of_pages = max(1, math.ceil(len(conversation_ids) / self._page_size))
+        page = remaining_input.strip() or "1"
+        if not page.isdigit() or not 1 <= int(page) <= number_of_pages:
+            self._view.show_error_msg(
+                Raw(f"Indica un número de página entre 1 y {number_of_pages}")
+            )
+            return
+        start = (int(page) - 1) * self._page_size
+        self._view.display_conversation_headers(
+            [
+                self._repository.load_conversation_header(conversation_id)
+                for conversation_id in conversation_ids[start : start + self._page_size]
+            ],
+            page=int(page),
+            number_of_pages=number_of_pages,
+        )
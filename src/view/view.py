@@ -6,12 +6,28 @@ from rich.console import Console
 from rich.markdown import Markdown
 
 from src.domain import ChatMessage, ConversationId, ConversationText, ModelName
+from src.models.hedging import HedgeStats
+from src.models.metrics import ModelStats
 from src.models.placeholders import Placeholder
+from src.models.usage import UsageRow
 from src.protocols import TimeManagerProtocol
+from src.serde import ConversationHeader
 
 from .generic_view import EscapedStr, Raw
-from .io_helpers import SimpleView, display_neutral_msg, show_error_msg
-from .views import get_interaction_styled_view
+from .io_helpers import (
+    SimpleView,
+    display_neutral_msg,
+    escape_for_rich,
+    show_error_msg,
+)
+from .views import (
+    get_conversation_headers_table,
+    get_hedge_stats_table,
+    get_interaction_header_styled_view,
+    get_interaction_styled_view,
+    get_stats_table,
+    get_usage_table,
+)
 
 HELP_TEXT = """
 ## Consultas
@@ -29,6 +45,10 @@ Si empiezas el contenido de un placeholder con `/for` y pones las variantes sepa
 - Usa `/sys <prompt>` o `/system <prompt>` para establecer un nuevo prompt de sistema. Esto iniciará una nueva conversación.
 - Usa `/load <id>` para cargar una conversación desde el directorio de datos.
 - Usa `/load_msgs <id>` para cargar una conversación desde el directorio de datos obteniendo una vista de los mensajes.
+- Usa `/stats` para ver las estadísticas de latencia de las consultas por modelo.
+- Usa `/usage` para ver los tokens usados por día y modelo, o `/usage <id>` para ver los de una conversación.
+- Usa `/list` para ver las conversaciones guardadas, empezando por las más recientes, o `/list <página>` para ver las siguientes.
+- Usa `/n <número> <consulta>` para obtener varias respuestas candidatas a la consulta. Cada una se guarda como una conversación distinta y la conversación continúa con la primera.
 - Usa `/h` o `/help` para mostrar esta ayuda.
 - Usa `/q`, `/quit` o `/exit` para salir del programa.
 """
@@ -53,6 +73,25 @@ class View:
         """Prints an interaction between user and model"""
         print(get_interaction_styled_view(time_manager, model_name, query, content))
 
+    def print_interaction_header(
+        self,
+        time_manager: TimeManagerProtocol,
+        model_name: ModelName,
+        query: Raw,
+    ) -> None:
+        """Prints an interaction whose response content is going to be streamed"""
+        print(
+            get_interaction_header_styled_view(time_manager, model_name, query),
+            end="",
+        )
+
+    def print_content_delta(self, delta: Raw) -> None:
+        """Prints a fragment of the response content as soon as it arrives"""
+        print(escape_for_rich(delta), end="")
+
+    def finish_streamed_interaction(self) -> None:
+        print()
+
     def input_extra_line(self) -> tuple[str, float]:
         prev_time = time.time()
         line = input()
@@ -123,6 +162,36 @@ class View:
     def show_error_msg(self, text: EscapedStr | Raw) -> None:
         show_error_msg(text)
 
+    def display_stats(
+        self, stats: Sequence[ModelStats], hedge_stats: Sequence[HedgeStats] = ()
+    ) -> None:
+        if not stats:
+            self.display_neutral_msg(Raw("Todavía no se han realizado consultas"))
+            return
+        Console().print(get_stats_table(stats))
+        if hedge_stats:
+            Console().print(get_hedge_stats_table(hedge_stats))
+
+    def display_usage(self, rows: Sequence[UsageRow]) -> None:
+        if not rows:
+            self.display_neutral_msg(
+                Raw("No hay conversaciones con tokens registrados")
+            )
+            return
+        Console().print(get_usage_table(rows))
+
+    def display_conversation_headers(
+        self, headers: Sequence[ConversationHeader], *, page: int, number_of_pages: int
+    ) -> None:
+        if not headers:
+            self.display_neutral_msg(Raw("No hay conversaciones guardadas"))
+            return
+        Console().print(
+            get_conversation_headers_table(
+                headers, page=page, number_of_pages=number_of_pages
+            )
+        )
+
 
 def define_processing_query_text(*, current: int, total: int) -> str:
     assert total >= current
@@ -1,5 +1,13 @@
+from collections.abc import Sequence
+
+from rich.table import Table
+
 from src.domain import ModelName
+from src.models.hedging import HedgeStats
+from src.models.metrics import ModelStats, Percentiles
+from src.models.usage import UsageRow
 from src.protocols import TimeManagerProtocol
+from src.serde import ConversationHeader
 
 from .generic_view import Raw
 from .io_helpers import escape_for_rich, highlight_role
@@ -9,10 +17,110 @@ def get_interaction_styled_view(
     time_manager: TimeManagerProtocol, model: ModelName, query: Raw, content: Raw
 ) -> str:
     """Returns the styled representation of an interaction between user and model"""
+    return get_interaction_header_styled_view(
+        time_manager, model, query
+    ) + escape_for_rich(content)
+
+
+def get_interaction_header_styled_view(
+    time_manager: TimeManagerProtocol, model: ModelName, query: Raw
+) -> str:
+    """
+    Returns the styled representation of an interaction until the point where the
+    content of the response starts
+    """
     lines: list[str] = []
     lines.append("\n" + time_manager.get_current_time())
     lines.append("\n" + highlight_role(Raw("USER: ")) + escape_for_rich(query))
-    lines.append(
-        "\n" + highlight_role(Raw(model.upper() + ": ")) + escape_for_rich(content)
-    )
+    lines.append("\n" + highlight_role(Raw(model.upper() + ": ")))
     return "\n".join(lines)
+
+
+def get_stats_table(stats: Sequence[ModelStats]) -> Table:
+    """Returns a table with the latency aggregates (in milliseconds) of every model"""
+    table = Table(title="Estadísticas de las consultas")
+    for column in (
+        "Modelo",
+        "Consultas",
+        "Errores",
+        "Caché",
+        "Agrupadas",
+        "Reintentos",
+        "KB enviados",
+        "KB recibidos",
+        "Total p50/p95/p99 (ms)",
+        "Primer byte p50/p95/p99 (ms)",
+    ):
+        table.add_column(column)
+    for model_stats in stats:
+        table.add_row(
+            model_stats.model_name,
+            str(model_stats.requests),
+            str(model_stats.errors),
+            str(model_stats.cache_hits),
+            str(model_stats.coalesced),
+            str(model_stats.retries),
+            f"{model_stats.bytes_sent / 1024:.1f}",
+            f"{model_stats.bytes_received / 1024:.1f}",
+            format_percentiles(model_stats.wall_time),
+            format_percentiles(model_stats.time_to_first_byte),
+        )
+    return table
+
+
+def get_hedge_stats_table(hedge_stats: Sequence[HedgeStats]) -> Table:
+    """Returns a table with the races won by every model when hedging the queries"""
+    table = Table(title="Consultas simultáneas a varios modelos")
+    for column in (
+        "Modelo",
+        "Carreras",
+        "Ganadas",
+        "% ganadas",
+        "Ganadora p50/p95/p99 (ms)",
+    ):
+        table.add_column(column)
+    for model_stats in hedge_stats:
+        table.add_row(
+            model_stats.model_name,
+            str(model_stats.races),
+            str(model_stats.wins),
+            f"{model_stats.win_rate:.0%}",
+            format_percentiles(model_stats.latency),
+        )
+    return table
+
+
+def format_percentiles(percentiles: Percentiles | None) -> str:
+    if percentiles is None:
+        return "-"
+    return " / ".join(
+        f"{value * 1000:.0f}"
+        for value in (percentiles.p50, percentiles.p95, percentiles.p99)
+    )
+
+
+def get_usage_table(rows: Sequence[UsageRow]) -> Table:
+    table = Table(title="Tokens usados")
+    for column in ("Día", "Modelo", "Respuestas", "Entrada", "Salida", "Total"):
+        table.add_column(column)
+    for row in rows:
+        table.add_row(
+            row.day,
+            row.model_name,
+            str(row.responses),
+            str(row.usage.prompt_tokens),
+            str(row.usage.completion_tokens),
+            str(row.usage.total_tokens),
+        )
+    return table
+
+
+def get_conversation_headers_table(
+    headers: Sequence[ConversationHeader], *, page: int, number_of_pages: int
+) -> Table:
+    table = Table(title=f"Conversaciones (página {page} de {number_of_pages})")
+    for column in ("Id", "Fecha", "Mensajes"):
+        table.add_column(column)
+    for header in headers:
+        table.add_row(header.id, header.current_time, str(header.number_of_messages))
+    return table
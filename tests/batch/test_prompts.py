@@ -0,0 +1,76 @@
+import pytest
+
+from src.batch.prompts import (
+    BatchInputError,
+    BatchQuery,
+    expand_prompts,
+    read_prompts,
+)
+from src.domain import Model, ModelName, Platform
+from src.models.placeholders import QueryText
+
+MODEL_1 = Model(Platform.Mistral, ModelName("model_1"))
+MODEL_2 = Model(Platform.OpenAI, ModelName("model_2"))
+MODELS = [MODEL_1, MODEL_2]
+
+
+def test_read_prompts_ignores_blank_lines() -> None:
+    lines = [
+        '{"request_id": "r1", "title": "First", "body": "Hello"}\n',
+        "\n",
+        '{"request_id": "r2", "body": "Bye", "model": "model_2"}\n',
+    ]
+
+    prompts = list(read_prompts(lines))
+
+    assert [prompt.request_id for prompt in prompts] == ["r1", "r2"]
+    assert prompts[0].title == "First"
+    assert prompts[1].model_name == "model_2"
+
+
+@pytest.mark.parametrize(
+    "line",
+    ["not json", "[1, 2]", '{"body": "Hello"}', '{"request_id": "r1"}'],
+)
+def test_read_prompts_reports_invalid_lines(line: str) -> None:
+    with pytest.raises(BatchInputError, match="line 2"):
+        list(read_prompts(['{"request_id": "r1", "body": "Hello"}', line]))
+
+
+def test_expand_prompts_builds_the_queries_of_every_prompt() -> None:
+    lines = [
+        '{"request_id": "r1", "body": "Translate $0animal to $0lang",'
+        ' "substitutions": {"$0animal": "/for cat,dog", "$0lang": "French"}}',
+        '{"request_id": "r2", "body": "Hello", "model": "model_2"}',
+    ]
+
+    queries = expand_prompts(read_prompts(lines), MODELS, MODEL_1)
+
+    assert queries == [
+        BatchQuery("r1", 0, QueryText("Translate cat to French"), MODEL_1),
+        BatchQuery("r1", 1, QueryText("Translate dog to French"), MODEL_1),
+        BatchQuery("r2", 0, QueryText("Hello"), MODEL_2),
+    ]
+
+
+def test_expand_prompts_fails_with_missing_substitutions() -> None:
+    lines = [
+        '{"request_id": "r1", "body": "Hello"}',
+        '{"request_id": "r2", "body": "Translate $0animal"}',
+    ]
+
+    with pytest.raises(BatchInputError, match=r"line 2 .*\$0animal"):
+        expand_prompts(read_prompts(lines), MODELS, MODEL_1)
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        '{"request_id": "r1", "body": "Hello", "model": "unknown"}',
+        '{"request_id": "r1", "body": "$0a $0b",'
+        ' "substitutions": {"$0a": "/for x,y", "$0b": "/for z,t"}}',
+    ],
+)
+def test_expand_prompts_reports_invalid_prompts(line: str) -> None:
+    with pytest.raises(BatchInputError, match="line 1"):
+        expand_prompts(read_prompts([line]), MODELS, MODEL_1)
@@ -0,0 +1,194 @@
+import io
+import json
+import threading
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+from unittest.mock import Mock
+
+from src.batch.checkpoint import CheckpointJournal, compute_query_key
+from src.batch.prompts import BatchQuery
+from src.batch.runner import BatchRunner, create_base_record
+from src.domain import (
+    ChatMessage,
+    CompleteMessage,
+    ConversationId,
+    ConversationText,
+    DeltaCallback,
+    Model,
+    ModelName,
+    Platform,
+    QueryResult,
+)
+from src.infrastructure.exceptions import APIRequestError
+from src.infrastructure.llm_connection import ClientWrapper
+from src.models.placeholders import QueryText
+from src.protocols import ChatRepositoryProtocol
+from src.serde import ConversationHeader
+
+MODEL = Model(Platform.Mistral, ModelName("model_1"))
+
+
+def create_queries(*texts: str) -> list[BatchQuery]:
+    return [
+        BatchQuery(f"r{i}", 0, QueryText(text), MODEL) for i, text in enumerate(texts)
+    ]
+
+
+def echo_response_stub(
+    model: Model,
+    complete_messages: list[CompleteMessage],
+    debug: bool = False,
+    tools: Any = None,
+    tool_choice: str = "none",
+    random_seed: int | None = None,
+    on_delta: DeltaCallback | None = None,
+    bypass_cache: bool = False,
+) -> QueryResult:
+    query = complete_messages[-1].chat_msg.content
+    if query == "fail":
+        raise APIRequestError("Mistral", 400, "Bad request")
+    complete_messages.append(
+        CompleteMessage(ChatMessage("assistant", query.upper()), model)
+    )
+    return QueryResult(query.upper(), complete_messages)
+
+
+def test_results_are_written_and_saved() -> None:
+    client_wrapper = Mock(spec=ClientWrapper)
+    client_wrapper.get_simple_response.side_effect = echo_response_stub
+    repository = Mock(spec=ChatRepositoryProtocol)
+    output = io.StringIO()
+    runner = BatchRunner(client_wrapper, repository, max_in_flight=2)
+
+    summary = runner.run(create_queries("a", "fail", "c"), output)
+
+    records = {
+        record["request_id"]: record
+        for record in map(json.loads, output.getvalue().splitlines())
+    }
+    assert (summary.completed, summary.failed) == (2, 1)
+    assert records["r0"]["content"] == "A"
+    assert records["r0"]["model"] == "model_1"
+    assert records["r2"]["content"] == "C"
+    assert "Bad request" in records["r1"]["error"]
+    assert repository.save_messages.call_count == 2
+
+
+def test_results_are_written_as_soon_as_they_complete() -> None:
+    release_slow_query = threading.Event()
+
+    def response_stub(
+        model: Model, complete_messages: list[CompleteMessage], **kwargs: Any
+    ) -> QueryResult:
+        if complete_messages[-1].chat_msg.content == "slow":
+            assert release_slow_query.wait(timeout=5)
+        return echo_response_stub(model, complete_messages)
+
+    class Output(io.StringIO):
+        def flush(self) -> None:
+            # the fast result is available before the slow one has finished
+            release_slow_query.set()
+
+    client_wrapper = Mock(spec=ClientWrapper)
+    client_wrapper.get_simple_response.side_effect = response_stub
+    output = Output()
+
+    BatchRunner(client_wrapper, max_in_flight=2).run(
+        create_queries("slow", "fast"), output
+    )
+
+    contents = [json.loads(line)["content"] for line in output.getvalue().splitlines()]
+    assert contents == ["FAST", "SLOW"]
+
+
+class InMemoryRepository:
+    def __init__(self) -> None:
+        self.conversations: list[list[CompleteMessage]] = []
+
+    def get_conversation_ids(self) -> list[ConversationId]:
+        return [ConversationId(f"{i:04}") for i in range(len(self.conversations))]
+
+    def save_messages(
+        self, complete_messages: Sequence[CompleteMessage]
+    ) -> ConversationId:
+        self.conversations.append(list(complete_messages))
+        return ConversationId(f"{len(self.conversations) - 1:04}")
+
+    def append_messages(
+        self,
+        conversation_id: ConversationId,
+        complete_messages: Sequence[CompleteMessage],
+    ) -> None:
+        self.conversations[int(conversation_id)].extend(complete_messages)
+
+    def load_conversation(
+        self, conversation_id: ConversationId
+    ) -> list[CompleteMessage]:
+        return self.conversations[int(conversation_id)]
+
+    def load_conversation_as_conversation_text(
+        self, conversation_id: ConversationId
+    ) -> ConversationText:
+        raise NotImplementedError
+
+    def load_conversation_header(
+        self, conversation_id: ConversationId
+    ) -> ConversationHeader:
+        raise NotImplementedError
+
+
+def create_completed_record(batch_query: BatchQuery) -> dict[str, Any]:
+    record = create_base_record(batch_query)
+    record["content"] = batch_query.query.upper()
+    return record
+
+
+def test_resumed_run_skips_completed_queries_and_saves_once(tmp_path: Path) -> None:
+    queries = create_queries("a", "b", "c")
+    repository = InMemoryRepository()
+    journal = CheckpointJournal(tmp_path / "journal")
+    for batch_query in queries[:2]:
+        journal.append(
+            compute_query_key(batch_query), create_completed_record(batch_query)
+        )
+    journal.close()
+    # the previous run stopped after journaling "b" but before saving it
+    repository.save_messages(
+        echo_response_stub(MODEL, [CompleteMessage(ChatMessage("user", "a"))]).messages
+    )
+    client_wrapper = Mock(spec=ClientWrapper)
+    client_wrapper.get_simple_response.side_effect = echo_response_stub
+    output = io.StringIO()
+
+    summary = BatchRunner(client_wrapper, repository, max_in_flight=2).run(
+        queries, output, CheckpointJournal(tmp_path / "journal")
+    )
+
+    assert (summary.completed, summary.skipped) == (1, 2)
+    assert client_wrapper.get_simple_response.call_count == 1
+    saved_queries = [
+        conversation[0].chat_msg.content for conversation in repository.conversations
+    ]
+    assert saved_queries == ["a", "b", "c"]
+    contents = [json.loads(line)["content"] for line in output.getvalue().splitlines()]
+    assert contents == ["A", "B", "C"]
+
+
+def test_journal_ignores_truncated_lines(tmp_path: Path) -> None:
+    path = tmp_path / "journal"
+    journal = CheckpointJournal(path)
+    journal.append("key_1", {"content": "A"})
+    journal.close()
+    with open(path, "a", encoding="utf-8") as file:
+        file.write('{"key": "key_2", "rec')
+
+    journal = CheckpointJournal(path)
+    journal.append("key_3", {"content": "C"})
+    journal.close()
+
+    assert journal.is_completed("key_1")
+    assert not journal.is_completed("key_2")
+    journal = CheckpointJournal(path)
+    assert list(journal.iter_records()) == [{"content": "A"}, {"content": "C"}]
+    assert journal.last_record == {"content": "C"}
@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any
+
+import pytest
+from mistralai.async_client import MistralAsyncClient
+from mistralai.models.chat_completion import ChatCompletionResponse
+
+from src.domain import (
+    ChatMessage,
+    CompleteMessage,
+    Model,
+    ModelName,
+    Platform,
+    TokenUsage,
+)
+from src.infrastructure.exceptions import ClientNotDefined
+from src.infrastructure.llm_connection import AsyncClientWrapper
+
+MODEL = Model(Platform.Mistral, ModelName("mistral-tiny"))
+
+
+def create_chat_response(content: str) -> ChatCompletionResponse:
+    return ChatCompletionResponse.model_validate(
+        dict(
+            id="1",
+            object="chat.completion",
+            created=0,
+            model="mistral-tiny",
+            choices=[
+                dict(
+                    index=0,
+                    message=dict(role="assistant", content=content),
+                    finish_reason="stop",
+                )
+            ],
+            usage=dict(prompt_tokens=1, total_tokens=2, completion_tokens=1),
+        )
+    )
+
+
+def test_many_requests_in_flight_on_a_single_thread(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    in_flight = 0
+    max_in_flight = 0
+
+    async def chat(
+        self: MistralAsyncClient, messages: list[Any], **kwargs: Any
+    ) -> ChatCompletionResponse:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return create_chat_response("answer to " + messages[-1]["content"])
+
+    monkeypatch.setattr(MistralAsyncClient, "chat", chat)
+
+    async def run() -> list[str]:
+        client_wrapper = AsyncClientWrapper(mistral_api_key="key")
+        results = await asyncio.gather(
+            *(
+                client_wrapper.get_simple_response_to_query(MODEL, str(i), None)
+                for i in range(5)
+            )
+        )
+        await client_wrapper.close()
+        return [result.content for result in results]
+
+    contents = asyncio.run(run())
+
+    assert contents == [f"answer to {i}" for i in range(5)]
+    assert max_in_flight == 5
+
+
+def test_response_is_appended_to_messages(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def chat(self: MistralAsyncClient, **kwargs: Any) -> ChatCompletionResponse:
+        return create_chat_response("Hi")
+
+    monkeypatch.setattr(MistralAsyncClient, "chat", chat)
+    messages = [CompleteMessage(ChatMessage("user", "Hello"))]
+
+    result = asyncio.run(
+        AsyncClientWrapper(mistral_api_key="key").get_simple_response(MODEL, messages)
+    )
+
+    assert result.messages is messages
+    assert messages[-1] == CompleteMessage(
+        ChatMessage("assistant", "Hi"), MODEL, TokenUsage(1, 1)
+    )
+    assert result.usage == TokenUsage(1, 1)
+
+
+def test_client_not_defined() -> None:
+    with pytest.raises(ClientNotDefined):
+        asyncio.run(AsyncClientWrapper().get_simple_response(MODEL, []))
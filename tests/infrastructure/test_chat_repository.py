@@ -1,13 +1,29 @@
-from pathlib import PurePath
+from pathlib import Path, PurePath
 from typing import Any
 from unittest.mock import MagicMock, Mock
 
+import pytest
+
+from src.python_modules.FileSystemWrapper.compression import Compression
+from src.python_modules.FileSystemWrapper.file_manager import FileManager
 from src.python_modules.FileSystemWrapper.file_manager_protocol import (
     FileManagerProtocol,
 )
 
+from src.domain import (
+    ChatMessage,
+    CompleteMessage,
+    ConversationId,
+    Model,
+    ModelName,
+    Platform,
+    TokenUsage,
+)
 from src.infrastructure.chat_repository.repository import ChatRepository
 from src.infrastructure.now import TimeManager
+from src.serde import ConversationHeader, serialize_conversation
+from src.serde.shared import SCHEMA_VERSION
+from tests.objects import COMPLETE_MESSAGES_1, COMPLETE_MESSAGES_2
 
 
 def test_create_chat_repository_trigger_filesystem_setup() -> None:
@@ -34,3 +50,143 @@ def test_create_chat_repository_trigger_filesystem_setup() -> None:
     calls = file_manager_mock.mkdir_if_not_exists.mock_calls
     assert calls[0].args[0].name == "data"
     assert calls[1].args[0].name == "chats"
+
+
+def test_header_is_loaded_without_the_messages(tmp_path: Path) -> None:
+    time_manager = Mock(spec=TimeManager)
+    time_manager.get_current_time.return_value = "2024-03-01 01:30:00"
+    repository = ChatRepository(
+        tmp_path, file_manager=FileManager(), time_manager=time_manager
+    )
+    repository.save_messages(COMPLETE_MESSAGES_1)
+    repository.save_messages(COMPLETE_MESSAGES_2)
+    (tmp_path / "data" / "chats" / "notes.txt").write_text("not a chat")
+
+    header = repository.load_conversation_header(ConversationId("0001"))
+
+    assert sorted(repository.get_conversation_ids()) == ["0000", "0001"]
+    assert header == ConversationHeader(
+        ConversationId("0001"),
+        SCHEMA_VERSION,
+        len(COMPLETE_MESSAGES_2),
+        "2024-03-01 01:30:00",
+    )
+
+
+def test_appended_conversation_keeps_its_id_and_file_format(tmp_path: Path) -> None:
+    time_manager = Mock(spec=TimeManager)
+    time_manager.get_current_time.return_value = "2024-03-01 01:30:00"
+    repository = ChatRepository(
+        tmp_path, file_manager=FileManager(), time_manager=time_manager
+    )
+    # crossing from 9 to 10 messages changes the size of the header
+    messages = (COMPLETE_MESSAGES_1 + COMPLETE_MESSAGES_2) * 2
+    conversation_id = repository.save_messages(messages[:2])
+    for end in range(4, len(messages) + 1, 2):
+        time_manager.get_current_time.return_value = f"2024-03-01 01:{end:02}:00"
+        repository.append_messages(conversation_id, messages[end - 2 : end - 1])
+        repository.append_messages(conversation_id, messages[end - 1 : end])
+
+    assert repository.get_conversation_ids() == [conversation_id]
+    loaded = repository.load_conversation(conversation_id)
+    assert [m.chat_msg for m in loaded] == [m.chat_msg for m in messages]
+    assert repository.load_conversation_as_conversation_text(
+        conversation_id
+    ).text == serialize_conversation(messages, conversation_id, "2024-03-01 01:12:00")
+
+
+class InterruptedFileManager(FileManager):
+    """Fails after writing part of every temporary file, as if the process died"""
+
+    def write_file(
+        self, path: PurePath, text: str, compression: Compression | None = None
+    ) -> None:
+        if path.suffix != ".tmp":
+            super().write_file(path, text, compression)
+            return
+        super().write_file(path, text[: len(text) // 2], compression)
+        raise OSError("interrupted")
+
+
+def test_interrupted_append_leaves_the_conversation_as_it_was(
+    tmp_path: Path,
+) -> None:
+    time_manager = Mock(spec=TimeManager)
+    time_manager.get_current_time.return_value = "2024-03-01 01:30:00"
+    repository = ChatRepository(
+        tmp_path, file_manager=InterruptedFileManager(), time_manager=time_manager
+    )
+    conversation_id = repository.save_messages(COMPLETE_MESSAGES_1)
+    saved_text = repository.load_conversation_as_conversation_text(conversation_id)
+
+    time_manager.get_current_time.return_value = "2024-03-01 01:31:00"
+    with pytest.raises(OSError):
+        repository.append_messages(conversation_id, COMPLETE_MESSAGES_2)
+
+    assert (
+        repository.load_conversation_as_conversation_text(conversation_id) == saved_text
+    )
+    header = repository.load_conversation_header(conversation_id)
+    assert header.number_of_messages == len(COMPLETE_MESSAGES_1)
+    assert [path.name for path in (tmp_path / "data" / "chats").iterdir()] == [
+        f"{conversation_id}.chat"
+    ]
+
+
+@pytest.mark.parametrize("compression", [Compression.GZIP, Compression.LZMA])
+def test_compressed_chat_files_are_read_transparently(
+    tmp_path: Path, compression: Compression
+) -> None:
+    time_manager = Mock(spec=TimeManager)
+    time_manager.get_current_time.return_value = "2024-03-01 01:30:00"
+    plain_repository = ChatRepository(
+        tmp_path, file_manager=FileManager(), time_manager=time_manager
+    )
+    plain_id = plain_repository.save_messages(COMPLETE_MESSAGES_2)
+    repository = ChatRepository(
+        tmp_path,
+        file_manager=FileManager(),
+        time_manager=time_manager,
+        compression=compression,
+    )
+    conversation_id = repository.save_messages(COMPLETE_MESSAGES_1[:2])
+    repository.append_messages(conversation_id, COMPLETE_MESSAGES_1[2:])
+
+    chats_dir = tmp_path / "data" / "chats"
+    assert sorted(path.name for path in chats_dir.iterdir()) == [
+        "0000.chat",
+        f"0001.chat.{compression.extension}",
+    ]
+    assert sorted(repository.get_conversation_ids()) == [plain_id, conversation_id]
+    assert repository.load_conversation_as_conversation_text(
+        conversation_id
+    ).text == serialize_conversation(
+        COMPLETE_MESSAGES_1, conversation_id, "2024-03-01 01:30:00"
+    )
+    assert repository.load_conversation_header(conversation_id) == ConversationHeader(
+        conversation_id, SCHEMA_VERSION, len(COMPLETE_MESSAGES_1), "2024-03-01 01:30:00"
+    )
+    assert repository.load_conversation_header(plain_id).number_of_messages == 2
+
+
+def test_conversation_of_a_real_model_is_loaded(tmp_path: Path) -> None:
+    time_manager = Mock(spec=TimeManager)
+    time_manager.get_current_time.return_value = "2024-03-01 01:30:00"
+    repository = ChatRepository(
+        tmp_path, file_manager=FileManager(), time_manager=time_manager
+    )
+    answer = CompleteMessage(
+        ChatMessage("assistant", "Hello"),
+        Model(Platform.Mistral, ModelName("mistral-tiny")),
+        TokenUsage(9, 2),
+    )
+    messages = [CompleteMessage(ChatMessage("user", "Hi")), answer]
+
+    conversation_id = repository.save_messages(messages)
+
+    assert repository.load_conversation(conversation_id) == [
+        messages[0],
+        CompleteMessage(answer.chat_msg, None, answer.usage),
+    ]
+    header = repository.load_conversation_header(conversation_id)
+    assert header.number_of_messages == 2
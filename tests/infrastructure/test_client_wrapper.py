@@ -0,0 +1,105 @@
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from mistralai.client import MistralClient
+from mistralai.models.chat_completion import ChatCompletionStreamResponse
+from openai.resources.chat.completions import Completions
+from openai.types.chat import ChatCompletion
+
+from src.domain import (
+    ChatMessage,
+    CompleteMessage,
+    Model,
+    ModelName,
+    Platform,
+    TokenUsage,
+)
+from src.infrastructure.llm_connection import ClientWrapper
+
+MODEL = Model(Platform.Mistral, ModelName("mistral-tiny"))
+OPENAI_MODEL = Model(Platform.OpenAI, ModelName("gpt-3.5-turbo"))
+
+
+def create_chunk(role: str | None, content: str) -> ChatCompletionStreamResponse:
+    return ChatCompletionStreamResponse.model_validate(
+        dict(
+            id="1",
+            model="mistral-tiny",
+            choices=[
+                dict(
+                    index=0,
+                    delta=dict(role=role, content=content),
+                    finish_reason=None,
+                )
+            ],
+        )
+    )
+
+
+def test_streamed_response(monkeypatch: pytest.MonkeyPatch) -> None:
+    def chat_stream(
+        self: MistralClient, **kwargs: Any
+    ) -> Iterator[ChatCompletionStreamResponse]:
+        yield create_chunk("assistant", "")
+        yield create_chunk(None, "Hel")
+        yield create_chunk(None, "lo")
+
+    monkeypatch.setattr(MistralClient, "chat_stream", chat_stream)
+    deltas: list[str] = []
+    messages = [CompleteMessage(ChatMessage("user", "Hi"))]
+
+    result = ClientWrapper(mistral_api_key="key").get_simple_response(
+        MODEL, messages, on_delta=deltas.append
+    )
+
+    assert deltas == ["Hel", "lo"]
+    assert result.content == "Hello"
+    assert messages[-1] == CompleteMessage(ChatMessage("assistant", "Hello"), MODEL)
+
+
+def test_candidates_of_openai_are_generated_in_one_request(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    requests: list[dict[str, Any]] = []
+
+    def create(self: Completions, **kwargs: Any) -> ChatCompletion:
+        requests.append(kwargs)
+        return ChatCompletion.model_validate(
+            dict(
+                id="1",
+                created=0,
+                model=OPENAI_MODEL.model_name,
+                object="chat.completion",
+                choices=[
+                    dict(
+                        index=index,
+                        finish_reason="stop",
+                        message=dict(role="assistant", content=f"Answer {index}"),
+                    )
+                    for index in range(kwargs["n"])
+                ],
+                usage=dict(prompt_tokens=5, completion_tokens=12, total_tokens=17),
+            )
+        )
+
+    monkeypatch.setattr(Completions, "create", create)
+    messages = [CompleteMessage(ChatMessage("user", "Hi"))]
+
+    multi_query_result = ClientWrapper(openai_api_key="key").get_responses(
+        OPENAI_MODEL, messages, 3
+    )
+
+    assert len(requests) == 1
+    candidates = multi_query_result.candidates
+    assert [candidate.content for candidate in candidates] == [
+        "Answer 0",
+        "Answer 1",
+        "Answer 2",
+    ]
+    assert candidates[2].messages == [
+        *messages,
+        CompleteMessage(ChatMessage("assistant", "Answer 2"), OPENAI_MODEL),
+    ]
+    assert multi_query_result.usage == TokenUsage(5, 12)
+    assert candidates[0].messages[-1].usage == TokenUsage(5, 12)
@@ -0,0 +1,174 @@
+import random
+import threading
+import time
+
+import pytest
+
+from src.concurrency import map_in_order
+from src.domain import (
+    ChatMessage,
+    CompleteMessage,
+    Model,
+    ModelName,
+    Platform,
+    QueryResult,
+)
+from src.infrastructure.exceptions import (
+    APIConnectionError,
+    APIRequestError,
+    RequestCancelled,
+)
+from src.infrastructure.llm_connection import FakeBehavior, FakeClientWrapper
+from src.infrastructure.llm_connection.fake_client_wrapper import (
+    FixedLatency,
+    UniformLatency,
+)
+from src.infrastructure.llm_connection.metrics import MetricsRecorder
+from src.infrastructure.llm_connection.retry import RetryHandler, RetryPolicy
+from tests.objects import COMPLETE_MESSAGES_2
+
+MODEL = Model(Platform.Mistral, ModelName("model_1"))
+
+
+class FakeSleep:
+    def __init__(self) -> None:
+        self.calls: list[float] = []
+
+    def __call__(self, seconds: float) -> None:
+        self.calls.append(seconds)
+
+
+def create_messages(query: str) -> list[CompleteMessage]:
+    return [*COMPLETE_MESSAGES_2, CompleteMessage(ChatMessage("user", query))]
+
+
+def test_echo_response_after_latency() -> None:
+    sleep = FakeSleep()
+    client_wrapper = FakeClientWrapper(
+        FakeBehavior(latency=FixedLatency(0.3)), sleep=sleep
+    )
+
+    query_result = client_wrapper.get_simple_response(MODEL, create_messages("Hi"))
+
+    assert query_result.content == "Echo: Hi"
+    assert query_result.messages[-1].chat_msg == ChatMessage("assistant", "Echo: Hi")
+    assert query_result.usage and query_result.usage.completion_tokens > 0
+    assert sleep.calls == [0.3]
+
+
+def test_scripted_responses_are_returned_in_a_cycle() -> None:
+    client_wrapper = FakeClientWrapper(FakeBehavior(responses=["one", "two"]))
+
+    contents = [
+        client_wrapper.get_simple_response(MODEL, create_messages("Hi")).content
+        for _ in range(3)
+    ]
+
+    assert contents == ["one", "two", "one"]
+
+
+def test_streamed_response_is_sent_in_chunks() -> None:
+    deltas: list[str] = []
+    client_wrapper = FakeClientWrapper(
+        FakeBehavior(responses=["Hello world"], stream_chunk_size=5)
+    )
+
+    query_result = client_wrapper.get_simple_response(
+        MODEL, create_messages("Hi"), on_delta=deltas.append
+    )
+
+    assert deltas == ["Hello", " worl", "d"]
+    assert query_result.content == "Hello world"
+
+
+@pytest.mark.parametrize(
+    "behavior, error_type",
+    [
+        (FakeBehavior(rate_limit_error_rate=1.0, retry_after=2.0), APIRequestError),
+        (FakeBehavior(timeout_rate=1.0, timeout_seconds=5.0), APIConnectionError),
+    ],
+)
+def test_injected_errors_are_retried(
+    behavior: FakeBehavior, error_type: type[Exception]
+) -> None:
+    retry_sleep = FakeSleep()
+    client_wrapper = FakeClientWrapper(
+        behavior,
+        retry_handler=RetryHandler(RetryPolicy(max_attempts=3), sleep=retry_sleep),
+        sleep=FakeSleep(),
+    )
+
+    with pytest.raises(error_type):
+        client_wrapper.get_simple_response(MODEL, create_messages("Hi"))
+
+    assert client_wrapper.call_count == 3
+    assert len(retry_sleep.calls) == 2
+
+
+def test_uniform_latency_stays_in_range() -> None:
+    latency = UniformLatency(0.1, 0.2)
+    rng = random.Random(0)
+
+    samples = [latency.sample(rng) for _ in range(100)]
+
+    assert all(0.1 <= sample <= 0.2 for sample in samples)
+
+
+def test_candidates_are_requested_concurrently() -> None:
+    client_wrapper = FakeClientWrapper(FakeBehavior(responses=["one", "two"]))
+    messages = create_messages("Hi")
+
+    multi_query_result = client_wrapper.get_responses(MODEL, messages, 2)
+
+    candidates = multi_query_result.candidates
+    assert sorted(candidate.content for candidate in candidates) == ["one", "two"]
+    assert all(candidate.messages[:-1] == messages for candidate in candidates)
+    first_usage, second_usage = (candidate.usage for candidate in candidates)
+    assert first_usage and second_usage
+    assert multi_query_result.usage == first_usage + second_usage
+    assert client_wrapper.call_count == 2
+
+
+def test_identical_concurrent_requests_share_a_single_call() -> None:
+    metrics = MetricsRecorder()
+    client_wrapper = FakeClientWrapper(
+        FakeBehavior(latency=FixedLatency(0.2)), metrics=metrics
+    )
+
+    def get_response(_: int) -> QueryResult:
+        return client_wrapper.get_simple_response(MODEL, create_messages("Hi"))
+
+    query_results = list(map_in_order(get_response, range(3), max_workers=3))
+
+    assert client_wrapper.call_count == 1
+    assert all(query_result.content == "Echo: Hi" for query_result in query_results)
+    first, second, third = (query_result.messages for query_result in query_results)
+    assert first is not second and second is not third
+    assert [msg.chat_msg for msg in first] == [msg.chat_msg for msg in third]
+    assert [query_result.usage is not None for query_result in query_results].count(
+        True
+    ) == 1
+    (stats,) = metrics.get_stats()
+    assert (stats.requests, stats.coalesced) == (3, 2)
+
+
+def test_request_is_sent_again_when_the_shared_call_is_cancelled() -> None:
+    client_wrapper = FakeClientWrapper(FakeBehavior(latency=FixedLatency(0.2)))
+
+    def cancel(delta: str) -> None:
+        raise RequestCancelled(MODEL.model_name)
+
+    def get_cancelled_response() -> None:
+        with pytest.raises(RequestCancelled):
+            client_wrapper.get_simple_response(
+                MODEL, create_messages("Hi"), on_delta=cancel
+            )
+
+    thread = threading.Thread(target=get_cancelled_response)
+    thread.start()
+    time.sleep(0.05)
+    query_result = client_wrapper.get_simple_response(MODEL, create_messages("Hi"))
+    thread.join()
+
+    assert query_result.content == "Echo: Hi"
+    assert client_wrapper.call_count == 2
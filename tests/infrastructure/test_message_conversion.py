@@ -0,0 +1,47 @@
+import gc
+
+from src.domain import ChatMessage
+from src.infrastructure.llm_connection.message_conversion import ConversionCache
+from src.infrastructure.llm_connection.mistral_client_wrapper import (
+    convert_to_mistral_payload,
+)
+from src.infrastructure.llm_connection.openai_client_wrapper import (
+    convert_to_openai_msg,
+)
+
+
+def test_only_new_messages_are_converted() -> None:
+    converted: list[ChatMessage] = []
+
+    def convert(msg: ChatMessage) -> str:
+        converted.append(msg)
+        return msg.content.upper()
+
+    cache = ConversionCache(convert)
+    history = [ChatMessage("user", "hello"), ChatMessage("assistant", "hi")]
+
+    assert cache.convert_all(history) == ["HELLO", "HI"]
+    history.append(ChatMessage("user", "bye"))
+    assert cache.convert_all(history) == ["HELLO", "HI", "BYE"]
+    assert converted == history
+
+
+def test_equal_messages_are_cached_separately_and_released() -> None:
+    cache = ConversionCache(convert_to_openai_msg)
+    # tool calls are lists, so these messages can not be hashed
+    tool_calls = [{"id": "1", "type": "function"}]
+    messages = [ChatMessage("assistant", "", tool_calls=tool_calls) for _ in range(2)]
+
+    cache.convert_all(messages)
+    assert len(cache) == 2
+
+    del messages
+    gc.collect()
+    assert len(cache) == 0
+
+
+def test_mistral_payload_has_no_empty_fields() -> None:
+    assert convert_to_mistral_payload(ChatMessage("user", "hello")) == {
+        "role": "user",
+        "content": "hello",
+    }
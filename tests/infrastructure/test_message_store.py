@@ -0,0 +1,74 @@
+from pathlib import Path
+from unittest.mock import Mock
+
+from src.python_modules.FileSystemWrapper.file_manager import FileManager
+
+from src.domain import ConversationId
+from src.infrastructure.chat_repository.compaction import compact_chat_files
+from src.infrastructure.chat_repository.message_store import (
+    MessageStoreRepository,
+)
+from src.infrastructure.chat_repository.repository import ChatRepository
+from src.infrastructure.now import TimeManager
+from tests.objects import COMPLETE_MESSAGES_1, COMPLETE_MESSAGES_2
+
+
+def create_time_manager() -> Mock:
+    time_manager = Mock(spec=TimeManager)
+    time_manager.get_current_time.return_value = "2024-03-01 01:30:00"
+    return time_manager
+
+
+def count_message_files(tmp_path: Path) -> int:
+    return len(list((tmp_path / "data" / "store" / "messages").glob("*/*.msg")))
+
+
+def test_shared_messages_are_stored_once(tmp_path: Path) -> None:
+    time_manager = create_time_manager()
+    chat_repository = ChatRepository(
+        tmp_path, file_manager=FileManager(), time_manager=time_manager
+    )
+    store = MessageStoreRepository(
+        tmp_path, file_manager=FileManager(), time_manager=time_manager
+    )
+    messages = COMPLETE_MESSAGES_1 + COMPLETE_MESSAGES_2
+    for repository in (chat_repository, store):
+        repository.save_messages(messages[:4])
+        conversation_id = repository.save_messages(messages[:2])
+        repository.append_messages(conversation_id, messages[2:])
+
+    assert count_message_files(tmp_path) == len(messages)
+    assert store.get_conversation_ids() == ["0000", "0001"]
+    for conversation_id in store.get_conversation_ids():
+        assert store.load_conversation_as_conversation_text(
+            conversation_id
+        ) == chat_repository.load_conversation_as_conversation_text(conversation_id)
+        assert store.load_conversation_header(
+            conversation_id
+        ) == chat_repository.load_conversation_header(conversation_id)
+
+
+def test_chat_files_are_compacted_into_the_store(tmp_path: Path) -> None:
+    time_manager = create_time_manager()
+    chat_repository = ChatRepository(
+        tmp_path, file_manager=FileManager(), time_manager=time_manager
+    )
+    for end in range(1, len(COMPLETE_MESSAGES_1) + 1):
+        chat_repository.save_messages(COMPLETE_MESSAGES_1[:end])
+    (tmp_path / "data" / "chats" / "0009.chat").write_text("[META id=0008]")
+    store = MessageStoreRepository(
+        tmp_path, file_manager=FileManager(), time_manager=time_manager
+    )
+
+    report = compact_chat_files(chat_repository, store)
+
+    assert report.converted == len(COMPLETE_MESSAGES_1)
+    assert report.skipped == ["0009"]
+    assert count_message_files(tmp_path) == len(COMPLETE_MESSAGES_1)
+    assert report.store_size_increase == store.get_size()
+    for conversation_id in store.get_conversation_ids():
+        assert store.load_conversation_as_conversation_text(
+            conversation_id
+        ) == chat_repository.load_conversation_as_conversation_text(conversation_id)
+    assert compact_chat_files(chat_repository, store).converted == 0
+    assert store.save_messages(COMPLETE_MESSAGES_2) == ConversationId("0004")
@@ -0,0 +1,90 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from src.domain import ChatMessage, CompleteMessage, Model, ModelName, Platform
+from src.infrastructure.exceptions import APIRequestError
+from src.infrastructure.llm_connection import (
+    FakeBehavior,
+    FakeClientWrapper,
+    MetricsRecorder,
+    ResponseCache,
+)
+from src.infrastructure.llm_connection.retry import RetryHandler, RetryPolicy
+from src.models.metrics import Percentiles, RequestRecord, compute_percentiles
+
+MODEL = Model(Platform.Mistral, ModelName("model_1"))
+
+
+def create_messages(query: str) -> list[CompleteMessage]:
+    return [CompleteMessage(ChatMessage("user", query))]
+
+
+def create_record(wall_time: float, *, error: str | None = None) -> RequestRecord:
+    return RequestRecord(
+        timestamp=0.0,
+        model_name=MODEL.model_name,
+        wall_time=wall_time,
+        time_to_first_byte=None,
+        bytes_sent=10,
+        bytes_received=20,
+        retries=0,
+        cache_hit=False,
+        error=error,
+    )
+
+
+def test_percentiles_use_nearest_rank() -> None:
+    assert compute_percentiles(range(1, 101)) == Percentiles(50, 95, 99)
+    assert compute_percentiles([3.0]) == Percentiles(3.0, 3.0, 3.0)
+    assert compute_percentiles([]) is None
+
+
+def test_stats_are_aggregated_per_model_without_failed_requests() -> None:
+    metrics = MetricsRecorder()
+    for wall_time in (0.1, 0.2, 0.3):
+        metrics.record(create_record(wall_time))
+    metrics.record(create_record(5.0, error="APIConnectionError"))
+
+    [stats] = metrics.get_stats()
+
+    assert (stats.requests, stats.errors) == (4, 1)
+    assert stats.bytes_sent == 40
+    assert stats.wall_time == Percentiles(0.2, 0.3, 0.3)
+
+
+def test_every_call_is_recorded_and_dumped(tmp_path: Path) -> None:
+    dump_path = tmp_path / "metrics" / "requests.jsonl"
+    metrics = MetricsRecorder(dump_path)
+    client_wrapper = FakeClientWrapper(
+        response_cache=ResponseCache(tmp_path / "cache"), metrics=metrics
+    )
+
+    client_wrapper.get_simple_response(MODEL, create_messages("Hello"))
+    client_wrapper.get_simple_response(MODEL, create_messages("Hello"))
+    metrics.close()
+
+    records = [json.loads(line) for line in dump_path.read_text().splitlines()]
+    assert [record["cache_hit"] for record in records] == [False, True]
+    assert records[0]["bytes_sent"] == len("Hello")
+    assert records[0]["bytes_received"] == len("Echo: Hello")
+    assert records[0]["time_to_first_byte"] is not None
+    [stats] = metrics.get_stats()
+    assert (stats.requests, stats.cache_hits) == (2, 1)
+
+
+def test_retries_and_errors_are_recorded() -> None:
+    metrics = MetricsRecorder()
+    client_wrapper = FakeClientWrapper(
+        FakeBehavior(rate_limit_error_rate=1.0),
+        retry_handler=RetryHandler(RetryPolicy(max_attempts=3), sleep=lambda _: None),
+        metrics=metrics,
+    )
+
+    with pytest.raises(APIRequestError):
+        client_wrapper.get_simple_response(MODEL, create_messages("Hello"))
+
+    [stats] = metrics.get_stats()
+    assert (stats.errors, stats.retries) == (1, 2)
+    assert stats.wall_time is None
@@ -0,0 +1,108 @@
+import threading
+import time
+
+from src.domain import Model, ModelName, Platform
+from src.infrastructure.llm_connection.rate_limiter import (
+    RateLimiter,
+    RateLimits,
+    TokenBucket,
+)
+
+MODEL_1 = Model(Platform.Mistral, ModelName("model_1"))
+MODEL_2 = Model(Platform.Mistral, ModelName("model_2"))
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def create_rate_limiter(clock: FakeClock, limits: RateLimits) -> RateLimiter:
+    return RateLimiter({Platform.Mistral: limits}, clock=clock.time, sleep=clock.sleep)
+
+
+def test_token_bucket_waits_for_refill() -> None:
+    bucket = TokenBucket(2, 1, now=0)
+    assert bucket.reserve(1, now=0) == 0
+    assert bucket.reserve(1, now=0) == 0
+    assert bucket.reserve(1, now=0) == 1
+    assert bucket.reserve(1, now=0) == 2
+    assert bucket.reserve(1, now=10) == 0
+
+
+def test_requests_are_paced_instead_of_failing() -> None:
+    clock = FakeClock()
+    rate_limiter = create_rate_limiter(clock, RateLimits(2, 1000))
+
+    for _ in range(4):
+        rate_limiter.acquire(MODEL_1, 1)
+
+    # 2 requests per minute: the 3rd and 4th requests wait 30 seconds each
+    assert clock.sleeps == [30, 30]
+
+
+def test_tokens_budget() -> None:
+    clock = FakeClock()
+    rate_limiter = create_rate_limiter(clock, RateLimits(100, 600))
+
+    rate_limiter.acquire(MODEL_1, 600)
+    rate_limiter.acquire(MODEL_1, 300)
+
+    assert clock.sleeps == [30]
+
+
+def test_budgets_are_kept_per_model() -> None:
+    clock = FakeClock()
+    rate_limiter = create_rate_limiter(clock, RateLimits(1, 1000))
+
+    rate_limiter.acquire(MODEL_1, 1)
+    rate_limiter.acquire(MODEL_2, 1)
+
+    assert clock.sleeps == []
+
+
+def test_queue_depth() -> None:
+    release = threading.Event()
+
+    def wait_for_release(_seconds: float) -> None:
+        release.wait()
+
+    rate_limiter = RateLimiter(
+        {Platform.Mistral: RateLimits(1, 1000)}, sleep=wait_for_release
+    )
+    rate_limiter.acquire(MODEL_1, 1)
+    waiting = [
+        threading.Thread(target=rate_limiter.acquire, args=(MODEL_1, 1))
+        for _ in range(3)
+    ]
+    for thread in waiting:
+        thread.start()
+    while rate_limiter.get_queue_depth() < 3:
+        time.sleep(0.001)
+
+    assert rate_limiter.get_queue_depth(MODEL_1) == 3
+    assert rate_limiter.get_queue_depth(MODEL_2) == 0
+
+    release.set()
+    for thread in waiting:
+        thread.join()
+    assert rate_limiter.get_queue_depth() == 0
+
+
+def test_wait_can_be_checked_without_reserving_capacity() -> None:
+    clock = FakeClock()
+    rate_limiter = create_rate_limiter(clock, RateLimits(1, 1000))
+
+    assert rate_limiter.get_wait(MODEL_1, 10) == 0
+    assert rate_limiter.get_wait(MODEL_1, 10) == 0
+    rate_limiter.acquire(MODEL_1, 10)
+    assert rate_limiter.get_wait(MODEL_1, 10) == 60
+    assert rate_limiter.get_wait(MODEL_2, 10) == 0
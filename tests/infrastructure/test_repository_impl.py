@@ -15,6 +15,9 @@ from src.infrastructure.chat_repository.implementer import (
 
 def test_match_filename() -> None:
     assert match_chat_file_pattern("0033.chat")
+    assert match_chat_file_pattern("0033.chat.gz")
+    assert match_chat_file_pattern("0033.chat.xz")
+    assert not match_chat_file_pattern("0033.chat.zip")
     assert not match_chat_file_pattern("33.chat")
     assert not match_chat_file_pattern("033.chat")
     assert not match_chat_file_pattern("00033.chat")
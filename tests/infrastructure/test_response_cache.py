@@ -0,0 +1,104 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+from mistralai.client import MistralClient
+from mistralai.models.chat_completion import ChatCompletionResponse
+
+from src.domain import (
+    ChatMessage,
+    CompleteMessage,
+    Model,
+    ModelName,
+    Platform,
+    TokenUsage,
+)
+from src.infrastructure.llm_connection import ClientWrapper, ResponseCache
+from src.infrastructure.llm_connection.response_cache import compute_cache_key
+
+MODEL = Model(Platform.Mistral, ModelName("mistral-tiny"))
+MESSAGES = [ChatMessage("user", "Hello")]
+
+
+def create_key(messages: list[ChatMessage], random_seed: int | None = None) -> str:
+    return compute_cache_key(
+        MODEL, messages, tools=None, tool_choice="none", random_seed=random_seed
+    )
+
+
+def test_cache_key_depends_on_request_content() -> None:
+    assert create_key(MESSAGES) == create_key(list(MESSAGES))
+    assert create_key(MESSAGES) != create_key([ChatMessage("user", "Hi")])
+    assert create_key(MESSAGES) != create_key(MESSAGES, random_seed=1)
+
+
+def test_cache_persists_responses(tmp_path: Path) -> None:
+    chat_msg = ChatMessage("assistant", "Hi")
+    ResponseCache(tmp_path).put("key", chat_msg)
+
+    assert ResponseCache(tmp_path).get("key") == chat_msg
+    assert ResponseCache(tmp_path).get("other") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path: Path) -> None:
+    chat_msg = ChatMessage("assistant", "x" * 100)
+    cache = ResponseCache(tmp_path, max_bytes=400)
+    cache.put("a", chat_msg)
+    cache.put("b", chat_msg)
+    cache.get("a")
+    cache.put("c", chat_msg)
+
+    assert cache.get("a") == chat_msg
+    assert cache.get("b") is None
+    assert cache.get("c") == chat_msg
+
+
+def test_cache_hit_returns_same_result_as_live_call(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    calls = 0
+
+    def chat(self: MistralClient, **kwargs: Any) -> ChatCompletionResponse:
+        nonlocal calls
+        calls += 1
+        return ChatCompletionResponse.model_validate(
+            dict(
+                id="1",
+                object="chat.completion",
+                created=0,
+                model="mistral-tiny",
+                choices=[
+                    dict(
+                        index=0,
+                        message=dict(role="assistant", content="Hi"),
+                        finish_reason="stop",
+                    )
+                ],
+                usage=dict(prompt_tokens=1, total_tokens=2, completion_tokens=1),
+            )
+        )
+
+    monkeypatch.setattr(MistralClient, "chat", chat)
+    client_wrapper = ClientWrapper(
+        mistral_api_key="key", response_cache=ResponseCache(tmp_path)
+    )
+
+    def get_result(bypass_cache: bool = False) -> Any:
+        messages = [CompleteMessage(MESSAGES[0])]
+        return client_wrapper.get_simple_response(
+            MODEL, messages, bypass_cache=bypass_cache
+        )
+
+    live_result = get_result()
+    cached_result = get_result()
+    assert calls == 1
+    assert cached_result.content == live_result.content
+    assert cached_result.messages[-1] == CompleteMessage(
+        ChatMessage("assistant", "Hi"), MODEL
+    )
+    # no tokens are consumed by a cache hit
+    assert live_result.usage == TokenUsage(1, 1)
+    assert cached_result.usage is None
+
+    get_result(bypass_cache=True)
+    assert calls == 2
@@ -0,0 +1,158 @@
+import random
+
+import pytest
+
+from src.domain import Platform
+from src.infrastructure.exceptions import (
+    APIConnectionError,
+    APIRequestError,
+    CircuitOpen,
+)
+from src.infrastructure.llm_connection.retry import (
+    CircuitBreaker,
+    RetryHandler,
+    RetryPolicy,
+    is_retryable,
+)
+from src.settings import (
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    CIRCUIT_BREAKER_RESET_SECONDS,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FlakyFunction:
+    def __init__(self, errors: list[Exception]) -> None:
+        self.errors = errors
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def create_retry_handler(clock: FakeClock, max_attempts: int = 4) -> RetryHandler:
+    return RetryHandler(
+        RetryPolicy(max_attempts=max_attempts, base_delay=1, max_delay=8),
+        clock=clock.time,
+        sleep=clock.sleep,
+        rng=random.Random(0),
+    )
+
+
+def test_is_retryable() -> None:
+    assert is_retryable(APIConnectionError("Mistral"))
+    assert is_retryable(APIRequestError("Mistral", 429, ""))
+    assert is_retryable(APIRequestError("Mistral", 503, ""))
+    assert is_retryable(APIRequestError("Mistral", None, "timeout"))
+    assert not is_retryable(APIRequestError("Mistral", 400, ""))
+    assert not is_retryable(ValueError())
+
+
+def test_transient_errors_are_retried_with_backoff() -> None:
+    clock = FakeClock()
+    retry_handler = create_retry_handler(clock)
+    function = FlakyFunction(
+        [APIRequestError("Mistral", 429, ""), APIConnectionError("Mistral")]
+    )
+    retries: list[int] = []
+
+    result = retry_handler.call(
+        Platform.Mistral, function, on_retry=lambda n, _err: retries.append(n)
+    )
+
+    assert result == "ok"
+    assert function.calls == 3
+    assert retries == [1, 2]
+    assert retry_handler.get_retry_count(Platform.Mistral) == 2
+    assert retry_handler.get_retry_count(Platform.OpenAI) == 0
+    assert 0 <= clock.sleeps[0] <= 1
+    assert 0 <= clock.sleeps[1] <= 2
+
+
+def test_retry_after_header_is_respected() -> None:
+    clock = FakeClock()
+    function = FlakyFunction([APIRequestError("OpenAI", 429, "", retry_after=20)])
+
+    create_retry_handler(clock).call(Platform.OpenAI, function)
+
+    assert clock.sleeps == [20]
+
+
+def test_non_retryable_errors_are_raised_at_once() -> None:
+    clock = FakeClock()
+    function = FlakyFunction([APIRequestError("Mistral", 401, "")])
+
+    with pytest.raises(APIRequestError):
+        create_retry_handler(clock).call(Platform.Mistral, function)
+
+    assert function.calls == 1
+
+
+def test_gives_up_after_max_attempts() -> None:
+    clock = FakeClock()
+    function = FlakyFunction([APIConnectionError("Mistral") for _ in range(5)])
+
+    with pytest.raises(APIConnectionError):
+        create_retry_handler(clock, max_attempts=3).call(Platform.Mistral, function)
+
+    assert function.calls == 3
+
+
+def test_circuit_breaker_fails_fast_while_platform_is_down() -> None:
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        "Mistral", failure_threshold=2, reset_timeout=30, clock=clock.time
+    )
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.is_open
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+    clock.now += 30
+    breaker.before_call()  # trial request
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    breaker.record_success()
+    assert not breaker.is_open
+    breaker.before_call()
+
+
+def test_non_retryable_errors_leave_the_circuit_unchanged() -> None:
+    clock = FakeClock()
+    retry_handler = create_retry_handler(clock)
+    breaker = retry_handler.get_circuit_breaker(Platform.Mistral)
+
+    def fail_with_client_error() -> None:
+        with pytest.raises(APIRequestError):
+            retry_handler.call(
+                Platform.Mistral, FlakyFunction([APIRequestError("Mistral", 400, "")])
+            )
+
+    for _ in range(CIRCUIT_BREAKER_FAILURE_THRESHOLD - 1):
+        breaker.record_failure()
+    fail_with_client_error()
+    breaker.record_failure()
+    assert breaker.is_open
+
+    clock.now += CIRCUIT_BREAKER_RESET_SECONDS
+    fail_with_client_error()  # the trial request
+    assert breaker.is_open
+    breaker.before_call()  # a new trial request is let through
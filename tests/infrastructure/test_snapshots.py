@@ -0,0 +1,39 @@
+from src.domain import ConversationId
+from src.infrastructure.chat_repository.snapshots import (
+    find_superseded_snapshots,
+)
+from src.serde import serialize_conversation
+from tests.objects import COMPLETE_MESSAGES_1, COMPLETE_MESSAGES_2
+
+
+def create_text(conversation_id: str, end: int) -> str:
+    messages = (COMPLETE_MESSAGES_1 + COMPLETE_MESSAGES_2)[:end]
+    return serialize_conversation(
+        messages, ConversationId(conversation_id), "2024-03-01 01:30:00"
+    )
+
+
+def test_earlier_turns_and_duplicates_are_superseded() -> None:
+    conversation_texts = {
+        ConversationId("0000"): create_text("0000", 2),
+        ConversationId("0001"): create_text("0001", 4),
+        ConversationId("0002"): create_text("0002", 6),
+        ConversationId("0003"): create_text("0003", 6),
+        ConversationId("0004"): create_text("0004", 0),
+        ConversationId("0005"): serialize_conversation(
+            COMPLETE_MESSAGES_2, ConversationId("0005"), "2024-03-01 01:30:00"
+        ),
+    }
+
+    assert find_superseded_snapshots(conversation_texts) == ["0000", "0001", "0002"]
+
+
+def test_message_continued_in_another_conversation_is_not_a_snapshot() -> None:
+    text = create_text("0000", 2)
+    conversation_texts = {
+        ConversationId("0000"): text,
+        ConversationId("0001"): text.replace("[META id=0000]", "[META id=0001]")
+        + " and more",
+    }
+
+    assert find_superseded_snapshots(conversation_texts) == []
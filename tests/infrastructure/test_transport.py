@@ -0,0 +1,26 @@
+from src.domain import Platform
+from src.infrastructure.llm_connection.transport import (
+    TransportSettings,
+    create_http_client,
+    get_platform_transport_settings,
+    get_shared_transport,
+)
+from src.settings import CONNECT_TIMEOUTS, READ_TIMEOUTS
+
+
+def test_clients_share_the_connection_pool() -> None:
+    client_1 = create_http_client()
+    client_2 = create_http_client(TransportSettings(read_timeout=5))
+
+    assert client_1._transport is get_shared_transport()  # pyright: ignore
+    assert client_2._transport is get_shared_transport()  # pyright: ignore
+    assert client_2.timeout.read == 5
+
+
+def test_platform_timeouts_are_used_unless_settings_are_given() -> None:
+    settings = get_platform_transport_settings(Platform.OpenAI)
+    assert settings.connect_timeout == CONNECT_TIMEOUTS[Platform.OpenAI]
+    assert settings.read_timeout == READ_TIMEOUTS[Platform.OpenAI]
+
+    given = TransportSettings(read_timeout=1.0)
+    assert get_platform_transport_settings(Platform.OpenAI, given) is given
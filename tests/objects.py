@@ -1,4 +1,10 @@
-from src.domain import ChatMessage, CompleteMessage, Model, ModelName
+from src.domain import (
+    ChatMessage,
+    CompleteMessage,
+    Model,
+    ModelName,
+    TokenUsage,
+)
 
 TEXT_1 = """\
 [META id=0001]
@@ -52,3 +58,29 @@ COMPLETE_MESSAGES_2 = [
         Model(None, ModelName("model_1")),
     ),
 ]
+
+TEXT_3 = """\
+[META id=0003]
+
+[META schema_version=0.3]
+[META number_of_messages=3]
+[META current_time=2024-06-02 09:15:40]
+
+[ROLE SYSTEM]
+Be brief.
+
+[ROLE USER]
+Hello
+
+[ROLE ASSISTANT model=model_1 prompt_tokens=12 completion_tokens=3]
+Hi"""
+
+COMPLETE_MESSAGES_3 = [
+    CompleteMessage(ChatMessage(role="system", content="Be brief."), None),
+    CompleteMessage(ChatMessage(role="user", content="Hello"), None),
+    CompleteMessage(
+        ChatMessage(role="assistant", content="Hi"),
+        Model(None, ModelName("model_1")),
+        TokenUsage(12, 3),
+    ),
+]
@@ -2,15 +2,15 @@ import unittest
 
 from src.domain import ConversationId
 from src.serde import convert_digits_to_conversation_id, serialize_conversation
-from tests.objects import COMPLETE_MESSAGES_1, TEXT_1
+from tests.objects import COMPLETE_MESSAGES_3, TEXT_3
 
 
 class TestCreateConversationTexts(unittest.TestCase):
 
     def test_create_conversation_texts(self) -> None:
-        expected_conversation_text = TEXT_1
+        expected_conversation_text = TEXT_3
         result = serialize_conversation(
-            COMPLETE_MESSAGES_1, ConversationId("0001"), "2024-03-16 14:50:15"
+            COMPLETE_MESSAGES_3, ConversationId("0003"), "2024-06-02 09:15:40"
         )
         self.assertEqual(expected_conversation_text, result)
 
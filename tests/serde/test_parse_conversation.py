@@ -1,16 +1,27 @@
 from src.domain import (
     ChatMessage,
+    CompleteMessage,
     ConversationId,
     ConversationText,
     SchemaVersionId,
+    TokenUsage,
+)
+from src.models_data import get_models
+from src.serde import (
+    Conversation,
+    ConversationHeader,
+    deserialize_conversation_text_into_messages,
+    deserialize_header,
+    serialize_conversation,
 )
-from src.serde import Conversation, deserialize_conversation_text_into_messages
 from src.serde.deserialize import deserialize_into_conversation_object
 from tests.objects import (
     COMPLETE_MESSAGES_1,
     COMPLETE_MESSAGES_2,
+    COMPLETE_MESSAGES_3,
     TEXT_1,
     TEXT_2,
+    TEXT_3,
 )
 
 
@@ -18,13 +29,14 @@ def create_chat_msg(role: str, content: str) -> ChatMessage:
     return ChatMessage(role=role, content=content)
 
 
-SCHEMA_VERSION = SchemaVersionId("0.2")
+LEGACY_SCHEMA_VERSION = SchemaVersionId("0.2")
+SCHEMA_VERSION = SchemaVersionId("0.3")
 CASES = [
     (
         TEXT_1,
         Conversation(
             ConversationId("0001"),
-            SCHEMA_VERSION,
+            LEGACY_SCHEMA_VERSION,
             4,
             "2024-03-16 14:50:15",
             COMPLETE_MESSAGES_1,
@@ -34,12 +46,22 @@ CASES = [
         TEXT_2,
         Conversation(
             ConversationId("0002"),
-            SCHEMA_VERSION,
+            LEGACY_SCHEMA_VERSION,
             2,
             "2023-05-20 13:00:02",
             COMPLETE_MESSAGES_2,
         ),
     ),
+    (
+        TEXT_3,
+        Conversation(
+            ConversationId("0003"),
+            SCHEMA_VERSION,
+            3,
+            "2024-06-02 09:15:40",
+            COMPLETE_MESSAGES_3,
+        ),
+    ),
 ]
 
 
@@ -57,6 +79,7 @@ def test_deserialize_messages() -> None:
     for text, messages in [
         (TEXT_1, COMPLETE_MESSAGES_1),
         (TEXT_2, COMPLETE_MESSAGES_2),
+        (TEXT_3, COMPLETE_MESSAGES_3),
     ]:
         result = deserialize_conversation_text_into_messages(
             ConversationText(text, SCHEMA_VERSION),
@@ -64,3 +87,38 @@ def test_deserialize_messages() -> None:
             check_model_exists=False,
         )
         assert result == messages
+
+
+def test_deserialize_header_stops_at_the_first_role_tag() -> None:
+    for text, expected_conversation in CASES:
+        lines = iter(text.split("\n"))
+
+        header = deserialize_header(lines)
+
+        assert header == ConversationHeader(
+            expected_conversation.id,
+            expected_conversation.schema_version,
+            expected_conversation.number_of_messages,
+            expected_conversation.current_time,
+        )
+        first_message = expected_conversation.messages[0].chat_msg
+        assert next(lines).strip() == first_message.content.split("\n")[0]
+
+
+def test_real_model_names_are_deserialized() -> None:
+    """The names of the catalog have hyphens and dots, as gpt-3.5-turbo"""
+    messages: list[CompleteMessage] = []
+    for model in get_models():
+        messages.append(CompleteMessage(ChatMessage("user", "Hi")))
+        messages.append(
+            CompleteMessage(ChatMessage("assistant", "Hello"), model, TokenUsage(9, 2))
+        )
+    text = serialize_conversation(
+        messages, ConversationId("0001"), "2024-06-02 09:15:40"
+    )
+
+    result = deserialize_conversation_text_into_messages(
+        ConversationText(text, SCHEMA_VERSION), preserve_model=True
+    )
+
+    assert result == messages
@@ -1,4 +1,4 @@
-from src.serde.deserialize import ParsedLine, TagType
+from src.serde.deserialize import ParsedLine, TagType, get_tag_type
 
 NO_TAGS = [
     "",
@@ -31,6 +31,14 @@ def test_get_tag_type() -> None:
         assert_tag_type(expected_type, tag)
 
 
+def test_get_tag_type_of_line() -> None:
+    for no_tag in NO_TAGS:
+        assert get_tag_type(no_tag) is None
+
+    for tag, expected_type in TAGS_WITH_TYPES:
+        assert get_tag_type(tag) is expected_type
+
+
 def assert_is_tag(expected: bool, string: str) -> None:
     assert expected == ParsedLine(string).is_tag()
 
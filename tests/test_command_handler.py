@@ -1,3 +1,4 @@
+from collections.abc import Callable
 from typing import Any, cast
 from unittest.mock import Mock
 
@@ -7,16 +8,20 @@ from src.command_handler import DELIBERATE_INPUT_TIME, CommandHandler
 from src.controllers.command_interpreter import Action, ActionType
 from src.controllers.select_model import SelectModelController
 from src.domain import (
+    ChatMessage,
     CompleteMessage,
     ConversationId,
     ConversationText,
+    DeltaCallback,
     Model,
     ModelName,
+    MultiQueryResult,
     QueryResult,
 )
 from src.infrastructure.llm_connection import ClientWrapper
 from src.infrastructure.now import TimeManager
 from src.protocols import ChatRepositoryProtocol
+from src.serde import ConversationHeader
 from src.serde.shared import SCHEMA_VERSION
 from src.view import Raw
 from src.view.view import View
@@ -309,6 +314,7 @@ def get_simple_response_stub(
     _model: Model,
     messages: list[CompleteMessage],
     debug: bool = False,
+    on_delta: DeltaCallback | None = None,
 ) -> QueryResult:
     messages.append(Mock(spec=CompleteMessage))
     return QueryResult(
@@ -373,3 +379,268 @@ def test_extra_lines_with_delay(command_handler_fixture: CommandHandlerFixture)
     fixture.command_handler.process_action(
         Action(ActionType.CONTINUE_CONVERSATION), "something"
     )
+
+
+class ConcurrentFixture(AdvancedFixture):
+    def __init__(self) -> None:
+        """Same as AdvancedFixture, but with the concurrent mode activated."""
+        super().__init__()
+        self.command_handler = CommandHandler(
+            view=self.mock_view,
+            select_model_controler=self.mock_select_model_controler,
+            repository=self.mock_repository,
+            time_manager=self.mock_time_manager,
+            client_wrapper=self.mock_client_wrapper,
+            prev_messages=self.prev_messages_stub,
+            concurrent_queries=True,
+        )
+        self._select_model()
+
+
+def echo_response_stub(
+    model: Model,
+    messages: list[CompleteMessage],
+    debug: bool = False,
+    on_delta: DeltaCallback | None = None,
+) -> QueryResult:
+    content = "answer to " + messages[-1].chat_msg.content
+    messages.append(
+        CompleteMessage(ChatMessage(role="assistant", content=content), model)
+    )
+    return QueryResult(content, messages)
+
+
+def test_concurrent_queries_keep_original_order() -> None:
+    """
+    Checks that the queries of a `/for` are saved in their original order, each one
+    starting from the previous messages, and the first conversation is kept.
+    """
+    fixture = ConcurrentFixture()
+    system_prompt = CompleteMessage(ChatMessage(role="system", content="Be brief"))
+    fixture.prev_messages_stub.append(system_prompt)
+    fixture.mock_view.input_extra_line.side_effect = [("end", DELIBERATE_INPUT_TIME)]
+    fixture.mock_view.get_raw_substitutions_from_user.return_value = {
+        "$0number": "/for 1,2,3"
+    }
+    fixture.mock_client_wrapper.get_simple_response.side_effect = echo_response_stub
+
+    fixture.command_handler.process_action(
+        Action(ActionType.CONTINUE_CONVERSATION), "Say $0number"
+    )
+
+    saved = [call.args[0] for call in fixture.mock_repository.save_messages.mock_calls]
+    assert [messages[-1].chat_msg.content for messages in saved] == [
+        "answer to Say 1",
+        "answer to Say 2",
+        "answer to Say 3",
+    ]
+    assert all(len(messages) == 3 for messages in saved)
+    assert all(messages[0] == system_prompt for messages in saved)
+    assert fixture.prev_messages_stub == saved[0]
+
+
+def streamed_response_stub(
+    model: Model,
+    messages: list[CompleteMessage],
+    debug: bool = False,
+    on_delta: DeltaCallback | None = None,
+) -> QueryResult:
+    assert on_delta
+    for delta in ["Fine, ", "thanks"]:
+        on_delta(delta)
+    return echo_response_stub(model, messages)
+
+
+def test_streamed_response_is_printed_incrementally() -> None:
+    fixture = AdvancedFixture()
+    fixture.command_handler = CommandHandler(
+        view=fixture.mock_view,
+        select_model_controler=fixture.mock_select_model_controler,
+        repository=fixture.mock_repository,
+        time_manager=fixture.mock_time_manager,
+        client_wrapper=fixture.mock_client_wrapper,
+        prev_messages=fixture.prev_messages_stub,
+        stream_responses=True,
+    )
+    fixture._select_model()  # pyright: ignore [reportPrivateUsage]
+    fixture.mock_view.input_extra_line.side_effect = [("end", DELIBERATE_INPUT_TIME)]
+    fixture.mock_client_wrapper.get_simple_response.side_effect = streamed_response_stub
+
+    fixture.command_handler.process_action(
+        Action(ActionType.CONTINUE_CONVERSATION), "How are you?"
+    )
+
+    fixture.mock_view.print_interaction_header.assert_called_once()
+    delta_calls = fixture.mock_view.print_content_delta.mock_calls
+    assert [call.args[0] for call in delta_calls] == [Raw("Fine, "), Raw("thanks")]
+    fixture.mock_view.finish_streamed_interaction.assert_called_once()
+    fixture.mock_view.print_interaction.assert_not_called()
+    fixture.mock_repository.save_messages.assert_called_once()
+    assert len(fixture.prev_messages_stub) == 2
+
+
+def test_continuing_conversation_is_appended_to() -> None:
+    fixture = AdvancedFixture()
+    fixture.mock_repository.save_messages.return_value = ConversationId("0007")
+    fixture.mock_client_wrapper.get_simple_response.side_effect = echo_response_stub
+    for query in ["Hi", "Bye"]:
+        fixture.mock_view.input_extra_line.side_effect = [
+            ("end", DELIBERATE_INPUT_TIME)
+        ]
+        fixture.command_handler.process_action(
+            Action(ActionType.CONTINUE_CONVERSATION), query
+        )
+
+    fixture.mock_repository.save_messages.assert_called_once()
+    fixture.mock_repository.append_messages.assert_called_once_with(
+        "0007", fixture.prev_messages_stub[2:]
+    )
+    assert len(fixture.prev_messages_stub) == 4
+
+
+MODEL = Model(None, ModelName("Model name test"))
+QUERY = CompleteMessage(ChatMessage("user", "Hi"))
+
+
+def test_candidate_responses_are_saved_as_sibling_conversations() -> None:
+    fixture = AdvancedFixture()
+    fixture.mock_view.input_extra_line.side_effect = [("end", DELIBERATE_INPUT_TIME)]
+    fixture.mock_client_wrapper.get_responses.return_value = MultiQueryResult(
+        [
+            echo_response_stub(MODEL, list(fixture.prev_messages_stub) + [QUERY])
+            for _ in range(2)
+        ]
+    )
+
+    fixture.command_handler.process_action(Action(ActionType.SAMPLES), "2 Hi")
+
+    args = fixture.mock_client_wrapper.get_responses.mock_calls[0].args
+    assert args[1:] == ([QUERY], 2)
+    saved = [call.args[0] for call in fixture.mock_repository.save_messages.mock_calls]
+    assert len(saved) == 2
+    assert saved[0] is not saved[1] and saved[0][:-1] == saved[1][:-1] == [QUERY]
+    assert fixture.prev_messages_stub == saved[0]
+    assert fixture.mock_view.print_interaction.call_count == 2
+
+
+def test_invalid_number_of_samples_is_rejected(
+    advanced_fixture: AdvancedFixture,
+) -> None:
+    advanced_fixture.command_handler.process_action(
+        Action(ActionType.SAMPLES), "many Hi"
+    )
+
+    advanced_fixture.mock_view.show_error_msg.assert_called_once()
+    advanced_fixture.mock_client_wrapper.get_responses.assert_not_called()
+
+
+class PackedFixture(AdvancedFixture):
+    def __init__(self) -> None:
+        """Same as AdvancedFixture, but packing the queries of a `/for` in pairs."""
+        super().__init__()
+        self.command_handler = CommandHandler(
+            view=self.mock_view,
+            select_model_controler=self.mock_select_model_controler,
+            repository=self.mock_repository,
+            time_manager=self.mock_time_manager,
+            client_wrapper=self.mock_client_wrapper,
+            prev_messages=self.prev_messages_stub,
+            packed_queries_size=2,
+        )
+        self._select_model()
+        self.mock_view.input_extra_line.side_effect = [("end", DELIBERATE_INPUT_TIME)]
+        self.mock_view.get_raw_substitutions_from_user.return_value = {
+            "$0number": "/for 1,2,3"
+        }
+
+
+def create_packed_response_stub(packed_content: str) -> Callable[..., QueryResult]:
+    """Answers packed queries with the packed_content, and echoes any other query"""
+
+    def packed_response_stub(
+        model: Model,
+        messages: list[CompleteMessage],
+        debug: bool = False,
+        on_delta: DeltaCallback | None = None,
+    ) -> QueryResult:
+        if "### 2" not in messages[-1].chat_msg.content:
+            return echo_response_stub(model, messages)
+        chat_msg = ChatMessage("assistant", packed_content)
+        messages.append(CompleteMessage(chat_msg, model))
+        return QueryResult(packed_content, messages)
+
+    return packed_response_stub
+
+
+def test_packed_queries_are_saved_as_individual_conversations() -> None:
+    fixture = PackedFixture()
+    fixture.mock_client_wrapper.get_simple_response.side_effect = (
+        create_packed_response_stub("### 1\nfirst\n### 2\nsecond")
+    )
+
+    fixture.command_handler.process_action(
+        Action(ActionType.CONTINUE_CONVERSATION), "Say $0number"
+    )
+
+    assert fixture.mock_client_wrapper.get_simple_response.call_count == 2
+    saved = [call.args[0] for call in fixture.mock_repository.save_messages.mock_calls]
+    assert [[msg.chat_msg.content for msg in messages] for messages in saved] == [
+        ["Say 1", "first"],
+        ["Say 2", "second"],
+        ["Say 3", "answer to Say 3"],
+    ]
+    assert fixture.prev_messages_stub == saved[0]
+
+
+def test_packed_queries_are_sent_individually_if_the_answers_are_not_separable() -> (
+    None
+):
+    fixture = PackedFixture()
+    fixture.mock_client_wrapper.get_simple_response.side_effect = (
+        create_packed_response_stub("first and second")
+    )
+
+    fixture.command_handler.process_action(
+        Action(ActionType.CONTINUE_CONVERSATION), "Say $0number"
+    )
+
+    # the first pair is sent again query by query, the last query was already single
+    assert fixture.mock_client_wrapper.get_simple_response.call_count == 4
+    saved = [call.args[0] for call in fixture.mock_repository.save_messages.mock_calls]
+    assert [messages[-1].chat_msg.content for messages in saved] == [
+        "answer to Say 1",
+        "answer to Say 2",
+        "answer to Say 3",
+    ]
+
+
+def test_list_shows_a_page_of_headers_starting_with_the_most_recent(
+    command_handler_fixture: CommandHandlerFixture,
+) -> None:
+    fixture = command_handler_fixture
+    conversation_ids = [ConversationId(f"{number:04}") for number in range(45)]
+    fixture.mock_repository.get_conversation_ids.return_value = conversation_ids
+    fixture.mock_repository.load_conversation_header.side_effect = (
+        lambda conversation_id: ConversationHeader(
+            conversation_id, SCHEMA_VERSION, 2, "2024-03-01 01:30:00"
+        )
+    )
+
+    fixture.command_handler.process_action(Action(ActionType.LIST_CONVERSATIONS), "3")
+
+    call = fixture.mock_view.display_conversation_headers.mock_calls[0]
+    assert [header.id for header in call.args[0]] == conversation_ids[4::-1]
+    assert call.kwargs == {"page": 3, "number_of_pages": 3}
+    fixture.mock_repository.load_conversation.assert_not_called()
+
+
+def test_list_rejects_a_page_out_of_range(
+    command_handler_fixture: CommandHandlerFixture,
+) -> None:
+    fixture = command_handler_fixture
+    fixture.mock_repository.get_conversation_ids.return_value = []
+
+    fixture.command_handler.process_action(Action(ActionType.LIST_CONVERSATIONS), "2")
+
+    fixture.mock_view.show_error_msg.assert_called_once()
+    fixture.mock_view.display_conversation_headers.assert_not_called()
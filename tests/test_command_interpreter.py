@@ -33,6 +33,8 @@ def test_command_interpreter_valid_command() -> None:
         Case("/load 5555", ActionType.LOAD_CONVERSATION, "5555"),
         Case("/load_msgs 5555", ActionType.LOAD_MESSAGES, "5555"),
         Case("/load_msgs", ActionType.LOAD_MESSAGES, ""),
+        Case("/stats", ActionType.STATS, ""),
+        Case("/usage 0012", ActionType.USAGE, "0012"),
         Case(
             "/sys Eres un asistente experto.",
             ActionType.SYSTEM_PROMPT,
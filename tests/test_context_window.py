@@ -0,0 +1,80 @@
+from collections.abc import Sequence
+
+from src.domain import ChatMessage, CompleteMessage, Model, ModelName
+from src.models.context_window import SUMMARY_PREFIX, ContextWindow, Summarizer
+
+MODEL = Model(None, ModelName("model_1"))
+SYSTEM_PROMPT = CompleteMessage(ChatMessage("system", "Be brief."))
+# every message of a turn is estimated in 4 + 25 tokens
+CONTENT = "x" * 100
+
+
+def create_turns(number: int) -> list[CompleteMessage]:
+    messages: list[CompleteMessage] = []
+    for i in range(number):
+        messages.append(CompleteMessage(ChatMessage("user", f"{i:03}" + CONTENT)))
+        messages.append(CompleteMessage(ChatMessage("assistant", CONTENT), MODEL))
+    return messages
+
+
+def create_context_window(
+    budget: int, *, trim_ratio: float = 1.0, summarizer: Summarizer | None = None
+) -> ContextWindow:
+    return ContextWindow(
+        {}, budget, reserved_tokens=0, trim_ratio=trim_ratio, summarizer=summarizer
+    )
+
+
+def test_messages_inside_the_budget_are_not_changed() -> None:
+    messages = [SYSTEM_PROMPT, *create_turns(3)]
+
+    assert create_context_window(1000).fit(messages, MODEL) == messages
+
+
+def test_oldest_turns_are_dropped_keeping_the_system_prompt() -> None:
+    messages = [SYSTEM_PROMPT, *create_turns(10)]
+
+    fitted = create_context_window(300, trim_ratio=0.5).fit(messages, MODEL)
+
+    assert fitted[0] == SYSTEM_PROMPT
+    assert fitted[1:] == messages[-4:]
+
+
+def test_last_turn_is_kept_even_if_it_does_not_fit() -> None:
+    messages = create_turns(3)
+
+    assert create_context_window(10).fit(messages, MODEL) == messages[-2:]
+
+
+def test_dropped_turns_are_summarized() -> None:
+    summarized: list[Sequence[CompleteMessage]] = []
+
+    def summarizer(messages: Sequence[CompleteMessage], model: Model) -> str:
+        summarized.append(messages)
+        return f"summary {len(summarized)}"
+
+    context_window = create_context_window(300, trim_ratio=0.5, summarizer=summarizer)
+    messages = [SYSTEM_PROMPT, *create_turns(10)]
+
+    fitted = context_window.fit(messages, MODEL)
+    fitted_again = context_window.fit([*fitted, *create_turns(6)], MODEL)
+
+    assert fitted[:2] == [
+        SYSTEM_PROMPT,
+        CompleteMessage(ChatMessage("system", SUMMARY_PREFIX + "summary 1")),
+    ]
+    assert summarized[0] == messages[1:-4]
+    # the previous summary is summarized again with the next dropped turns
+    assert summarized[1][0] == fitted[1]
+    assert fitted_again[1].chat_msg.content == SUMMARY_PREFIX + "summary 2"
+    assert [msg for msg in fitted_again if msg.chat_msg.role == "system"] == [
+        SYSTEM_PROMPT,
+        fitted_again[1],
+    ]
+
+
+def test_token_estimate_is_cached_on_the_message() -> None:
+    message = CompleteMessage(ChatMessage("user", CONTENT))
+
+    assert message.estimated_tokens == 29
+    assert "estimated_tokens" in vars(message)
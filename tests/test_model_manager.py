@@ -0,0 +1,217 @@
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any
+
+import pytest
+
+from src.concurrency import run_first_successful
+from src.domain import (
+    ChatMessage,
+    CompleteMessage,
+    DeltaCallback,
+    Model,
+    ModelName,
+    MultiQueryResult,
+    QueryResult,
+)
+from src.infrastructure.exceptions import (
+    LatencyBudgetExceeded,
+    RequestCancelled,
+)
+from src.model_manager import ModelManager
+from src.models.context_window import ContextWindow, count_tokens
+from src.models.hedging import HedgeOutcome, HedgeScoreboard
+from src.models.placeholders import QueryText
+
+FAST = Model(None, ModelName("fast"))
+SLOW = Model(None, ModelName("slow"))
+
+
+class RacingClientWrapper:
+    """Streams the name of the model in chunks, waiting a delay per model before each one"""
+
+    def __init__(self, delays: dict[Model, float], failing: tuple[Model, ...] = ()):
+        self._delays = delays
+        self._failing = failing
+        self.cancelled: list[Model] = []
+
+    def get_simple_response(
+        self,
+        model: Model,
+        complete_messages: list[CompleteMessage],
+        *,
+        on_delta: DeltaCallback | None = None,
+        **kwargs: Any,
+    ) -> QueryResult:
+        if model in self._failing:
+            raise RuntimeError(model.model_name)
+        try:
+            for _ in range(5):
+                time.sleep(self._delays[model])
+                if on_delta:
+                    on_delta(".")
+        except RequestCancelled:
+            self.cancelled.append(model)
+            raise
+        complete_messages.append(
+            CompleteMessage(ChatMessage("assistant", model.model_name), model)
+        )
+        return QueryResult(model.model_name, complete_messages)
+
+    def get_responses(
+        self,
+        model: Model,
+        complete_messages: Sequence[CompleteMessage],
+        n: int,
+        *,
+        random_seed: int | None = None,
+    ) -> MultiQueryResult:
+        raise NotImplementedError
+
+
+def create_model_manager(
+    client_wrapper: RacingClientWrapper,
+    hedge_models: tuple[Model, ...] = (),
+    *,
+    latency_budget: float | None = None,
+    fallback_model: Model | None = None,
+) -> ModelManager:
+    model_manager = ModelManager(
+        client_wrapper,
+        hedge_models=hedge_models,
+        latency_budget=latency_budget,
+        fallback_model=fallback_model,
+    )
+    model_manager.model_wrapper.change(SLOW)
+    return model_manager
+
+
+def test_first_complete_response_is_kept_and_the_others_cancelled() -> None:
+    client_wrapper = RacingClientWrapper({FAST: 0.001, SLOW: 0.05})
+    model_manager = create_model_manager(client_wrapper, (FAST,))
+    messages: list[CompleteMessage] = []
+
+    result = model_manager.get_simple_response(QueryText("hi"), messages)
+
+    assert result.content == "fast"
+    assert result.messages is messages
+    assert [msg.chat_msg.content for msg in messages] == ["hi", "fast"]
+    assert messages[-1].model == FAST
+    time.sleep(0.1)
+    assert client_wrapper.cancelled == [SLOW]
+    stats = {
+        stats.model_name: stats for stats in model_manager.hedge_scoreboard.get_stats()
+    }
+    assert (stats[FAST.model_name].wins, stats[SLOW.model_name].wins) == (1, 0)
+
+
+def test_failed_request_leaves_the_race_to_the_others() -> None:
+    client_wrapper = RacingClientWrapper({SLOW: 0.001}, failing=(FAST,))
+    model_manager = create_model_manager(client_wrapper, (FAST,))
+
+    assert model_manager.get_simple_response(QueryText("hi"), []).content == "slow"
+
+
+def test_query_exceeding_the_latency_budget_is_sent_to_the_fallback_model() -> None:
+    client_wrapper = RacingClientWrapper({FAST: 0.001, SLOW: 0.05})
+    model_manager = create_model_manager(
+        client_wrapper, latency_budget=0.1, fallback_model=FAST
+    )
+    answering_models: list[Model] = []
+    deltas: list[str] = []
+
+    result = model_manager.get_simple_response(
+        QueryText("hi"), [], on_delta=deltas.append, on_model=answering_models.append
+    )
+
+    assert answering_models == [SLOW, FAST]
+    assert result.messages[-1].model == FAST
+    assert [msg.chat_msg.content for msg in result.messages] == ["hi", "fast"]
+    assert len(deltas) > 5
+    time.sleep(0.1)
+    assert client_wrapper.cancelled == [SLOW]
+
+
+def test_latency_budget_exceeded_without_fallback_model() -> None:
+    client_wrapper = RacingClientWrapper({SLOW: 0.05})
+    model_manager = create_model_manager(client_wrapper, latency_budget=0.1)
+
+    with pytest.raises(LatencyBudgetExceeded):
+        model_manager.get_simple_response(QueryText("hi"), [])
+
+
+def test_timeout_when_no_function_succeeds_in_time() -> None:
+    with pytest.raises(TimeoutError):
+        run_first_successful([lambda cancelled: time.sleep(0.1)], timeout=0.01)
+
+
+def test_error_of_the_last_failure_is_raised_when_all_fail() -> None:
+    def fail(cancelled: threading.Event) -> None:
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        run_first_successful([fail, fail])
+
+
+def test_stats_count_the_races_of_every_request() -> None:
+    scoreboard = HedgeScoreboard()
+    same_model_twice = (FAST.model_name, FAST.model_name)
+    scoreboard.record(HedgeOutcome(same_model_twice, FAST.model_name, 1.0))
+    scoreboard.record(
+        HedgeOutcome((FAST.model_name, SLOW.model_name), SLOW.model_name, 2.0)
+    )
+
+    fast_stats, slow_stats = scoreboard.get_stats()
+
+    assert (fast_stats.races, fast_stats.wins, fast_stats.win_rate) == (3, 1, 1 / 3)
+    assert fast_stats.latency and fast_stats.latency.p50 == 1.0
+    assert (slow_stats.races, slow_stats.wins, slow_stats.win_rate) == (1, 1, 1.0)
+
+
+class EchoClientWrapper(RacingClientWrapper):
+    """Answers with the content of the query and records the messages sent"""
+
+    def __init__(self) -> None:
+        super().__init__({})
+        self.sent: list[list[CompleteMessage]] = []
+
+    def get_simple_response(
+        self,
+        model: Model,
+        complete_messages: list[CompleteMessage],
+        *,
+        on_delta: DeltaCallback | None = None,
+        **kwargs: Any,
+    ) -> QueryResult:
+        self.sent.append(list(complete_messages))
+        content = complete_messages[-1].chat_msg.content
+        assert isinstance(content, str)
+        complete_messages.append(CompleteMessage(ChatMessage("assistant", content)))
+        return QueryResult(content, complete_messages)
+
+
+def test_only_the_messages_sent_are_fitted_in_the_context_window() -> None:
+    summarized: list[Sequence[CompleteMessage]] = []
+
+    def summarizer(messages: Sequence[CompleteMessage], model: Model) -> str:
+        summarized.append(messages)
+        return "summary"
+
+    client_wrapper = EchoClientWrapper()
+    context_window = ContextWindow(
+        {}, 300, reserved_tokens=0, trim_ratio=0.5, summarizer=summarizer
+    )
+    model_manager = ModelManager(client_wrapper, context_window)
+    model_manager.model_wrapper.change(SLOW)
+    history: list[CompleteMessage] = []
+    for turn in range(12):
+        model_manager.get_simple_response(QueryText(f"{turn:03}" + "x" * 100), history)
+
+    assert [message.chat_msg.content[:3] for message in history[::2]] == [
+        f"{turn:03}" for turn in range(12)
+    ]
+    assert all(count_tokens(messages) <= 300 for messages in client_wrapper.sent)
+    assert client_wrapper.sent[-1][-1] == history[-2]
+    # the messages fitted are reused, so they are summarized only when they overflow
+    assert 1 < len(summarized) < 12 - 5
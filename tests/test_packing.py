@@ -0,0 +1,39 @@
+from src.models.packing import (
+    PACKED_QUERY_INSTRUCTIONS,
+    create_packed_query,
+    pack_queries,
+    unpack_answers,
+)
+from src.models.placeholders import QueryText
+
+QUERIES = [QueryText(f"Is {number} prime?") for number in range(1, 6)]
+
+
+def test_queries_are_packed_in_order() -> None:
+    packed_queries = pack_queries(QUERIES, 2)
+
+    assert [packed_query.queries for packed_query in packed_queries] == [
+        tuple(QUERIES[0:2]),
+        tuple(QUERIES[2:4]),
+        (QUERIES[4],),
+    ]
+    assert packed_queries[0].text == (
+        PACKED_QUERY_INSTRUCTIONS + "\n\n### 1\nIs 1 prime?\n\n### 2\nIs 2 prime?"
+    )
+    assert packed_queries[2].text == QUERIES[4]
+
+
+def test_answers_are_unpacked() -> None:
+    packed_query = create_packed_query(QUERIES[:3])
+    content = "### 1\nNo.\n\n### 2\nYes,\n\nit is.\n### 3 \nYes."
+
+    assert unpack_answers(packed_query, content) == ["No.", "Yes,\n\nit is.", "Yes."]
+
+
+def test_unexpected_answers_can_not_be_unpacked() -> None:
+    packed_query = create_packed_query(QUERIES[:3])
+
+    assert unpack_answers(packed_query, "### 1\nNo.\n### 2\nYes.") is None
+    assert unpack_answers(packed_query, "### 1\nNo.\n### 3\nYes.\n### 2\nYes.") is None
+    assert unpack_answers(packed_query, "### 1\nNo.\n### 2\n\n### 3\nYes.") is None
+    assert unpack_answers(packed_query, "No, yes and yes.") is None
@@ -0,0 +1,116 @@
+import math
+
+from src.domain import ChatMessage, CompleteMessage, Model, ModelName
+from src.models.context_window import ContextWindow
+from src.models.metrics import ModelStats, Percentiles
+from src.models.router import LatencyRouter, RoutingPolicy
+
+FAST = Model(None, ModelName("fast"))
+SLOW = Model(None, ModelName("slow"))
+SMALL = Model(None, ModelName("small"))
+MESSAGES = [CompleteMessage(ChatMessage("user", "x" * 400))]
+
+
+class FakeSignals:
+    def __init__(self) -> None:
+        self.waits: dict[Model, float] = {}
+        self.stats: list[ModelStats] = []
+        self.tokens: dict[Model, int] = {}
+
+    def get_expected_wait(self, model: Model, tokens: int) -> float:
+        self.tokens[model] = tokens
+        return self.waits.get(model, 0.0)
+
+    def get_stats(self, last: int | None = None) -> list[ModelStats]:
+        return self.stats
+
+
+def create_stats(model: Model, p95: float, *, errors: int = 0) -> ModelStats:
+    return ModelStats(
+        model.model_name,
+        requests=10,
+        errors=errors,
+        cache_hits=0,
+        coalesced=0,
+        retries=0,
+        bytes_sent=0,
+        bytes_received=0,
+        wall_time=Percentiles(p95 / 2, p95, p95),
+        time_to_first_byte=None,
+    )
+
+
+def create_router(
+    signals: FakeSignals, context_window: ContextWindow | None = None
+) -> LatencyRouter:
+    return LatencyRouter(
+        [FAST, SLOW, SMALL],
+        signals,
+        signals,
+        context_window=context_window,
+        policy=RoutingPolicy(latency_slo=5, max_error_rate=0.2, min_requests=3),
+    )
+
+
+def test_preferred_model_is_kept_while_it_meets_the_slo() -> None:
+    signals = FakeSignals()
+    signals.stats = [create_stats(FAST, 1), create_stats(SLOW, 4)]
+
+    assert create_router(signals).choose(SLOW, MESSAGES) == SLOW
+
+
+def test_throttled_model_falls_back_to_a_slower_one() -> None:
+    signals = FakeSignals()
+    signals.stats = [create_stats(FAST, 1), create_stats(SLOW, 4)]
+    signals.waits[FAST] = 30
+
+    assert create_router(signals).choose(FAST, MESSAGES) == SLOW
+
+
+def test_failing_and_unavailable_models_are_skipped() -> None:
+    signals = FakeSignals()
+    signals.stats = [create_stats(FAST, 1, errors=5)]
+    signals.waits[SLOW] = math.inf
+
+    assert create_router(signals).choose(FAST, MESSAGES) == SMALL
+
+
+def test_fastest_model_is_chosen_when_none_meets_the_slo() -> None:
+    signals = FakeSignals()
+    signals.stats = [
+        create_stats(FAST, 8),
+        create_stats(SLOW, 20),
+        create_stats(SMALL, 12),
+    ]
+
+    assert create_router(signals).choose(SLOW, MESSAGES) == FAST
+
+
+def test_models_whose_context_window_is_too_small_are_skipped() -> None:
+    signals = FakeSignals()
+    context_window = ContextWindow(
+        {"fast": 50, "slow": 1000, "small": 50}, reserved_tokens=0
+    )
+
+    router = create_router(signals, context_window)
+
+    assert router.choose(FAST, MESSAGES) == SLOW
+
+
+def test_models_are_evaluated_on_the_fitted_history() -> None:
+    signals = FakeSignals()
+    context_window = ContextWindow(
+        {"fast": 300, "slow": 100_000, "small": 300},
+        reserved_tokens=0,
+        trim_ratio=0.5,
+    )
+    history: list[CompleteMessage] = []
+    for _ in range(20):
+        history.append(CompleteMessage(ChatMessage("user", "x" * 100)))
+        history.append(CompleteMessage(ChatMessage("assistant", "x" * 100)))
+
+    router = create_router(signals, context_window)
+
+    assert all(candidate.fits for candidate in router.evaluate(FAST, history))
+    assert router.choose(FAST, history) == FAST
+    assert signals.tokens[FAST] <= 150 < signals.tokens[SLOW]
@@ -0,0 +1,55 @@
+from src.domain import (
+    ChatMessage,
+    CompleteMessage,
+    Model,
+    ModelName,
+    TokenUsage,
+)
+from src.models.usage import (
+    UsageRow,
+    aggregate_usage,
+    compute_conversation_usage,
+)
+
+MODEL_1 = Model(None, ModelName("model_1"))
+MODEL_2 = Model(None, ModelName("model_2"))
+
+
+def create_exchange(
+    query: str, content: str, model: Model, usage: TokenUsage
+) -> list[CompleteMessage]:
+    return [
+        CompleteMessage(ChatMessage("user", query)),
+        CompleteMessage(ChatMessage("assistant", content), model, usage),
+    ]
+
+
+def test_usage_is_aggregated_per_day_and_model() -> None:
+    first = create_exchange("Hello", "Hi", MODEL_1, TokenUsage(10, 2))
+    # continues the first conversation, so it repeats its messages
+    continued = first + create_exchange("Bye", "Bye", MODEL_2, TokenUsage(20, 1))
+    other_day = create_exchange("Hello", "Hello!", MODEL_1, TokenUsage(10, 3))
+
+    rows = aggregate_usage(
+        [
+            ("2024-06-01 10:00:00", first),
+            ("2024-06-01 10:05:00", continued),
+            ("2024-06-02 08:00:00", other_day),
+        ]
+    )
+
+    assert rows == [
+        UsageRow("2024-06-01", ModelName("model_1"), 1, TokenUsage(10, 2)),
+        UsageRow("2024-06-01", ModelName("model_2"), 1, TokenUsage(20, 1)),
+        UsageRow("2024-06-02", ModelName("model_1"), 1, TokenUsage(10, 3)),
+    ]
+
+
+def test_conversation_usage_ignores_messages_without_usage() -> None:
+    messages = [
+        CompleteMessage(ChatMessage("assistant", "Hi"), MODEL_1),
+        *create_exchange("Hello", "Hi", MODEL_1, TokenUsage(10, 2)),
+        *create_exchange("Bye", "Bye", MODEL_1, TokenUsage(15, 1)),
+    ]
+
+    assert compute_conversation_usage(messages) == TokenUsage(25, 3)